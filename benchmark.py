@@ -0,0 +1,236 @@
+"""Run the GHS Algorithm over a sweep of graphs and engines, and record the
+timings of every run
+
+Each configuration of graph family, number of nodes, engine, wake up policy
+and number of nodes woken up is run several times, each run being a separate main.py
+process killed after a timeout. The wall time of every phase, the peak RSS,
+and the numbers of messages sent and deferred are read from the statistics
+written by main.py with --stats, and all the runs are written to a JSON and a
+CSV file. The runs are also recorded in a results store of their own, next
+to the output files unless --results is given, for modules/plot.py.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import signal
+import itertools
+import argparse
+import tempfile
+import subprocess
+from generate import GENERATORS, EdgeWriter
+from modules.wake import POLICIES
+from modules.api import ENGINES
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(SCRIPT_DIR, 'main.py')
+
+FIELDS = [
+    'family', 'num_nodes', 'num_edges', 'engine', 'wake_policy',
+    'wake_processes', 'run',
+    'seed', 'status', 'wall', 'load', 'spawn', 'protocol', 'verify',
+    'total_messages', 'deferred', 'within_bound', 'critical_path',
+    'peak_rss_kb', 'peak_children_rss_kb'
+]
+
+
+def generate_graph(graphs_dir, family, num_nodes, seed, file_format):
+    """Generate the input graph of a configuration, unless already generated
+
+    Arguments:
+        graphs_dir {String} -- Directory of the generated graphs
+        family {String} -- Graph type, as accepted by generate.py
+        num_nodes {Integer} -- Number of nodes in the graph
+        seed {Integer} -- Seed of the generator
+        file_format {String} -- Format of the input file - text/binary
+
+    Returns:
+        String -- Path of the input file
+    """
+    extension = '.txt' if file_format == 'text' else '.bin'
+    path = os.path.join(
+        graphs_dir, 'inp-' + str(num_nodes) + '-' + family + '-s' +
+        str(seed) + extension)
+    if not os.path.exists(path):
+        writer = EdgeWriter(path, num_nodes, file_format,
+                            random.Random(seed))
+        GENERATORS[family](num_nodes, random.Random(seed), writer)
+        writer.close()
+    return path
+
+
+def run_once(input_file, engine, wake_policy, wake_processes, seed, timeout,
+             workers, results):
+    """Run main.py once, killing it and all its processes after the timeout
+
+    Arguments:
+        input_file {String} -- Path of the input file
+        engine {String} -- Engine of main.py
+        wake_policy {String} -- Wake up policy of main.py
+        wake_processes {Integer} -- Number of nodes to wake up initially
+        seed {Integer} -- Seed of the engine
+        timeout {Float} -- Timeout in seconds
+        workers {Integer} -- Number of workers, None for the default
+        results {String} -- Path of the results store to record the run in
+
+    Returns:
+        Dict -- Status, wall time and the statistics written by main.py
+    """
+    handle, stats_path = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    command = [
+        sys.executable, MAIN,
+        str(wake_processes), 'basic', input_file, '--engine', engine,
+        '--wake-policy', wake_policy, '--seed',
+        str(seed), '--stats', stats_path, '--results', results
+    ]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+
+    start = time.perf_counter()
+    # A session of its own, so that the processes of the nodes are killed too
+    proc = subprocess.Popen(command,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    try:
+        status = 'ok' if proc.wait(timeout) == 0 else 'failed'
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        status = 'timeout'
+    record = {'status': status, 'wall': time.perf_counter() - start}
+
+    if status == 'ok':
+        with open(stats_path) as file:
+            stats = json.load(file)
+        record.update(stats['phases'])
+        for key in ('num_edges', 'total_messages', 'peak_rss_kb',
+                    'peak_children_rss_kb'):
+            record[key] = stats[key]
+        record['deferred'] = sum(stats['messages']['deferred'].values())
+        record['within_bound'] = stats['messages']['within_bound']
+        record['critical_path'] = stats['messages']['critical_path']
+    os.remove(stats_path)
+    return record
+
+
+def write_results(output, records):
+    """Write the records of all the runs as JSON and CSV
+
+    Arguments:
+        output {String} -- Path of the output files, without the extension
+        records {List} -- Records of all the runs
+    """
+    with open(output + '.json', 'w') as file:
+        json.dump(records, file, indent=2)
+        file.write('\n')
+    with open(output + '.csv', 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the GHS Algorithm over a sweep of graphs')
+    parser.add_argument('--nodes',
+                        type=int,
+                        nargs='+',
+                        default=[100, 200, 400],
+                        help='numbers of nodes of the graphs')
+    parser.add_argument('--families',
+                        nargs='+',
+                        choices=list(GENERATORS),
+                        default=['random'],
+                        help='graph types, as accepted by generate.py')
+    parser.add_argument('--engines',
+                        nargs='+',
+                        choices=ENGINES,
+                        default=['simulate'],
+                        help='engines of main.py')
+    parser.add_argument('--wake-policies',
+                        nargs='+',
+                        choices=[
+                            policy for policy in POLICIES if policy != 'set'
+                        ],
+                        default=['random'],
+                        help='wake up policies of main.py')
+    parser.add_argument('--wake',
+                        type=int,
+                        nargs='+',
+                        default=[1],
+                        help='numbers of nodes to wake up initially')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help='number of runs of each configuration')
+    parser.add_argument('--timeout',
+                        type=float,
+                        default=300,
+                        help='timeout of each run in seconds')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='seed of the graphs, run i uses seed + i for ' +
+                        'the engine')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='number of workers of the sharded and tcp ' +
+                        'engines')
+    parser.add_argument('--format',
+                        choices=['text', 'binary'],
+                        default='binary',
+                        help='format of the generated graphs')
+    parser.add_argument('--graphs-dir',
+                        default=os.path.join(SCRIPT_DIR, 'files', 'bench'),
+                        help='directory of the generated graphs')
+    parser.add_argument('--output',
+                        default=os.path.join(SCRIPT_DIR, 'files',
+                                             'benchmark'),
+                        help='path of the JSON and CSV output files, ' +
+                        'without the extension')
+    parser.add_argument('--results',
+                        default=None,
+                        help='path of the results store the runs are ' +
+                        'recorded in, defaults to the output path with ' +
+                        'the .db extension')
+    args = parser.parse_args()
+    if args.results is None:
+        args.results = args.output + '.db'
+
+    os.makedirs(args.graphs_dir, exist_ok=True)
+    records = []
+    for family in args.families:
+        for num_nodes in args.nodes:
+            input_file = generate_graph(args.graphs_dir, family, num_nodes,
+                                        args.seed, args.format)
+            for engine in args.engines:
+                for wake_policy, wake_processes in itertools.product(
+                        args.wake_policies, args.wake):
+                    for run in range(args.repeat):
+                        record = {
+                            'family': family,
+                            'num_nodes': num_nodes,
+                            'engine': engine,
+                            'wake_policy': wake_policy,
+                            'wake_processes': wake_processes,
+                            'run': run,
+                            'seed': args.seed + run,
+                        }
+                        record.update(
+                            run_once(input_file, engine, wake_policy,
+                                     wake_processes, args.seed + run,
+                                     args.timeout, args.workers,
+                                     args.results))
+                        records.append(record)
+                        print(family + ' ' + str(num_nodes) + ' ' + engine +
+                              ' ' + wake_policy + ' wake=' +
+                              str(wake_processes) + ' run=' + str(run) +
+                              ': ' + record['status'] + ' ' +
+                              '%.3fs' % record['wall'])
+                        # Keep the results of the runs done so far
+                        write_results(args.output, records)
@@ -1,164 +1,424 @@
-"""Generate test cases for the MST Problem"""
-import sys
+"""Generate test cases for the MST Problem
+
+The edges are streamed to the output file as they are generated, and every
+edge gets a distinct weight from an injective hash of its index, so that no
+list of candidate weights is ever built. Runs with the same seed generate the
+same graph.
+"""
+import math
 import random
+import argparse
+from array import array
+from modules.graph import Graph, save_binary
+from modules.kruskals import Kruskals
+
+# Number of lines written to the text file at once
+CHUNK_SIZE = 1 << 16
+
+
+class UniqueWeights:
+    """Distinct integer weights, drawn as a bijective mix of a counter"""
+    def __init__(self, bound, rng):
+        """Ctor
+
+        Arguments:
+            bound {Integer} -- Maximum number of weights to be drawn
+            rng {Random} -- Random generator to draw the mixing constants from
+        """
+        self.bits = max(2, (bound - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shift = self.bits // 2 + 1
+        # Odd multipliers are invertible modulo a power of two
+        self.mul1 = rng.getrandbits(self.bits) | 1
+        self.mul2 = rng.getrandbits(self.bits) | 1
+        self.offset = rng.getrandbits(self.bits)
+        self.count = 0
+
+    def next(self):
+        """Draw the next weight
+
+        Returns:
+            Integer -- Weight, distinct from all the weights drawn before
+        """
+        # Every step is a bijection on integers of the given number of bits
+        x = (self.count * self.mul1 + self.offset) & self.mask
+        x ^= x >> self.shift
+        x = (x * self.mul2) & self.mask
+        x ^= x >> self.shift
+        self.count += 1
+        return 5 + x
+
 
+class EdgeWriter:
+    """Write the edges of a graph to a file as they are generated"""
+    def __init__(self, path, num_nodes, file_format, rng):
+        """Ctor
+
+        Arguments:
+            path {String} -- Path of the output file
+            num_nodes {Integer} -- Number of nodes in the graph
+            file_format {String} -- Format of the output file - text/binary
+            rng {Random} -- Random generator for the weights
+        """
+        self.path = path
+        self.num_nodes = num_nodes
+        self.file_format = file_format
+        self.weights = UniqueWeights(max(1, num_nodes * (num_nodes - 1) // 2),
+                                     rng)
+        self.num_edges = 0
+        if file_format == 'text':
+            self.file = open(path, 'w')
+            self.file.write(str(num_nodes) + '\n')
+            self.lines = []
+        else:
+            # The CSR adjacency needs all the edges, keep them compactly
+            self.node1 = array('i')
+            self.node2 = array('i')
+            self.edge_weights = array('d')
+
+    def add(self, node1, node2):
+        """Add an edge between two nodes, with a new unique weight
+
+        Arguments:
+            node1 {Integer}
+            node2 {Integer}
+        """
+        weight = self.weights.next()
+        self.num_edges += 1
+        if self.file_format == 'text':
+            self.lines.append('(' + str(node1) + ', ' + str(node2) + ', ' +
+                              str(weight) + ')\n')
+            if len(self.lines) >= CHUNK_SIZE:
+                self.file.writelines(self.lines)
+                self.lines = []
+        else:
+            self.node1.append(node1)
+            self.node2.append(node2)
+            self.edge_weights.append(weight)
+
+    def close(self):
+        """Write the remaining edges and close the file"""
+        if self.file_format == 'text':
+            self.file.writelines(self.lines)
+            self.file.close()
+        else:
+            save_binary(
+                Graph(self.num_nodes, self.node1, self.node2,
+                      self.edge_weights), self.path)
+
+
+def join(components, node1, node2):
+    """Merge the components of two nodes joined by an edge
 
-def write_to_file(num_nodes, edges, graph_type):
-    """Write the edges on the input file
-    
     Arguments:
-        num_nodes {Integer} -- Number of nodes in the graph
-        edges {List} -- List of edges with unique edges
-        graph_type {String} -- Mention in the file name
+        components {Kruskals} -- Union-find of the edges added so far
+        node1 {Integer}
+        node2 {Integer}
     """
-    # Write into input file
-    filename = 'files/inp-' + str(num_nodes) + '-' + graph_type + '.txt'
-    with open(filename, 'w') as file:
-        file.write(str(num_nodes) + '\n')
-        for edge in edges:
-            file.write(str(edge) + '\n')
+    parent1 = components.get_parent(node1)
+    parent2 = components.get_parent(node2)
+    if parent1 != parent2:
+        components.union(parent1, parent2)
+
 
+def connect_components(num_nodes, components, writer):
+    """Add an edge between consecutive components, so that the graph is
+    connected
 
-def generate_random(num_nodes):
-    """Generate a random connected graph with unique weight edges
-    
     Arguments:
-        num_nodes {Integer}
+        num_nodes {Integer} -- Number of nodes in the graph
+        components {Kruskals} -- Union-find of the edges added so far
+        writer {EdgeWriter} -- Writer of the edges
     """
-    nodes = list(range(num_nodes))  # List of all nodes
-    added = [0]  # List of nodes added in the connected graph
-
-    edges = []  # Store edges for the connected graph
-    weights = list(range(5, (num_nodes * num_nodes) // 2))
-    random.shuffle(weights)
-    for node in nodes[1:]:
-        # Decide number of edges
-        num_edges = random.randint(1, len(added))
-        temp = added.copy()
+    roots = [
+        node for node in range(num_nodes)
+        if components.get_parent(node) == node
+    ]
+    for _in in range(len(roots) - 1):
+        writer.add(roots[_in], roots[_in + 1])
 
-        for _ in range(num_edges):
-            end = random.choice(temp)
-            weight = random.choice(weights)
 
-            edges.append((node, end, weight))
-            temp.remove(end)
-            weights.remove(weight)
+def generate_random(num_nodes, rng, writer):
+    """Generate a random connected graph, where each node is joined to a
+    random number of the nodes before it
 
-        # Add the current node in the graph too
-        added.append(node)
+    Arguments:
+        num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+    """
+    for node in range(1, num_nodes):
+        # Decide number of edges
+        num_edges = rng.randint(1, node)
+        for end in rng.sample(range(node), num_edges):
+            writer.add(node, end)
 
-    write_to_file(num_nodes, edges, 'random')
 
+def generate_connected(num_nodes, rng, writer):
+    """Generate a fully connected graph
 
-def generate_connected(num_nodes):
-    """Generate a fully connected random graph with unique edge weights
-    
     Arguments:
         num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
     """
-    edges = []
-    weights = list(range(5, (num_nodes * num_nodes) // 2))
-    random.shuffle(weights)
     for _in in range(num_nodes):
         for _jn in range(_in + 1, num_nodes):
-            weight = random.choice(weights)
-            edges.append((_in, _jn, weight))
-            weights.remove(weight)
+            writer.add(_in, _jn)
 
-    write_to_file(num_nodes, edges, 'connected')
 
+def generate_tree(num_nodes, rng, writer, max_branches=4):
+    """Generate a random tree
 
-def generate_tree(num_nodes):
-    """Generate a tree with unique branch weights
-    
     Arguments:
         num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+
+    Keyword Arguments:
+        max_branches {Integer} -- Maximum number of children of a node
+                                  (default: {4})
     """
     queue = [0]
-    max_branches = 4
     count = 1
-    edges = []
-    weights = list(range(5, (num_nodes * num_nodes) // 2))
-    random.shuffle(weights)
-    print(len(weights))
-    flag = False
-    while not flag:
+    while count < num_nodes:
         node = queue.pop()
-        neighbours = random.randint(1, max_branches)
-        for neighbour in range(neighbours):
-            weight = random.choice(weights)
+        neighbours = rng.randint(1, max_branches)
+        for _ in range(min(neighbours, num_nodes - count)):
             queue.append(count)
-            edges.append((node, count, weight))
-
-            weights.remove(weight)
+            writer.add(node, count)
             count += 1
-            if count == num_nodes:
-                flag = True
-                break
 
-        if flag:
-            break
 
-    write_to_file(num_nodes, edges, 'tree')
+def generate_linear(num_nodes, rng, writer):
+    """Generate a path through all the nodes in a random order
 
-
-def generate_linear(num_nodes):
-    """Generate a linear tree with unique edge weights
-    
     Arguments:
         num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
     """
-    edges = []
-    weights = list(range(5, (num_nodes * num_nodes) // 2))
     nodes = list(range(num_nodes))
-    random.shuffle(weights)
-    random.shuffle(nodes)
+    rng.shuffle(nodes)
     for _in in range(num_nodes - 1):
-        weight = random.choice(weights)
-        edges.append((nodes[_in], nodes[_in + 1], weight))
-        weights.remove(weight)
+        writer.add(nodes[_in], nodes[_in + 1])
+
 
-    write_to_file(num_nodes, edges, 'linear')
+def generate_ring(num_nodes, rng, writer):
+    """Generate a ring through all the nodes in a random order
 
-def generate_ring(num_nodes):
-    """Generate a ring graph with unique edge weights
-    
     Arguments:
         num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
     """
-    edges = []
-    weights = list(range(5, (num_nodes * num_nodes) // 2))
     nodes = list(range(num_nodes))
-    random.shuffle(weights)
-    random.shuffle(nodes)
+    rng.shuffle(nodes)
     for _in in range(num_nodes - 1):
-        weight = random.choice(weights)
-        edges.append((nodes[_in], nodes[_in + 1], weight))
-        weights.remove(weight)
+        writer.add(nodes[_in], nodes[_in + 1])
 
     # Add the final edge
-    weight = random.choice(weights)
-    edges.append((nodes[-1], nodes[0], weight))
+    if num_nodes > 2:
+        writer.add(nodes[-1], nodes[0])
+
+
+def generate_grid(num_nodes, rng, writer):
+    """Generate a 2D grid, as square as possible, the last row being partial
+
+    Arguments:
+        num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+    """
+    cols = max(1, math.isqrt(num_nodes))
+    for node in range(num_nodes):
+        if (node + 1) % cols != 0 and node + 1 < num_nodes:
+            writer.add(node, node + 1)
+        if node + cols < num_nodes:
+            writer.add(node, node + cols)
+
+
+def generate_geometric(num_nodes, rng, writer, radius=None):
+    """Generate a random geometric graph, joining the random points of the
+    unit square which are closer than the radius. Components left apart are
+    then joined to make the graph connected
+
+    Arguments:
+        num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+
+    Keyword Arguments:
+        radius {Float} -- Radius, defaults to 1.5 times the connectivity
+                          threshold (default: {None})
+    """
+    if radius is None:
+        radius = 1.5 * math.sqrt(
+            math.log(max(num_nodes, 2)) / (math.pi * num_nodes))
+    xs = array('d', (rng.random() for _ in range(num_nodes)))
+    ys = array('d', (rng.random() for _ in range(num_nodes)))
+
+    # Bucket the points in cells of the size of the radius, so that only the
+    # points of the neighbouring cells are compared
+    cells = {}
+    for node in range(num_nodes):
+        cell = (int(xs[node] / radius), int(ys[node] / radius))
+        cells.setdefault(cell, []).append(node)
+
+    components = Kruskals(num_nodes)
+    radius2 = radius * radius
+    for (cx, cy), nodes in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                others = cells.get((cx + dx, cy + dy))
+                if others is None:
+                    continue
+                for node in nodes:
+                    for other in others:
+                        if other <= node:
+                            continue
+                        dist2 = (xs[node] - xs[other])**2 + (ys[node] -
+                                                             ys[other])**2
+                        if dist2 < radius2:
+                            writer.add(node, other)
+                            join(components, node, other)
+    connect_components(num_nodes, components, writer)
 
-    write_to_file(num_nodes, edges, 'ring')
 
+def generate_erdos(num_nodes, rng, writer, density=None):
+    """Generate an Erdos-Renyi graph, where each pair of nodes is joined with
+    the given probability. Pairs are skipped geometrically, so that the time
+    is linear in the number of edges. Components left apart are then joined
+    to make the graph connected
+
+    Arguments:
+        num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+
+    Keyword Arguments:
+        density {Float} -- Probability of each edge, defaults to twice the
+                           connectivity threshold (default: {None})
+    """
+    if density is None:
+        density = min(1.0, 2 * math.log(max(num_nodes, 2)) / num_nodes)
+    if density >= 1:
+        generate_connected(num_nodes, rng, writer)
+        return
+
+    components = Kruskals(num_nodes)
+    if density > 0:
+        log_q = math.log(1 - density)
+        node = 1
+        end = -1
+        while node < num_nodes:
+            end += 1 + int(math.log(1 - rng.random()) / log_q)
+            while end >= node and node < num_nodes:
+                end -= node
+                node += 1
+            if node < num_nodes:
+                writer.add(node, end)
+                join(components, node, end)
+    connect_components(num_nodes, components, writer)
+
+
+def generate_powerlaw(num_nodes, rng, writer, degree=2):
+    """Generate a graph with a power-law degree distribution by preferential
+    attachment (Barabasi-Albert), each new node being joined to the given
+    number of existing nodes
+
+    Arguments:
+        num_nodes {Integer}
+        rng {Random} -- Random generator
+        writer {EdgeWriter} -- Writer of the edges
+
+    Keyword Arguments:
+        degree {Integer} -- Number of edges of each new node (default: {2})
+    """
+    # Start with a clique, every node of which is a possible target
+    seed_nodes = min(num_nodes, degree + 1)
+    generate_connected(seed_nodes, rng, writer)
+
+    # A node appears in the list once for each of its edges, so that a
+    # uniform pick from the list is proportional to the degree
+    ends = array('i')
+    for node in range(seed_nodes):
+        ends.extend([node] * (seed_nodes - 1))
+
+    for node in range(seed_nodes, num_nodes):
+        targets = set()
+        while len(targets) < degree:
+            targets.add(ends[rng.randrange(len(ends))])
+        for target in targets:
+            writer.add(node, target)
+            ends.append(target)
+        ends.extend([node] * degree)
+
+
+GENERATORS = {
+    'random': generate_random,
+    'connected': generate_connected,
+    'tree': generate_tree,
+    'linear': generate_linear,
+    'ring': generate_ring,
+    'grid': generate_grid,
+    'geometric': generate_geometric,
+    'erdos': generate_erdos,
+    'powerlaw': generate_powerlaw,
+}
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print('To run the file: python generate.py <num-nodes-to-generate> ' +
-              '<graph-type (tree/connected/linear/random/ring)>')
-        sys.exit()
-
-    num_nodes = int(sys.argv[1])
-    gen_type = sys.argv[2]
-    print(gen_type)
-    if gen_type == 'linear':
-        generate_linear(num_nodes)
-    elif gen_type == 'tree':
-        generate_tree(num_nodes)
-    elif gen_type == 'connected':
-        generate_connected(num_nodes)
-    elif gen_type == 'ring':
-        generate_ring(num_nodes)
-    else:
-        generate_random(num_nodes)
+    parser = argparse.ArgumentParser(
+        description='Generate a graph with unique edge weights')
+    parser.add_argument('num_nodes',
+                        type=int,
+                        help='num-nodes-to-generate')
+    parser.add_argument('graph_type',
+                        choices=list(GENERATORS),
+                        help='graph-type')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=None,
+                        help='seed of the generator, random if not given')
+    parser.add_argument('--format',
+                        choices=['text', 'binary'],
+                        default='text',
+                        help='format of the output file, binary writes the ' +
+                        'memory-mapped CSR format of modules/graph.py')
+    parser.add_argument('--output',
+                        default=None,
+                        help='path of the output file, defaults to ' +
+                        'files/inp-<num-nodes>-<graph-type>.txt (or .bin)')
+    parser.add_argument('--density',
+                        type=float,
+                        default=None,
+                        help='edge probability of the erdos graphs')
+    parser.add_argument('--radius',
+                        type=float,
+                        default=None,
+                        help='radius of the geometric graphs')
+    parser.add_argument('--degree',
+                        type=int,
+                        default=2,
+                        help='edges of each new node of the powerlaw graphs')
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        extension = '.txt' if args.format == 'text' else '.bin'
+        output = 'files/inp-' + str(args.num_nodes) + '-' + \
+            args.graph_type + extension
+
+    rng = random.Random(args.seed)
+    writer = EdgeWriter(output, args.num_nodes, args.format, rng)
+    options = {}
+    if args.graph_type == 'erdos':
+        options['density'] = args.density
+    elif args.graph_type == 'geometric':
+        options['radius'] = args.radius
+    elif args.graph_type == 'powerlaw':
+        options['degree'] = args.degree
+    GENERATORS[args.graph_type](args.num_nodes, rng, writer, **options)
+    writer.close()
+    print(output + ': ' + str(args.num_nodes) + ' nodes, ' +
+          str(writer.num_edges) + ' edges')
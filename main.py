@@ -1,169 +1,273 @@
 """Main file for spawning processes and running experiments"""
 import os
 import sys
-from node import Node
-from modules.utils import Edge, EdgeStatus
+import argparse
+from modules.graph import load_graph
+from modules.wake import POLICIES, plan_wakeup
 from modules.kruskals import Kruskals
-from multiprocessing import Process, Queue, Value, Array
+from modules.api import ENGINES, check_options, run_ghs
+from modules.checkpoint import Checkpointer, load_checkpoint
+from modules.stats import PhaseTimer, peak_rss, write_stats
+from modules.stats import summarize_counters, summarize_memory
+from modules.stats import write_memory_report
+from modules.results import graph_hash, family_of, record_run
+from modules import trace
 
-if len(sys.argv) != 4:
-    print('To run the file: python main.py <no-of-processes-to-wake-up> ' +
-          '<debug-level (basic/info/debug)> <path-to-input-file>')
-    sys.exit()
 
-wake_processes = int(sys.argv[1])
-debug_level = sys.argv[2]
-input_file = sys.argv[3]
+def build_parser():
+    """Build the parser of the command line
 
-
-def print_output(raw_edges, mst):
-    """Print the tree edges into the output file
-    
-    Arguments:
-        raw_edges {List} -- List of all edges
-        mst {List} -- List of indexes of the tree edges
-    
-    Returns:
-        Float -- Sum of weights of all the tree edges
-    """
-    tree_edges = []
-    tree_weight = 0
-    for _in in range(len(mst)):
-        in_mst = mst[_in]
-        if in_mst:
-            tree_edges.append(raw_edges[_in])
-
-    # Sort the tree edges according to their weights
-    tree_edges.sort(key=lambda x: float(x[2]))
-    for edge in tree_edges:
-        node1 = int(edge[0])
-        node2 = int(edge[1])
-        tree_weight += float(edge[2])
-        if node1 < node2:
-            print('(' + str(node1) + ', ' + str(node2) + ', ' +
-                  str(edge[2].strip()) + ')')
-        else:
-            print('(' + str(node2) + ', ' + str(node1) + ', ' +
-                  str(edge[2].strip()) + ')')
-
-    # Return the weight of the tree generated by the GHS Algorithm
-    return tree_weight
-
-
-def spawn_process(node_id, name, msg_q, wake_count, total_messages, mst):
-    """Spawn a new process for node with given name and adjacent edges
-    
-    Arguments:
-        node_id {Integer} -- Node Id
-        name {Float} -- Fragment Name, initially zero for all
-        msg_q {Multiprocessing Queue} -- Queue for the node
-        wake_count {Multiprocessing Value} -- Shared value of wake count
-        total_messages {Multiprocessing Value} -- Shared total messages value
-        mst {Multiprocessing Array} -- List of edge indexes
-    
     Returns:
-        Bool -- Whether the MST was completed or not
+        ArgumentParser -- Parser of the command line
     """
-    global wake_processes, debug_level, edges
-    node = Node(node_id, edges[node_id], name, msg_q, debug_level)
-
-    # Wake up certain processes.
-    # print(wake_count.value)
-    with wake_count.get_lock():
-        if wake_count.value < wake_processes:
-            wake_count.value += 1
-            node.wakeup()
-
-    node_messages = node.start_operation()
-    with total_messages.get_lock():
-        total_messages.value += node_messages
-
-    for edge in edges[node_id]:
-        if edge.get_status() == EdgeStatus.branch:
-            edge_id = edge.get_id()
-            # Check and update mst in a critical section
-            with mst.get_lock():
-                if not mst[edge_id]:
-                    mst[edge_id] = True
-
-
-# Read from the input file
-with open(input_file) as file:
-    contents = file.readlines()
-contents = [x.strip() for x in contents]
-
-num_nodes = int(contents[0])
-raw_edges = []
-for line in contents[1:]:
-    if len(line) > 1:
-        line = line[1:-1].split(',')
-        raw_edges.append(line)
-    else:
-        break
-
-# Check if wake processes is more than 10% of nodes or not
-if wake_processes < num_nodes // 10:
-    # print(
-    #     '[WARN]: Number of awake nodes is less than 10% of the total nodes.\n'
-    #     + '[INFO]: Raising number of awake processes to 10%')
-    wake_processes = num_nodes // 10
-
-# Attach a queue for each process
-queues = []
-for _ in range(num_nodes):
-    q = Queue()
-    queues.append(q)
-
-# Form edges for each node from the given input
-edges = []
-for _ in range(num_nodes):
-    edges.append([])
-
-edge_id = 0
-for raw_edge in raw_edges:
-    node1 = int(raw_edge[0])
-    node2 = int(raw_edge[1])
-    # Same edge_id for both edges between node1 and node2
-    edge1 = Edge(edge_id, node1, node2, float(raw_edge[2]), queues[node2])
-    edge2 = Edge(edge_id, node1, node2, float(raw_edge[2]), queues[node1])
-    edges[node1].append(edge1)
-    edges[node2].append(edge2)
-    edge_id += 1
-
-# Spawn processes for each node
-wake_count = Value('i', 0)
-total_messages = Value('i', 0)
-mst = Array('b', [False] * (edge_id + 1))
-processes = []
-for node_id in range(num_nodes):
-    p = Process(target=spawn_process,
-                args=(node_id, 0, queues[node_id], wake_count, total_messages,
-                      mst))
-    processes.append(p)
-    p.start()
-
-# Join processes before checking the output
-for p in processes:
-    p.join()
-
-mst = list(mst)
-assert mst.count(1) == num_nodes - 1
-
-# Check weight with the tree from kruskals algorithm as well
-weight = print_output(raw_edges, mst)
-k = Kruskals(num_nodes)
-k_weight = k.get_mst(raw_edges)
-
-assert weight == k_weight, '[CHECK]: Weights from Kruskals and GHS do not match'
-# print('[SUCCESS]: Completed Execution. MST Weight: ' + str(weight))
-
-# Write to file for plotting graph
-script_dir = sys.path[0]
-results_dir = script_dir + '/files'
-if not os.path.exists(results_dir):
-    os.makedirs(results_dir)
-
-with open(results_dir + '/results.txt', 'a') as f:
-    f.write(
-        str(input_file) + ', ' + str(total_messages.value) + ', ' +
-        str(num_nodes) + ', ' + str(len(raw_edges)) + '\n')
+    parser = argparse.ArgumentParser(
+        description='Compute the MST of the input graph using the GHS ' +
+        'Algorithm')
+    parser.add_argument('wake_processes',
+                        type=int,
+                        help='no-of-processes-to-wake-up')
+    parser.add_argument('debug_level', help='debug-level (basic/info/debug)')
+    parser.add_argument('input_file', help='path-to-input-file')
+    parser.add_argument('--engine',
+                        choices=ENGINES,
+                        default='process',
+                        help='process: one OS process per node, simulate: ' +
+                        'all nodes in a single process with a deterministic ' +
+                        'event scheduler, sharded: nodes split across a ' +
+                        'pool of worker processes, threads/asyncio: one ' +
+                        'thread or asyncio task per node in a single ' +
+                        'process, tcp: nodes split across hosts connected ' +
+                        'over TCP, boruvka: the synchronous Boruvka ' +
+                        'algorithm in rounds, on a pool of worker processes')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='seed for choosing the nodes to wake up and ' +
+                        'the message delays of the simulate engine')
+    parser.add_argument('--wake-policy',
+                        choices=POLICIES,
+                        default='random',
+                        help='nodes to wake up, random: a seeded sample of ' +
+                        'wake_processes nodes, raised to 10%% of the nodes, ' +
+                        'all: every node, fraction: a seeded sample of ' +
+                        '--wake-fraction of the nodes, set: the nodes of ' +
+                        '--wake-nodes, staggered: a seeded sample of ' +
+                        'wake_processes nodes woken one after the other ' +
+                        'every --wake-interval, degree: a sample of ' +
+                        'wake_processes nodes drawn in proportion to their ' +
+                        'degree')
+    parser.add_argument('--wake-fraction',
+                        type=float,
+                        default=0.1,
+                        help='fraction of the nodes to wake up with the ' +
+                        'fraction policy')
+    parser.add_argument('--wake-nodes',
+                        default=None,
+                        help='nodes to wake up with the set policy, e.g. ' +
+                        '0-9,15')
+    parser.add_argument('--wake-interval',
+                        type=float,
+                        default=0.05,
+                        help='interval between the wake ups of the ' +
+                        'staggered policy, in seconds or in the virtual ' +
+                        'time of the simulate engine')
+    parser.add_argument('--transport',
+                        choices=['queue', 'shm'],
+                        default='queue',
+                        help='transport of the process engine, queue: ' +
+                        'multiprocessing queues, shm: shared memory ring ' +
+                        'buffers')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='number of workers for the sharded and ' +
+                        'boruvka engines, or of local hosts for the tcp ' +
+                        'engine without a placement file, defaults to the ' +
+                        'number of cores')
+    parser.add_argument('--placement',
+                        default=None,
+                        help='placement file of the nodes on the hosts for ' +
+                        'the tcp engine')
+    parser.add_argument('--host-index',
+                        type=int,
+                        default=None,
+                        help='only run this host of the placement file, the ' +
+                        'result is printed by host 0')
+    parser.add_argument('--stats',
+                        default=None,
+                        help='path of a JSON file to write the wall time of ' +
+                        'each phase, the peak RSS and the number of ' +
+                        'messages to')
+    parser.add_argument('--memory-report',
+                        action='store_true',
+                        help='print the peak RSS of each worker, the ' +
+                        'high-water marks of the inboxes of the nodes and ' +
+                        'the bytes sent over the edges to stderr')
+    parser.add_argument('--results',
+                        default=None,
+                        help='path of the SQLite store to record the run ' +
+                        'in, defaults to files/results.db')
+    parser.add_argument('--result',
+                        default=None,
+                        help='path of a binary file to write the tree ' +
+                        'edges, the parent and the level of each node to')
+    parser.add_argument('--trace',
+                        default=None,
+                        help='directory to write a binary trace of the ' +
+                        'events of the nodes to, merged by python -m ' +
+                        'modules.trace')
+    parser.add_argument('--checkpoint',
+                        default=None,
+                        help='directory to write a snapshot of the run to ' +
+                        'at every --checkpoint-interval, for the simulate, ' +
+                        'sharded and tcp engines')
+    parser.add_argument('--checkpoint-interval',
+                        type=float,
+                        default=60,
+                        help='interval between two snapshots, in seconds')
+    parser.add_argument('--resume',
+                        default=None,
+                        help='checkpoint directory to resume the run from, ' +
+                        'with any of the simulate, sharded and tcp engines')
+    return parser
+
+
+def main():
+    """Run the GHS Algorithm on the input file given on the command line,
+    verify the tree with Kruskal's algorithm and record the results"""
+    parser = build_parser()
+    args = parser.parse_args()
+    wake_processes = args.wake_processes
+    debug_level = args.debug_level
+    input_file = args.input_file
+
+    # Read from the input file, either in the text or the binary format
+    timer = PhaseTimer()
+    if args.trace is not None:
+        trace.enable(args.trace)
+    graph = load_graph(input_file)
+    num_nodes = graph.num_nodes
+    # Identifies the graph to the results store and to the checkpoints
+    digest = graph_hash(graph)
+    timer.mark('load')
+
+    # Check if wake processes is more than 10% of nodes or not, for the
+    # default policy only
+    if args.wake_policy == 'random' and wake_processes < num_nodes // 10:
+        # print(
+        #     '[WARN]: Number of awake nodes is less than 10% of the total ' +
+        #     'nodes.\n[INFO]: Raising number of awake processes to 10%')
+        wake_processes = num_nodes // 10
+
+    # Choose the nodes to wake up once, for all the engines
+    checkpoint = args.checkpoint is not None or args.resume is not None
+    try:
+        wake_plan = plan_wakeup(graph, args.wake_policy, wake_processes,
+                                args.seed, args.wake_fraction,
+                                args.wake_nodes, args.wake_interval)
+        check_options(args.engine, wake_plan, args.transport, checkpoint)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Resume from the latest complete snapshot, and keep taking snapshots
+    # after it
+    checkpointer = None
+    resume = None
+    if args.resume is not None:
+        try:
+            resume = load_checkpoint(args.resume, num_nodes, digest)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if args.checkpoint is not None:
+        first_id = 1 if resume is None else resume.snapshot_id + 1
+        checkpointer = Checkpointer(args.checkpoint, args.checkpoint_interval,
+                                    num_nodes, digest, first_id)
+        checkpointer.clear()
+
+    returned = run_ghs(graph, args.engine, wake_plan, debug_level, args.seed,
+                       args.workers, args.transport, args.placement,
+                       args.host_index, None, timer, checkpointer, resume)
+    if returned is None:
+        # Only host 0 of the tcp engine checks and reports the result
+        return
+    total_messages, result, counters = returned
+
+    timer.mark('protocol')
+    trace.flush()
+    assert len(result.edge_ids) == num_nodes - 1
+
+    # Check the tree edges with the tree from kruskals algorithm as well,
+    # which is the same tree as the weights are distinct
+    result.write_text(graph, sys.stdout)
+    if args.result is not None:
+        result.write_binary(args.result)
+    tree_edges = set(result.edge_ids)
+    k = Kruskals(num_nodes)
+    k_edges = k.get_mst(graph)
+
+    assert tree_edges == k_edges, \
+        '[CHECK]: Edges from Kruskals and GHS do not match'
+    timer.mark('verify')
+    # print('[SUCCESS]: Completed Execution. MST Weight: ' +
+    #       str(result.weight))
+
+    # Record the run in the results store, queried by modules/plot.py
+    results_path = args.results
+    if results_path is None:
+        results_dir = sys.path[0] + '/files'
+        if not os.path.exists(results_dir):
+            os.makedirs(results_dir)
+        results_path = results_dir + '/results.db'
+    summary = summarize_counters(counters, num_nodes, graph.num_edges)
+    memory = summarize_memory(counters, graph.num_edges)
+    rss, children_rss = peak_rss()
+    run = {
+        'graph_hash': digest,
+        'input': input_file,
+        'family': family_of(input_file),
+        'num_nodes': num_nodes,
+        'num_edges': graph.num_edges,
+        'engine': args.engine,
+        'transport': args.transport,
+        'workers': args.workers,
+        'wake_policy': args.wake_policy,
+        'wake_processes': len(wake_plan),
+        'seed': args.seed,
+        'total_messages': total_messages,
+        'deferred': sum(summary['deferred'].values()),
+        'critical_path': summary['critical_path'],
+        'peak_rss_kb': rss,
+        'peak_children_rss_kb': children_rss,
+        'messages': summary,
+    }
+    run.update(timer.phases)
+    record_run(results_path, run)
+
+    if args.stats is not None:
+        write_stats(
+            args.stats, {
+                'input': input_file,
+                'engine': args.engine,
+                'transport': args.transport,
+                'num_nodes': num_nodes,
+                'num_edges': graph.num_edges,
+                'wake_policy': args.wake_policy,
+                'wake_processes': len(wake_plan),
+                'seed': args.seed,
+                'total_messages': total_messages,
+                'messages': summary,
+                'memory': memory,
+                'phases': timer.phases,
+                'peak_rss_kb': rss,
+                'peak_children_rss_kb': children_rss,
+            })
+
+    # The peak RSS of the process engine is sampled by each node, and by
+    # each worker or host of the other engines running on several processes
+    if args.memory_report:
+        rss_of = {'process': 'node', 'tcp': 'host'}.get(args.engine, 'worker')
+        write_memory_report(memory, rss, rss_of, sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
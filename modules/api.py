@@ -0,0 +1,139 @@
+"""Importable entry point running the GHS Algorithm with any of the engines,
+as main.py does on a single input file:
+
+    from modules.api import run_ghs
+    total_messages, result, counters = run_ghs('files/inp-100-random.txt',
+                                               engine='sharded', wake=10)
+
+The result is an MSTResult (modules/result.py). To run many graphs without
+spawning processes for each of them, a WorkerPool (modules/pool.py) is handed
+to run_ghs, which then runs the sharded engine, or its map method is used
+directly.
+"""
+from modules.graph import load_graph
+from modules.wake import as_plan
+from modules.processes import run_processes
+from modules.simulator import run_simulation
+from modules.sharded import run_sharded
+from modules.inprocess import run_threads, run_asyncio
+from modules.tcp_transport import run_tcp
+from modules.boruvka import run_boruvka
+
+ENGINES = [
+    'process', 'simulate', 'sharded', 'threads', 'asyncio', 'tcp', 'boruvka'
+]
+CHECKPOINT_ENGINES = ['simulate', 'sharded', 'tcp']
+
+
+def check_options(engine, wake_plan, transport='queue', checkpoint=False,
+                  pool=None):
+    """Check that the engine supports the options of a run, before starting
+    it
+
+    Arguments:
+        engine {String} -- One of ENGINES
+        wake_plan {WakePlan} -- Nodes to wake up
+
+    Keyword Arguments:
+        transport {String} -- Transport of the process engine
+                              (default: {'queue'})
+        checkpoint {Bool} -- Whether the run takes or resumes from snapshots
+                             (default: {False})
+        pool {WorkerPool} -- Pool of workers to run on (default: {None})
+
+    Raises:
+        ValueError: If the options are not supported
+    """
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine ' + str(engine))
+    if engine == 'process' and transport == 'shm' and wake_plan.delayed():
+        raise ValueError(
+            'staggered wake up is not supported by the shm transport')
+    if checkpoint and engine not in CHECKPOINT_ENGINES:
+        raise ValueError('checkpoints are supported by the simulate, ' +
+                         'sharded and tcp engines')
+    if pool is not None and (engine != 'sharded' or checkpoint):
+        raise ValueError('a worker pool runs the sharded engine, without ' +
+                         'checkpoints')
+
+
+def run_ghs(graph,
+            engine=None,
+            wake=None,
+            debug_level='basic',
+            seed=0,
+            workers=None,
+            transport='queue',
+            placement=None,
+            host_index=None,
+            pool=None,
+            timer=None,
+            checkpointer=None,
+            resume=None):
+    """Run the GHS Algorithm on a graph
+
+    Arguments:
+        graph {Object} -- Graph, or path of a graph in the text or the binary
+                          format
+
+    Keyword Arguments:
+        engine {String} -- One of ENGINES, sharded if a pool is given and
+                           simulate otherwise when None (default: {None})
+        wake {Object} -- Nodes to wake up, as accepted by as_plan
+                         (default: {None})
+        debug_level {String} -- Debug Level - basic/info/debug
+                                (default: {'basic'})
+        seed {Integer} -- Seed of the nodes woken up at random and of the
+                          message delays of the simulate engine
+                          (default: {0})
+        workers {Integer} -- Number of workers of the sharded and boruvka
+                             engines, or of local hosts of the tcp engine
+                             (default: {None})
+        transport {String} -- Transport of the process engine, queue or shm
+                              (default: {'queue'})
+        placement {String} -- Placement file of the tcp engine
+                              (default: {None})
+        host_index {Integer} -- Only run this host of the placement file
+                                (default: {None})
+        pool {WorkerPool} -- If given, the sharded engine runs on the warm
+                             workers of this pool (default: {None})
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+        checkpointer {Checkpointer} -- If given, the run is snapshot at its
+                                       interval (default: {None})
+        resume {Checkpoint} -- If given, the run resumes from this snapshot
+                               (default: {None})
+
+    Raises:
+        ValueError: If the nodes to wake up or the options are not valid
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes, or None on a tcp host other than host 0
+    """
+    if isinstance(graph, str):
+        graph = load_graph(graph)
+    if engine is None:
+        engine = 'sharded' if pool is not None else 'simulate'
+    wake_plan = as_plan(graph, wake, seed)
+    check_options(engine, wake_plan, transport,
+                  checkpointer is not None or resume is not None, pool)
+
+    if pool is not None:
+        return pool.run(graph, wake_plan, debug_level, timer)
+    if engine == 'simulate':
+        return run_simulation(graph, wake_plan, debug_level, seed, timer,
+                              checkpointer, resume)
+    if engine == 'sharded':
+        return run_sharded(graph, wake_plan, debug_level, workers, timer,
+                           checkpointer, resume)
+    if engine == 'tcp':
+        return run_tcp(graph, wake_plan, debug_level, placement, workers,
+                       host_index, timer, checkpointer, resume)
+    if engine == 'threads':
+        return run_threads(graph, wake_plan, debug_level, timer)
+    if engine == 'asyncio':
+        return run_asyncio(graph, wake_plan, debug_level, timer)
+    if engine == 'boruvka':
+        return run_boruvka(graph, wake_plan, debug_level, workers, timer)
+    return run_processes(graph, wake_plan, debug_level, transport, timer)
@@ -0,0 +1,541 @@
+"""Synchronous Boruvka engine, a round-based alternative to the GHS Algorithm.
+
+The nodes run in lock step, in rounds: in each round, every node processes
+the messages sent to it in the previous round, and the messages it sends are
+delivered in the next one. Each phase merges every fragment along its
+minimum outgoing edge, as in Boruvka's algorithm, in three steps, a step
+ending once a round goes by without any message sent by any node:
+
+    initiate    the root of each fragment sends its level and name (its own
+                node id) down the branches, each node taking the edge it came
+                from as its father
+    test        each node tests its basic edges in order of weight, till one
+                is accepted by a node of another fragment. Both ends of an
+                edge inside the fragment reject it for good
+    report      the best edge found is reported up to the root, which either
+                sends changeroot down to the node holding it, which sends
+                connect over it, or sends halt down the tree if there is no
+                outgoing edge left
+
+As all the nodes of a fragment have the same name by the time any node
+tests, no message ever has to be deferred, unlike the GHS Algorithm. The
+fragments merged along their minimum outgoing edges form a tree holding a
+single edge chosen from both of its ends, whose lower end node is the root of
+the next phase. All the nodes start in the test step of phase 0, as fragments
+of their own; the nodes of the wake up plan start testing in the first round,
+whatever their delay, and every other node when its first message arrives, or
+at the start of the next phase.
+
+The nodes are split across workers as for the sharded engine, and a worker
+sends a single batch to each other worker in every round, possibly empty, so
+that the batches double as the barrier between two rounds. Each batch also
+carries the number of messages sent and the number of nodes still running on
+its worker, from which every worker decides on its own when a step ends and
+when the run is over.
+"""
+import os
+import sys
+from array import array
+from collections import deque
+from multiprocessing import Process, Queue
+from node import print_level, set_debug_level
+from modules.utils import EdgeStatus, Message, build_edges
+from modules.sharded import LocalQueue, RemoteQueue, QueueChannel, shard_of
+from modules.sharded import count_queued
+from modules.stats import SENT, LEVELS, CLOCKS, TOP_DEPTHS, TOP_RSS
+from modules.stats import new_counters, add_counters, record_completion
+from modules.stats import record_top, peak_rss
+from modules.result import node_records, collect_records
+from modules import trace
+from modules.trace import SEND, RECEIVE
+
+INF = sys.maxsize
+
+# Steps of a phase
+INITIATE = 0
+TEST = 1
+REPORT = 2
+
+
+class BoruvkaNode:
+    """Node taking part in the synchronous Boruvka phases"""
+    def __init__(self, node_id, edges, msg_q, dl):
+        """Ctor
+
+        Arguments:
+            node_id {Integer} -- Node Id
+            edges {Adjacency} -- Edges of the node, sorted by weight
+            msg_q {Object} -- Queue from which the node reads
+            dl {String} -- Debug Level - basic/info/debug
+        """
+        self.node_id = node_id
+        self.msg_q = msg_q
+        self.awake = False
+        self.level = 0
+        self.name = node_id
+        self.step = TEST
+
+        self.father = -1  # Index of the edge along the father of the node
+        self.edges = edges
+        self.status = edges.status
+        self.weights = edges.weights
+        self.num_neighbors = len(edges)
+        self.edge_index = {}
+        for _in in range(self.num_neighbors):
+            self.edge_index[edges.ids[_in]] = _in
+        self.basic_cursor = 0
+        self.branches = []
+
+        # Search for the minimum outgoing edge of the phase
+        self.test_edge = -1
+        self.best_edge = -1
+        self.best_weight = INF
+        self.rec = 0
+        self.children = 0
+        # Edge this node sent connect over, and edges it received connect on
+        self.connect_edge = -1
+        self.connected = set()
+
+        self.completed = False
+        self.num_messages = 0
+        self.counters = new_counters()
+        # Length of the longest causal chain of messages reaching the node
+        self.clock = 0
+        # Messages sent over each edge
+        self.sent_on = array('q', bytes(8 * len(edges)))
+        self.outbox = {}
+        set_debug_level(dl)
+
+    def __edge_stub(self, edge_index, message, payload=[]):
+        """Add a message for the given edge to the outbox
+
+        Arguments:
+            edge_index {Integer} -- Index of the edge
+            message {Message} -- Message
+            payload {List} -- Attached Payload
+        """
+        if trace.tracer is not None:
+            trace.tracer.record(SEND, self.node_id, self.edges.ids[edge_index],
+                                message, self.level)
+        self.num_messages += 1
+        self.counters[SENT + message] += 1
+        self.counters[LEVELS + self.level] += 1
+        clock = self.clock + 1
+        if clock > self.counters[CLOCKS + self.level]:
+            self.counters[CLOCKS + self.level] = clock
+        self.sent_on[edge_index] += 1
+        queue = self.edges.queue(edge_index)
+        msg = self.edges.pack(edge_index, message, payload, clock)
+        batch = self.outbox.get(queue)
+        if batch is None:
+            self.outbox[queue] = [msg]
+        else:
+            batch.append(msg)
+
+    def flush(self):
+        """Write the messages collected in the outbox, as a single batch for
+        each destination queue"""
+        if self.outbox:
+            outbox = self.outbox
+            self.outbox = {}
+            for queue in outbox:
+                queue.put(outbox[queue])
+
+    def __change_edge_status(self, edge_index, status):
+        """Change the status of the edge with given index
+
+        Arguments:
+            edge_index {Integer} -- Index of the edge
+            status {EdgeStatus} -- Updated status of the edge
+        """
+        if status == EdgeStatus.branch and \
+                self.status[edge_index] != EdgeStatus.branch:
+            self.branches.append(edge_index)
+        self.status[edge_index] = status
+
+    def wakeup(self):
+        """Wake up as a fragment of its own, and start testing in the test
+        step"""
+        print_level('info', self.node_id, 'Wake up node')
+        self.awake = True
+        if self.step == TEST:
+            self.__test()
+
+    def next_step(self, step):
+        """Start a step of the phase, once no message is in flight anymore
+
+        Arguments:
+            step {Integer} -- INITIATE, TEST or REPORT
+        """
+        self.step = step
+        if self.completed:
+            return
+        if step == INITIATE:
+            # A node left asleep, in another component, is a fragment of its
+            # own
+            self.awake = True
+            edge = self.connect_edge
+            if not self.branches or (edge in self.connected
+                                     and self.node_id < self.edges.neighbors[
+                                         edge]):
+                # The lower end node of the edge chosen from both ends is the
+                # root of the merged fragment
+                self.father = -1
+                self.level += 1
+                self.name = self.node_id
+                for _in in self.branches:
+                    self.__edge_stub(_in, Message.initiate,
+                                     [self.level, self.name])
+            self.connect_edge = -1
+            self.connected = set()
+        elif step == TEST:
+            self.test_edge = -1
+            self.best_edge = -1
+            self.best_weight = INF
+            if self.awake:
+                self.__test()
+        elif self.awake:
+            self.rec = 0
+            self.children = len(self.branches)
+            if self.father != -1:
+                self.children -= 1
+            self.__report()
+        self.flush()
+
+    def __test(self):
+        """Test the first basic edge, the edges being sorted by weight"""
+        while (self.basic_cursor < self.num_neighbors
+               and self.status[self.basic_cursor] != EdgeStatus.basic):
+            self.basic_cursor += 1
+        if self.basic_cursor < self.num_neighbors:
+            self.test_edge = self.basic_cursor
+            self.__edge_stub(self.test_edge, Message.test, [self.name])
+        else:
+            self.test_edge = -1
+
+    def __report(self):
+        """Report the best edge to the father once all the children have,
+        or act on it at the root"""
+        if self.rec != self.children:
+            return
+        if self.father != -1:
+            self.__edge_stub(self.father, Message.report, [self.best_weight])
+        elif self.best_weight == INF:
+            # No outgoing edge left, the tree is complete
+            self.__complete()
+        else:
+            self.__changeroot()
+
+    def __changeroot(self):
+        """Pass the decision down to the node holding the best edge, which
+        connects over it"""
+        # The other fragment may have connected over the best edge already
+        if self.status[self.best_edge] == EdgeStatus.branch and \
+                self.best_edge not in self.connected:
+            self.__edge_stub(self.best_edge, Message.changeroot)
+        else:
+            self.__edge_stub(self.best_edge, Message.connect, [self.level])
+            self.__change_edge_status(self.best_edge, EdgeStatus.branch)
+            self.connect_edge = self.best_edge
+
+    def __complete(self):
+        """Send halt down the tree, and stop"""
+        for _in in self.branches:
+            if _in != self.father:
+                self.__edge_stub(_in, Message.halt)
+        self.msg_q.close()
+        self.completed = True
+        record_completion(self.counters, self.node_id, self.sent_on,
+                          self.edges.neighbors)
+        print_level('info', self.node_id, 'Completed for this node')
+
+    def process_batch(self, batch, queued=0):
+        """Process the messages received in the previous round, and send the
+        messages produced meanwhile. An empty batch is a request to wake up,
+        if the node is still sleeping
+
+        Arguments:
+            batch {List} -- List of encoded messages
+
+        Keyword Arguments:
+            queued {Integer} -- Messages of the round still queued for the
+                                node behind the batch (default: {0})
+        """
+        if not batch:
+            if not self.awake:
+                self.wakeup()
+                self.flush()
+            return
+        if not self.awake:
+            self.wakeup()
+        # Nothing is deferred, so the inbox is the messages of the round
+        depth = len(batch) + queued
+        if depth > self.counters[TOP_DEPTHS]:
+            self.counters[TOP_DEPTHS] = depth
+            self.counters[TOP_DEPTHS + 1] = self.node_id
+        for msg in batch:
+            if self.completed:
+                break
+            edge_index = self.edge_index[msg[0]]
+            if trace.tracer is not None:
+                trace.tracer.record(RECEIVE, self.node_id, msg[0], msg[1],
+                                    self.level)
+            if msg[2] > self.clock:
+                self.clock = msg[2]
+            self.__dispatch(edge_index, msg[1], msg[3:])
+        self.flush()
+
+    def __dispatch(self, edge_index, message, pl):
+        """Process the message received on the given edge
+
+        Arguments:
+            edge_index {Integer} -- Index of the edge
+            message {Message} -- Message code
+            pl {Tuple} -- Attached Payload
+        """
+        if message == Message.initiate:
+            self.level = pl[0]
+            self.name = pl[1]
+            self.father = edge_index
+            for _in in self.branches:
+                if _in != edge_index:
+                    self.__edge_stub(_in, Message.initiate, pl)
+        elif message == Message.test:
+            if pl[0] != self.name:
+                self.__edge_stub(edge_index, Message.accept)
+            else:
+                if self.status[edge_index] == EdgeStatus.basic:
+                    self.__change_edge_status(edge_index, EdgeStatus.reject)
+                # Both ends testing the same edge take the test of the other
+                # end as its reject
+                if edge_index != self.test_edge:
+                    self.__edge_stub(edge_index, Message.reject)
+                else:
+                    self.__test()
+        elif message == Message.accept:
+            self.test_edge = -1
+            self.best_edge = edge_index
+            self.best_weight = self.weights[edge_index]
+        elif message == Message.reject:
+            if self.status[edge_index] == EdgeStatus.basic:
+                self.__change_edge_status(edge_index, EdgeStatus.reject)
+            self.__test()
+        elif message == Message.report:
+            if pl[0] < self.best_weight:
+                self.best_weight = pl[0]
+                self.best_edge = edge_index
+            self.rec += 1
+            self.__report()
+        elif message == Message.changeroot:
+            self.__changeroot()
+        elif message == Message.connect:
+            self.__change_edge_status(edge_index, EdgeStatus.branch)
+            self.connected.add(edge_index)
+        elif message == Message.halt:
+            self.__complete()
+
+    def return_father_id(self):
+        """Return the edge id of the edge along the father of the node.
+        Return -1 if not completed yet or if it has no father"""
+        if self.completed and self.father != -1:
+            return self.edges.ids[self.father]
+        return -1
+
+
+class BoruvkaWorker:
+    """Worker running the nodes of a shard in lock step with the others"""
+    def __init__(self, index, graph, placement, channel, debug_level):
+        """Ctor
+
+        Arguments:
+            index {Integer} -- Index of the worker
+            graph {Graph} -- Graph read from the input file
+            placement {List} -- Index of the worker hosting each node
+            channel {QueueChannel} -- Channel to the other workers
+            debug_level {String} -- Debug Level - basic/info/debug
+        """
+        num_workers = max(placement) + 1
+        self.index = index
+        self.channel = channel
+        self.pending = deque()
+        self.outboxes = [[] for _ in range(num_workers)]
+        # Batches of the next round, from the peers already ahead
+        self.early = {peer: deque() for peer in channel.peers}
+
+        queues = []
+        local_ids = set()
+        for node_id in range(graph.num_nodes):
+            target = placement[node_id]
+            if target == index:
+                local_ids.add(node_id)
+                queues.append(LocalQueue(self, node_id))
+            else:
+                queues.append(RemoteQueue(self, target, node_id))
+
+        edges = build_edges(graph, queues, local_ids)
+        self.nodes = {}
+        for node_id in sorted(local_ids):
+            self.nodes[node_id] = BoruvkaNode(node_id, edges[node_id],
+                                              queues[node_id], debug_level)
+
+    def __exchange(self, sent, remaining):
+        """End a round: send the batch of each peer along with the counts of
+        this worker, and wait for the batch of every peer
+
+        Arguments:
+            sent {Integer} -- Number of batches sent by the local nodes
+            remaining {Integer} -- Number of local nodes not completed
+
+        Returns:
+            Tuple -- Number of batches sent and of nodes not completed, over
+                     all the workers
+        """
+        for peer in self.channel.peers:
+            self.channel.send(peer, (sent, remaining, self.outboxes[peer]))
+            self.outboxes[peer] = []
+
+        waiting = set(self.channel.peers)
+        while waiting:
+            for peer in list(waiting):
+                if self.early[peer]:
+                    waiting.discard(peer)
+                    peer_sent, peer_remaining, batch = \
+                        self.early[peer].popleft()
+                    sent += peer_sent
+                    remaining += peer_remaining
+                    self.pending.extend(batch)
+            if waiting:
+                for sender, item in self.channel.receive(None):
+                    self.early[sender].append(item)
+        return sent, remaining
+
+    def run(self, wakeups):
+        """Run the rounds till all the nodes have completed
+
+        Arguments:
+            wakeups {List} -- (delay, node id) of each local node to wake up
+
+        Returns:
+            Tuple -- Number of messages sent, the records of the nodes of
+                     the shard as returned by node_records, and their
+                     counters
+        """
+        step = TEST
+        advance = True
+        while True:
+            batches = self.pending
+            self.pending = deque()
+            if advance:
+                for node_id in self.nodes:
+                    self.nodes[node_id].next_step(step)
+                # The nodes of the wake up plan start in the first round
+                for _, node_id in wakeups:
+                    self.nodes[node_id].process_batch([])
+                wakeups = []
+
+            queued = count_queued(batches)
+            for node_id, batch in batches:
+                node = self.nodes[node_id]
+                queued[node_id] -= len(batch)
+                if not node.completed:
+                    node.process_batch(batch, queued[node_id])
+
+            sent = len(self.pending)
+            for outbox in self.outboxes:
+                sent += len(outbox)
+            remaining = 0
+            for node_id in self.nodes:
+                if not self.nodes[node_id].completed:
+                    remaining += 1
+            sent, remaining = self.__exchange(sent, remaining)
+
+            # A step ends once a round goes by without any message
+            advance = sent == 0
+            if advance:
+                if remaining == 0:
+                    break
+                step = (step + 1) % 3
+
+        total_messages = 0
+        counters = new_counters()
+        for node_id in self.nodes:
+            total_messages += self.nodes[node_id].num_messages
+            add_counters(counters, self.nodes[node_id].counters)
+        record_top(counters, TOP_RSS, peak_rss()[0], self.index)
+        trace.flush()
+        return total_messages, node_records(self.nodes.values()), counters
+
+
+def run_boruvka_worker(index, graph, placement, inbound, results, wakeups,
+                       debug_level):
+    """Entry point of each worker process
+
+    Arguments:
+        index {Integer} -- Index of the worker
+        graph {Graph} -- Graph read from the input file
+        placement {List} -- Index of the worker hosting each node
+        inbound {List} -- Inbound queue of each worker
+        results {Multiprocessing Queue} -- Queue to return the results on
+        wakeups {List} -- (delay, node id) of each local node to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+    """
+    channel = QueueChannel(index, inbound)
+    worker = BoruvkaWorker(index, graph, placement, channel, debug_level)
+    results.put(worker.run(wakeups))
+
+
+def run_boruvka(graph, wake_plan, debug_level, num_workers=None, timer=None):
+    """Run the synchronous Boruvka algorithm on a pool of workers
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up, their delays being ignored
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        num_workers {Integer} -- Number of workers, defaults to the number of
+                                 cores (default: {None})
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    num_nodes = graph.num_nodes
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_nodes))
+
+    placement = [
+        shard_of(node_id, num_nodes, num_workers)
+        for node_id in range(num_nodes)
+    ]
+    wakeups = wake_plan.by_worker(placement, num_workers)
+
+    inbound = [Queue() for _ in range(num_workers)]
+    results = Queue()
+    processes = []
+    for index in range(num_workers):
+        p = Process(target=run_boruvka_worker,
+                    args=(index, graph, placement, inbound, results,
+                          wakeups[index], debug_level))
+        processes.append(p)
+        p.start()
+    if timer is not None:
+        timer.mark('spawn')
+
+    # Collect the results before joining the workers
+    total_messages = 0
+    counters = new_counters()
+    all_records = []
+    for _ in range(num_workers):
+        worker_messages, records, worker_counters = results.get()
+        total_messages += worker_messages
+        add_counters(counters, worker_counters)
+        all_records.append(records)
+
+    for p in processes:
+        p.join()
+
+    return total_messages, collect_records(graph, all_records), counters
@@ -0,0 +1,249 @@
+"""Checkpoints of an in-flight run of the GHS Algorithm, to resume a long run
+after a crash instead of starting it over.
+
+A checkpoint is a consistent snapshot of the state of every node and of the
+batches of messages in flight towards every node. It does not depend on the
+engine which took it, so that a run can be resumed by another engine, or with
+another number of workers.
+
+The simulate engine snapshots all the nodes and its heap of pending
+deliveries between two deliveries. The workers of the sharded and tcp engines
+take a Chandy-Lamport snapshot: every interval, worker 0 records the state of
+its nodes and its pending batches, and sends a marker to each of its peers
+before any other batch. A worker receiving its first marker of a snapshot
+does the same, and records the batches then received from each peer till the
+marker of that peer arrives. Each worker writes its part of the snapshot to
+the file checkpoint-<id>-<worker>.bin of the checkpoint directory, and a
+snapshot is complete once all its parts are written. The two latest
+snapshots of each worker are kept.
+
+The binary format of a part is:
+
+    magic      8 bytes    b'GHSCKP2\\0'
+    header     int64[4]   snapshot id, worker, number of parts, number of
+                          nodes
+    graph      20 bytes   SHA-1 of the graph, as modules.results.graph_hash
+    body       zlib compressed pickle of (node states, in-flight batches,
+                          engine state)
+"""
+import os
+import re
+import glob
+import time
+import zlib
+import pickle
+import struct
+
+MAGIC = b'GHSCKP2\0'
+HEADER = struct.Struct('<qqqq20s')
+
+PART_NAME = re.compile(r'checkpoint-(\d+)-(\d+)\.bin$')
+
+
+def part_path(directory, snapshot_id, index):
+    """Path of a part of a snapshot
+
+    Arguments:
+        directory {String} -- Checkpoint directory
+        snapshot_id {Integer} -- Id of the snapshot
+        index {Integer} -- Index of the worker writing the part
+
+    Returns:
+        String -- Path of the part
+    """
+    return os.path.join(
+        directory,
+        'checkpoint-' + str(snapshot_id) + '-' + str(index) + '.bin')
+
+
+def list_parts(directory):
+    """Find the parts written in the checkpoint directory
+
+    Arguments:
+        directory {String} -- Checkpoint directory
+
+    Returns:
+        List -- (snapshot id, worker, path) of each part
+    """
+    parts = []
+    for path in glob.glob(os.path.join(directory, 'checkpoint-*-*.bin')):
+        match = PART_NAME.search(path)
+        if match:
+            parts.append((int(match.group(1)), int(match.group(2)), path))
+    return parts
+
+
+class Checkpointer:
+    """Periodic writer of the parts of the snapshots taken by a worker"""
+    def __init__(self, directory, interval, num_nodes, digest, first_id=1):
+        """Ctor
+
+        Arguments:
+            directory {String} -- Checkpoint directory
+            interval {Float} -- Interval between two snapshots, in seconds
+            num_nodes {Integer} -- Number of nodes in the graph
+            digest {String} -- Hash of the graph, as returned by graph_hash
+
+        Keyword Arguments:
+            first_id {Integer} -- Id of the first snapshot to take, after the
+                                  snapshot resumed from (default: {1})
+        """
+        self.directory = directory
+        self.interval = interval
+        self.num_nodes = num_nodes
+        self.digest = bytes.fromhex(digest)
+        self.next_id = first_id
+        self.next_time = time.monotonic() + interval
+        os.makedirs(directory, exist_ok=True)
+
+    def due(self):
+        """Check whether the next snapshot should be taken
+
+        Returns:
+            Bool -- True if the interval has elapsed since the last snapshot
+                    was written
+        """
+        return time.monotonic() >= self.next_time
+
+    def start(self):
+        """Allocate the id of a snapshot initiated by this worker
+
+        Returns:
+            Integer -- Id of the snapshot
+        """
+        snapshot_id = self.next_id
+        self.seen(snapshot_id)
+        return snapshot_id
+
+    def seen(self, snapshot_id):
+        """Note a snapshot taken by this worker, so that the next one
+        initiated gets a higher id
+
+        Arguments:
+            snapshot_id {Integer} -- Id of the snapshot
+        """
+        self.next_id = max(self.next_id, snapshot_id + 1)
+
+    def clear(self):
+        """Remove the parts left by earlier runs from the snapshot ids to be
+        taken, so that they never complete a snapshot together with the parts
+        of this run"""
+        for snapshot_id, _, path in list_parts(self.directory):
+            if snapshot_id >= self.next_id:
+                os.remove(path)
+
+    def write(self, snapshot_id, index, num_parts, states, in_flight,
+              engine_state=None):
+        """Write the part of a snapshot of this worker, atomically, and
+        remove its parts of the older snapshots but the previous one. The
+        interval to the next snapshot starts once the part is written, so
+        that a slow write does not make the next snapshot due at once
+
+        Arguments:
+            snapshot_id {Integer} -- Id of the snapshot
+            index {Integer} -- Index of the worker
+            num_parts {Integer} -- Number of workers writing a part
+            states {Dict} -- State of each node of the worker, as returned by
+                             Node.snapshot
+            in_flight {List} -- (node id, batch of messages) pairs in flight
+                                towards the nodes of the worker, in the
+                                order of delivery
+
+        Keyword Arguments:
+            engine_state {Object} -- State of the engine, only used to resume
+                                     with the same engine (default: {None})
+        """
+        body = zlib.compress(
+            pickle.dumps((states, in_flight, engine_state),
+                         pickle.HIGHEST_PROTOCOL), 1)
+        path = part_path(self.directory, snapshot_id, index)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(MAGIC)
+            file.write(
+                HEADER.pack(snapshot_id, index, num_parts, self.num_nodes,
+                            self.digest))
+            file.write(body)
+        os.replace(path + '.tmp', path)
+
+        for old_id, part_index, old_path in list_parts(self.directory):
+            if part_index == index and old_id < snapshot_id - 1:
+                os.remove(old_path)
+        self.next_time = time.monotonic() + self.interval
+
+
+class Checkpoint:
+    """Snapshot read back from the checkpoint directory"""
+    def __init__(self, snapshot_id, states, in_flight, engine_state):
+        """Ctor
+
+        Arguments:
+            snapshot_id {Integer} -- Id of the snapshot
+            states {Dict} -- State of each node
+            in_flight {List} -- (node id, batch of messages) pairs in flight
+            engine_state {Object} -- State of the engine of a snapshot
+                                     written as a single part, else None
+        """
+        self.snapshot_id = snapshot_id
+        self.states = states
+        self.in_flight = in_flight
+        self.engine_state = engine_state
+
+
+def read_part(path):
+    """Read a part of a snapshot
+
+    Arguments:
+        path {String} -- Path of the part
+
+    Raises:
+        ValueError: If the file is not a checkpoint part
+
+    Returns:
+        Tuple -- Header fields, and the states, in-flight batches and engine
+                 state of the part
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + ' is not a checkpoint file of this version')
+    header = HEADER.unpack_from(data, len(MAGIC))
+    body = pickle.loads(zlib.decompress(data[len(MAGIC) + HEADER.size:]))
+    return header, body
+
+
+def load_checkpoint(directory, num_nodes, digest):
+    """Read the latest complete snapshot of the checkpoint directory
+
+    Arguments:
+        directory {String} -- Checkpoint directory
+        num_nodes {Integer} -- Number of nodes in the graph
+        digest {String} -- Hash of the graph, as returned by graph_hash
+
+    Raises:
+        ValueError: If no complete snapshot of this graph is found
+
+    Returns:
+        Checkpoint -- Latest complete snapshot
+    """
+    by_id = {}
+    for snapshot_id, index, path in list_parts(directory):
+        by_id.setdefault(snapshot_id, []).append(path)
+
+    for snapshot_id in sorted(by_id, reverse=True):
+        parts = [read_part(path) for path in by_id[snapshot_id]]
+        if any(header[2] != len(parts) for header, _ in parts):
+            continue
+        # The node ids, edge ids and levels of the states only make sense on
+        # the graph the snapshot was taken on
+        if (parts[0][0][3] != num_nodes
+                or parts[0][0][4] != bytes.fromhex(digest)):
+            raise ValueError(directory + ' is not a checkpoint of this graph')
+
+        states = {}
+        in_flight = []
+        for header, (part_states, part_in_flight, _) in parts:
+            states.update(part_states)
+            in_flight.extend(part_in_flight)
+        engine_state = parts[0][1][2] if len(parts) == 1 else None
+        return Checkpoint(snapshot_id, states, in_flight, engine_state)
+    raise ValueError('No complete snapshot in ' + directory)
@@ -0,0 +1,71 @@
+"""Compact encoding of the messages exchanged between the nodes.
+
+A message is encoded by Adjacency.pack into a plain tuple: the edge id of the
+sender, the integer code of the message and its logical timestamp, followed
+by the payload, where the state is also sent as its integer code. Such tuples
+are much cheaper to pickle than dictionaries of enums.
+
+For the binary transports, a message is further packed into a fixed size
+record holding the edge id of the sender, the level, the timestamp, the
+message code, the state code and a float which is either the fragment name or
+the reported weight.
+"""
+import sys
+import struct
+from modules.utils import Message
+
+INF = sys.maxsize
+
+RECORD = struct.Struct('<iiiBBxxd')
+
+CONNECT = int(Message.connect)
+INITIATE = int(Message.initiate)
+TEST = int(Message.test)
+REPORT = int(Message.report)
+
+
+def pack_fields(msg):
+    """Convert an encoded message into the fields of a record
+
+    Arguments:
+        msg {Tuple} -- Encoded message
+
+    Returns:
+        Tuple -- Sender, level, timestamp, message code, state code and value
+    """
+    code = msg[1]
+    if code == CONNECT:
+        return msg[0], msg[3], msg[2], code, 0, 0.0
+    if code == INITIATE:
+        return msg[0], msg[3], msg[2], code, msg[5], msg[4]
+    if code == TEST:
+        return msg[0], msg[3], msg[2], code, 0, msg[4]
+    if code == REPORT:
+        weight = float('inf') if msg[3] == INF else msg[3]
+        return msg[0], 0, msg[2], code, 0, weight
+    return msg[0], 0, msg[2], code, 0, 0.0
+
+
+def unpack_fields(sender, level, clock, code, state, value):
+    """Convert the fields of a record back into an encoded message
+
+    Arguments:
+        sender {Integer} -- Edge id of the sender
+        level {Integer} -- Level
+        clock {Integer} -- Logical timestamp
+        code {Integer} -- Message code
+        state {Integer} -- State code
+        value {Float} -- Fragment name or reported weight
+
+    Returns:
+        Tuple -- Encoded message
+    """
+    if code == CONNECT:
+        return (sender, code, clock, level)
+    if code == INITIATE:
+        return (sender, code, clock, level, value, state)
+    if code == TEST:
+        return (sender, code, clock, level, value)
+    if code == REPORT:
+        return (sender, code, clock, INF if value == float('inf') else value)
+    return (sender, code, clock)
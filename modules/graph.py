@@ -0,0 +1,248 @@
+"""Loader for the input graphs, shared by the engines and the verifier.
+
+A graph is held as parallel arrays of the end points and the weight of each
+edge, the id of an edge being its index in these arrays, along with a CSR
+(compressed sparse row) adjacency: the edges of node i are the edge ids in
+adj_edges[adj_start[i]:adj_start[i + 1]].
+
+The text format is the one written by generate.py: the number of nodes on the
+first line, followed by an edge (node1, node2, weight) on each line. It is
+parsed in chunks of lines, each chunk being split and converted in bulk.
+
+The binary format holds the same arrays, so that a graph converted once can be
+memory-mapped and used without any parsing:
+
+    magic      8 bytes    b'GHSCSR1\\0'
+    header     int64[2]   number of nodes, number of edges
+    weights    float64[E]
+    adj_start  int64[N + 1]
+    node1      int32[E]
+    node2      int32[E]
+    adj_edges  int32[2E]
+
+To convert a text input into the binary format, run:
+    python -m modules.graph <input-file> <output-file>
+"""
+import sys
+import mmap
+import struct
+from array import array
+
+MAGIC = b'GHSCSR1\0'
+HEADER = struct.Struct('<qq')
+CHUNK_SIZE = 1 << 20
+
+
+class Graph:
+    """Arrays describing an undirected weighted graph"""
+    def __init__(self, num_nodes, node1, node2, weights, adj_start=None,
+                 adj_edges=None):
+        """Ctor, the adjacency is built if not given
+
+        Arguments:
+            num_nodes {Integer} -- Number of nodes in the graph
+            node1 {Array} -- First end point of each edge
+            node2 {Array} -- Second end point of each edge
+            weights {Array} -- Weight of each edge
+
+        Keyword Arguments:
+            adj_start {Array} -- Start of the edges of each node in adj_edges
+                                 (default: {None})
+            adj_edges {Array} -- Edge ids of all the nodes (default: {None})
+        """
+        self.num_nodes = num_nodes
+        self.num_edges = len(weights)
+        self.node1 = node1
+        self.node2 = node2
+        self.weights = weights
+        if adj_start is None:
+            adj_start, adj_edges = build_adjacency(num_nodes, node1, node2)
+        self.adj_start = adj_start
+        self.adj_edges = adj_edges
+
+    def __reduce__(self):
+        """Pickle a copy of the arrays, as a graph backed by a mapped file
+        cannot be pickled as such, to hand the graph to another process
+
+        Returns:
+            Tuple -- Constructor and its arguments
+        """
+        arrays = (array('i', self.node1), array('i', self.node2),
+                  array('d', self.weights), array('q', self.adj_start),
+                  array('i', self.adj_edges))
+        return Graph, (self.num_nodes, ) + arrays
+
+    def degree(self, node_id):
+        """Number of edges of the node
+
+        Arguments:
+            node_id {Integer} -- Node Id
+
+        Returns:
+            Integer -- Degree of the node
+        """
+        return self.adj_start[node_id + 1] - self.adj_start[node_id]
+
+    def edges_of(self, node_id):
+        """Edge ids of all the edges of the node
+
+        Arguments:
+            node_id {Integer} -- Node Id
+
+        Returns:
+            Sequence -- Edge ids
+        """
+        return self.adj_edges[self.adj_start[node_id]:self.
+                              adj_start[node_id + 1]]
+
+    def other_end(self, edge_id, node_id):
+        """End point of the edge which is not the given node
+
+        Arguments:
+            edge_id {Integer} -- Edge Id
+            node_id {Integer} -- Node Id of one end point
+
+        Returns:
+            Integer -- Node Id of the other end point
+        """
+        node1 = self.node1[edge_id]
+        return self.node2[edge_id] if node1 == node_id else node1
+
+
+def build_adjacency(num_nodes, node1, node2):
+    """Build the CSR adjacency of the graph with a counting sort
+
+    Arguments:
+        num_nodes {Integer} -- Number of nodes in the graph
+        node1 {Array} -- First end point of each edge
+        node2 {Array} -- Second end point of each edge
+
+    Returns:
+        Tuple -- Start of the edges of each node, and the edge ids
+    """
+    adj_start = array('q', bytes(8 * (num_nodes + 1)))
+    for node_id in node1:
+        adj_start[node_id + 1] += 1
+    for node_id in node2:
+        adj_start[node_id + 1] += 1
+    for node_id in range(num_nodes):
+        adj_start[node_id + 1] += adj_start[node_id]
+
+    position = array('q', adj_start)
+    adj_edges = array('i', bytes(4 * adj_start[num_nodes]))
+    for edge_id in range(len(node1)):
+        for node_id in (node1[edge_id], node2[edge_id]):
+            adj_edges[position[node_id]] = edge_id
+            position[node_id] += 1
+    return adj_start, adj_edges
+
+
+def load_text(path):
+    """Parse a graph from the text format
+
+    Arguments:
+        path {String} -- Path of the input file
+
+    Returns:
+        Graph -- Parsed graph
+    """
+    node1 = array('i')
+    node2 = array('i')
+    weights = array('d')
+    table = str.maketrans('(),', '   ')
+    with open(path) as file:
+        num_nodes = int(file.readline())
+        while True:
+            lines = file.readlines(CHUNK_SIZE)
+            if not lines:
+                break
+            tokens = ''.join(lines).translate(table).split()
+            node1.extend(map(int, tokens[0::3]))
+            node2.extend(map(int, tokens[1::3]))
+            weights.extend(map(float, tokens[2::3]))
+    return Graph(num_nodes, node1, node2, weights)
+
+
+def save_binary(graph, path):
+    """Write the graph in the binary format
+
+    Arguments:
+        graph {Graph} -- Graph to write
+        path {String} -- Path of the output file
+    """
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(HEADER.pack(graph.num_nodes, graph.num_edges))
+        for values, typecode in ((graph.weights, 'd'), (graph.adj_start, 'q'),
+                                 (graph.node1, 'i'), (graph.node2, 'i'),
+                                 (graph.adj_edges, 'i')):
+            file.write(array(typecode, values).tobytes())
+
+
+def load_binary(path):
+    """Memory-map a graph in the binary format, without copying the arrays
+
+    Arguments:
+        path {String} -- Path of the input file
+
+    Returns:
+        Graph -- Graph backed by the mapped file
+    """
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    num_nodes, num_edges = HEADER.unpack_from(view, len(MAGIC))
+
+    offset = len(MAGIC) + HEADER.size
+    arrays = []
+    for typecode, length in (('d', num_edges), ('q', num_nodes + 1),
+                             ('i', num_edges), ('i', num_edges),
+                             ('i', 2 * num_edges)):
+        size = length * struct.calcsize(typecode)
+        arrays.append(view[offset:offset + size].cast(typecode))
+        offset += size
+
+    weights, adj_start, node1, node2, adj_edges = arrays
+    graph = Graph(num_nodes, node1, node2, weights, adj_start, adj_edges)
+    # Keep the mapping alive as long as the graph
+    graph.mapped = mapped
+    return graph
+
+
+def load_graph(path):
+    """Load a graph from a file in either the text or the binary format
+
+    Arguments:
+        path {String} -- Path of the input file
+
+    Returns:
+        Graph -- Loaded graph
+    """
+    with open(path, 'rb') as file:
+        magic = file.read(len(MAGIC))
+    if magic == MAGIC:
+        return load_binary(path)
+    return load_text(path)
+
+
+def format_weight(weight):
+    """Format a weight the way it is written in the text format
+
+    Arguments:
+        weight {Float} -- Weight
+
+    Returns:
+        String -- Formatted weight
+    """
+    if weight.is_integer():
+        return str(int(weight))
+    return str(weight)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('To run the file: python -m modules.graph <input-file> ' +
+              '<output-file>')
+        sys.exit()
+
+    save_binary(load_graph(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,749 @@
+"""Incremental maintenance of the MST of a graph after a batch of changes.
+
+Instead of running the GHS Algorithm again from level 0, the tree of an
+earlier run, as written by main.py with --result, is repaired in the driver
+after each change, as the weights are distinct:
+
+    insertion, or weight decrease of a non-tree edge
+        cycle property - the edge replaces the heaviest edge of the tree path
+        between its end nodes, if that edge is heavier
+    deletion, or weight increase of a tree edge
+        cut property - the tree edge is cut, and the two parts are joined
+        again by the lightest edge crossing the cut, found by scanning the
+        edges of the smaller part only
+
+The other changes leave the tree as it is. The tree is held in a link-cut
+tree, so that the heaviest edge of a tree path is found, and the tree is cut
+and linked again, in logarithmic amortized time rather than in the depth of
+the tree, and as the tree edges of each node, so that the parts of a cut tree
+can be explored.
+
+The changes are read from a text file, one change on each line:
+
+    + node1 node2 weight    insert an edge
+    - node1 node2           delete an edge
+    ~ node1 node2 weight    change the weight of an edge
+
+To apply a batch of changes, run:
+    python -m modules.incremental <input-file> <result-file> <changes-file>
+        [--output-graph <path>] [--output-result <path>] [--verify]
+"""
+import sys
+import math
+import argparse
+from array import array
+from collections import deque
+from modules.graph import Graph, load_graph, save_binary
+from modules.result import MSTResult, NO_PARENT, load_result
+from modules.kruskals import Kruskals
+
+
+class DynamicGraph:
+    """Changes made to a graph, on top of its unchanged arrays"""
+    def __init__(self, graph):
+        """Ctor
+
+        Arguments:
+            graph {Graph} -- Graph before the changes
+        """
+        self.graph = graph
+        self.num_nodes = graph.num_nodes
+        self.base_edges = graph.num_edges
+        self.deleted = set()
+        self.new_weights = {}
+        # Inserted edges get the ids following the edges of the graph
+        self.added = []
+        self.added_edges = {}
+
+    def ends(self, edge_id):
+        """End points of an edge
+
+        Arguments:
+            edge_id {Integer} -- Edge Id
+
+        Returns:
+            Tuple -- Node Ids of both end points
+        """
+        if edge_id < self.base_edges:
+            return self.graph.node1[edge_id], self.graph.node2[edge_id]
+        return self.added[edge_id - self.base_edges][:2]
+
+    def weight(self, edge_id):
+        """Current weight of an edge
+
+        Arguments:
+            edge_id {Integer} -- Edge Id
+
+        Returns:
+            Float -- Weight of the edge
+        """
+        if edge_id in self.new_weights:
+            return self.new_weights[edge_id]
+        if edge_id < self.base_edges:
+            return self.graph.weights[edge_id]
+        return self.added[edge_id - self.base_edges][2]
+
+    def other_end(self, edge_id, node_id):
+        """End point of the edge which is not the given node
+
+        Arguments:
+            edge_id {Integer} -- Edge Id
+            node_id {Integer} -- Node Id of one end point
+
+        Returns:
+            Integer -- Node Id of the other end point
+        """
+        node1, node2 = self.ends(edge_id)
+        return node2 if node1 == node_id else node1
+
+    def edges_of(self, node_id):
+        """Edge ids of all the current edges of the node
+
+        Arguments:
+            node_id {Integer} -- Node Id
+
+        Returns:
+            List -- Edge ids
+        """
+        deleted = self.deleted
+        edges = [
+            edge for edge in self.graph.edges_of(node_id)
+            if edge not in deleted
+        ]
+        for edge in self.added_edges.get(node_id, ()):
+            if edge not in deleted:
+                edges.append(edge)
+        return edges
+
+    def find_edge(self, node1, node2):
+        """Find the edge between two nodes
+
+        Arguments:
+            node1 {Integer} -- Node Id of one end point
+            node2 {Integer} -- Node Id of the other end point
+
+        Raises:
+            ValueError: If there is no such edge
+
+        Returns:
+            Integer -- Edge Id
+        """
+        self.check_node(node1)
+        for edge in self.edges_of(node1):
+            if self.other_end(edge, node1) == node2:
+                return edge
+        raise ValueError('No edge between ' + str(node1) + ' and ' +
+                         str(node2))
+
+    def check_node(self, node_id):
+        """Check that a node is in the graph
+
+        Arguments:
+            node_id {Integer} -- Node Id
+
+        Raises:
+            ValueError: If the node is not in the graph
+        """
+        if not 0 <= node_id < self.num_nodes:
+            raise ValueError('Node ' + str(node_id) + ' is not in the graph')
+
+    def add_edge(self, node1, node2, weight):
+        """Insert an edge
+
+        Arguments:
+            node1 {Integer} -- Node Id of one end point
+            node2 {Integer} -- Node Id of the other end point
+            weight {Float} -- Weight of the edge
+
+        Returns:
+            Integer -- Edge Id of the new edge
+        """
+        self.check_node(node1)
+        self.check_node(node2)
+        edge_id = self.base_edges + len(self.added)
+        self.added.append((node1, node2, weight))
+        self.added_edges.setdefault(node1, []).append(edge_id)
+        self.added_edges.setdefault(node2, []).append(edge_id)
+        return edge_id
+
+    def to_graph(self):
+        """Build the graph with all the changes, without the deleted edges
+
+        Returns:
+            Tuple -- Changed graph, and the new id of each edge, -1 for the
+                     deleted edges
+        """
+        node1s = array('i')
+        node2s = array('i')
+        weights = array('d')
+        new_ids = array('i')
+        for edge_id in range(self.base_edges + len(self.added)):
+            if edge_id in self.deleted:
+                new_ids.append(NO_PARENT)
+                continue
+            new_ids.append(len(weights))
+            node1, node2 = self.ends(edge_id)
+            node1s.append(node1)
+            node2s.append(node2)
+            weights.append(self.weight(edge_id))
+        return Graph(self.num_nodes, node1s, node2s, weights), new_ids
+
+
+class LinkCutTree:
+    """Forest of trees, held as splay trees of paths, in which the heaviest
+    node of the path between any two nodes of a tree is found, and trees are
+    linked and cut, in logarithmic amortized time (Sleator and Tarjan)
+
+    Each node of the forest has a weight, and the splay tree of a path is
+    ordered from the top of the path to its bottom. The parent of the root
+    of a splay tree is the node the top of its path hangs from.
+    """
+    def __init__(self, num_nodes):
+        """Ctor
+
+        Arguments:
+            num_nodes {Integer} -- Number of nodes, of weight -inf, each in a
+                                   tree of its own
+        """
+        self.left = [NO_PARENT] * num_nodes
+        self.right = [NO_PARENT] * num_nodes
+        self.parent = [NO_PARENT] * num_nodes
+        # Whether the children of the subtree are to be swapped
+        self.flip = [False] * num_nodes
+        self.weight = [-math.inf] * num_nodes
+        # Heaviest node of the splay subtree
+        self.best = list(range(num_nodes))
+        self.free = []
+
+    def add_node(self, weight):
+        """Add a node, in a tree of its own
+
+        Arguments:
+            weight {Float} -- Weight of the node
+
+        Returns:
+            Integer -- Index of the node
+        """
+        if self.free:
+            node = self.free.pop()
+            self.left[node] = self.right[node] = NO_PARENT
+            self.parent[node] = NO_PARENT
+            self.flip[node] = False
+            self.weight[node] = weight
+            self.best[node] = node
+            return node
+        self.left.append(NO_PARENT)
+        self.right.append(NO_PARENT)
+        self.parent.append(NO_PARENT)
+        self.flip.append(False)
+        self.weight.append(weight)
+        self.best.append(len(self.best))
+        return len(self.best) - 1
+
+    def remove_node(self, node):
+        """Free a node cut from all the others, for add_node to reuse
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        self.free.append(node)
+
+    def __is_root(self, node):
+        """Check whether a node is the root of its splay tree
+
+        Arguments:
+            node {Integer} -- Index of the node
+
+        Returns:
+            Bool -- True if the node is not a child of its parent
+        """
+        parent = self.parent[node]
+        return parent == NO_PARENT or (self.left[parent] != node
+                                       and self.right[parent] != node)
+
+    def __push(self, node):
+        """Swap the children of a node, if its subtree is to be flipped
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        if self.flip[node]:
+            left = self.left[node]
+            right = self.right[node]
+            self.left[node] = right
+            self.right[node] = left
+            if left != NO_PARENT:
+                self.flip[left] = not self.flip[left]
+            if right != NO_PARENT:
+                self.flip[right] = not self.flip[right]
+            self.flip[node] = False
+
+    def __update(self, node):
+        """Find the heaviest node of the splay subtree of a node, from the
+        ones of its children
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        weight = self.weight
+        best = node
+        for child in (self.left[node], self.right[node]):
+            if child != NO_PARENT and weight[self.best[child]] > weight[best]:
+                best = self.best[child]
+        self.best[node] = best
+
+    def __rotate(self, node):
+        """Rotate a node above its parent in their splay tree
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        left = self.left
+        right = self.right
+        parent = self.parent
+        above = parent[node]
+        top = parent[above]
+        if left[above] == node:
+            moved = right[node]
+            left[above] = moved
+            right[node] = above
+        else:
+            moved = left[node]
+            right[above] = moved
+            left[node] = above
+        if moved != NO_PARENT:
+            parent[moved] = above
+        parent[above] = node
+        parent[node] = top
+        # The parent of the root of a splay tree keeps no child pointer to it
+        if top != NO_PARENT:
+            if left[top] == above:
+                left[top] = node
+            elif right[top] == above:
+                right[top] = node
+        self.__update(above)
+        self.__update(node)
+
+    def __splay(self, node):
+        """Bring a node to the root of its splay tree
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        # Apply the pending flips from the root down, before rotating
+        path = [node]
+        while not self.__is_root(path[-1]):
+            path.append(self.parent[path[-1]])
+        for ancestor in reversed(path):
+            self.__push(ancestor)
+
+        while not self.__is_root(node):
+            above = self.parent[node]
+            if not self.__is_root(above):
+                top = self.parent[above]
+                if (self.left[above] == node) == (self.left[top] == above):
+                    self.__rotate(above)
+                else:
+                    self.__rotate(node)
+            self.__rotate(node)
+
+    def __access(self, node):
+        """Make the path from the root of the tree down to a node a single
+        splay tree, rooted at the node
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        below = NO_PARENT
+        current = node
+        while current != NO_PARENT:
+            self.__splay(current)
+            self.right[current] = below
+            self.__update(current)
+            below = current
+            current = self.parent[current]
+        self.__splay(node)
+
+    def __make_root(self, node):
+        """Make a node the root of its tree
+
+        Arguments:
+            node {Integer} -- Index of the node
+        """
+        self.__access(node)
+        self.flip[node] = not self.flip[node]
+
+    def attach(self, root, node):
+        """Hang the root of a tree from a node of another tree
+
+        Arguments:
+            root {Integer} -- Index of the root of its tree
+            node {Integer} -- Index of the node to hang it from
+        """
+        self.parent[root] = node
+
+    def link(self, node1, node2):
+        """Join the trees of two nodes with an edge between the nodes
+
+        Arguments:
+            node1 {Integer} -- Index of a node of the first tree
+            node2 {Integer} -- Index of a node of the second tree
+        """
+        self.__make_root(node1)
+        self.parent[node1] = node2
+
+    def cut(self, node1, node2):
+        """Remove the edge between two adjacent nodes
+
+        Arguments:
+            node1 {Integer} -- Index of one end node
+            node2 {Integer} -- Index of the other end node
+        """
+        self.__make_root(node1)
+        self.__access(node2)
+        # The path is only the two nodes, node1 being above node2
+        self.left[node2] = NO_PARENT
+        self.parent[node1] = NO_PARENT
+        self.__update(node2)
+
+    def heaviest(self, node1, node2):
+        """Find the heaviest node of the path between two nodes of a tree
+
+        Arguments:
+            node1 {Integer} -- Index of one end node
+            node2 {Integer} -- Index of the other end node
+
+        Returns:
+            Integer -- Index of the heaviest node
+        """
+        self.__make_root(node1)
+        self.__access(node2)
+        return self.best[node2]
+
+    def set_weight(self, node, weight):
+        """Change the weight of a node
+
+        Arguments:
+            node {Integer} -- Index of the node
+            weight {Float} -- New weight of the node
+        """
+        # As the root of its splay tree, the node is in no other subtree
+        self.__splay(node)
+        self.weight[node] = weight
+        self.__update(node)
+
+
+class IncrementalMST:
+    """MST of a graph, repaired after each change of the graph
+
+    The tree is held in a LinkCutTree, in which each tree edge is a node of
+    its weight between its end nodes, of weight -inf. An insertion, or the
+    weight decrease of a non-tree edge, then finds the heaviest edge of the
+    tree path it closes, and swaps it, in O(log n) amortized time, whatever
+    the depth of the tree. A deletion, or the weight increase of a tree
+    edge, cuts the tree in O(log n) amortized time, then scans the edges of
+    the smaller part of the cut for the lightest one joining both parts.
+    """
+    def __init__(self, graph, result):
+        """Ctor
+
+        Arguments:
+            graph {Graph} -- Graph before the changes
+            result {MSTResult} -- MST of the graph
+        """
+        self.graph = DynamicGraph(graph)
+        self.levels = result.levels
+        self.root = result.root
+
+        self.tree_edges = [set() for _ in range(graph.num_nodes)]
+        self.forest = LinkCutTree(graph.num_nodes)
+        # Node of the forest of each tree edge, and the other way round
+        self.edge_nodes = {}
+        self.node_edges = {}
+        for node_id in range(graph.num_nodes):
+            edge = result.fathers[node_id]
+            if edge == NO_PARENT or node_id == result.root:
+                continue
+            self.tree_edges[graph.node1[edge]].add(edge)
+            self.tree_edges[graph.node2[edge]].add(edge)
+            # Every node is hung once from its father, through its edge, so
+            # the forest is built without any splay
+            edge_node = self.forest.add_node(graph.weights[edge])
+            self.edge_nodes[edge] = edge_node
+            self.node_edges[edge_node] = edge
+            self.forest.attach(node_id, edge_node)
+            self.forest.attach(edge_node, result.parents[node_id])
+
+    def in_tree(self, edge_id):
+        """Check whether an edge is a tree edge
+
+        Arguments:
+            edge_id {Integer} -- Edge Id
+
+        Returns:
+            Bool -- True if the edge is in the tree
+        """
+        return edge_id in self.edge_nodes
+
+    def insert(self, node1, node2, weight):
+        """Insert an edge, and repair the tree
+
+        Arguments:
+            node1 {Integer} -- Node Id of one end point
+            node2 {Integer} -- Node Id of the other end point
+            weight {Float} -- Weight of the edge
+        """
+        self.__offer(self.graph.add_edge(node1, node2, weight))
+
+    def delete(self, node1, node2):
+        """Delete an edge, and repair the tree
+
+        Arguments:
+            node1 {Integer} -- Node Id of one end point
+            node2 {Integer} -- Node Id of the other end point
+
+        Raises:
+            ValueError: If the edge does not exist, or if deleting it
+                        disconnects the graph
+        """
+        edge_id = self.graph.find_edge(node1, node2)
+        in_tree = self.in_tree(edge_id)
+        self.graph.deleted.add(edge_id)
+        if in_tree:
+            try:
+                self.__reconnect(edge_id)
+            except ValueError:
+                self.graph.deleted.discard(edge_id)
+                raise
+
+    def update(self, node1, node2, weight):
+        """Change the weight of an edge, and repair the tree
+
+        Arguments:
+            node1 {Integer} -- Node Id of one end point
+            node2 {Integer} -- Node Id of the other end point
+            weight {Float} -- New weight of the edge
+
+        Raises:
+            ValueError: If the edge does not exist
+        """
+        edge_id = self.graph.find_edge(node1, node2)
+        old_weight = self.graph.weight(edge_id)
+        self.graph.new_weights[edge_id] = weight
+        if self.in_tree(edge_id):
+            if weight > old_weight:
+                # The edge competes with the other edges crossing its cut
+                self.__reconnect(edge_id)
+            else:
+                self.forest.set_weight(self.edge_nodes[edge_id], weight)
+        elif weight < old_weight:
+            self.__offer(edge_id)
+
+    def __offer(self, edge_id):
+        """Swap a non-tree edge with the heaviest edge of the tree path
+        between its end nodes, if that edge is heavier
+
+        Arguments:
+            edge_id {Integer} -- Edge Id of the non-tree edge
+        """
+        node1, node2 = self.graph.ends(edge_id)
+        if node1 == node2:
+            return
+        heaviest = self.forest.heaviest(node1, node2)
+        if self.forest.weight[heaviest] > self.graph.weight(edge_id):
+            self.__cut(self.node_edges[heaviest])
+            self.__link(edge_id)
+
+    def __cut(self, edge_id):
+        """Remove a tree edge, the tree being split in two
+
+        Arguments:
+            edge_id {Integer} -- Edge Id of the tree edge
+        """
+        node1, node2 = self.graph.ends(edge_id)
+        self.tree_edges[node1].discard(edge_id)
+        self.tree_edges[node2].discard(edge_id)
+        edge_node = self.edge_nodes.pop(edge_id)
+        del self.node_edges[edge_node]
+        self.forest.cut(node1, edge_node)
+        self.forest.cut(edge_node, node2)
+        self.forest.remove_node(edge_node)
+
+    def __link(self, edge_id):
+        """Join two separate trees with an edge
+
+        Arguments:
+            edge_id {Integer} -- Edge Id of the joining edge
+        """
+        node1, node2 = self.graph.ends(edge_id)
+        self.tree_edges[node1].add(edge_id)
+        self.tree_edges[node2].add(edge_id)
+        edge_node = self.forest.add_node(self.graph.weight(edge_id))
+        self.edge_nodes[edge_id] = edge_node
+        self.node_edges[edge_node] = edge_id
+        self.forest.link(edge_node, node1)
+        self.forest.link(node2, edge_node)
+    def __smaller_part(self, node1, node2):
+        """Explore the trees of two nodes in lockstep till one of them is
+        fully explored
+
+        Arguments:
+            node1 {Integer} -- Node Id in the first tree
+            node2 {Integer} -- Node Id in the second tree
+
+        Returns:
+            Tuple -- Index of the smaller tree, and its nodes
+        """
+        graph = self.graph
+        parts = [{node1}, {node2}]
+        queues = [deque([node1]), deque([node2])]
+        while True:
+            for index in (0, 1):
+                if not queues[index]:
+                    return index, parts[index]
+                node = queues[index].popleft()
+                for edge in self.tree_edges[node]:
+                    other = graph.other_end(edge, node)
+                    if other not in parts[index]:
+                        parts[index].add(other)
+                        queues[index].append(other)
+
+    def __reconnect(self, edge_id):
+        """Cut a tree edge, and join both parts again with the lightest edge
+        crossing the cut, which may be the same edge
+
+        Arguments:
+            edge_id {Integer} -- Edge Id of the tree edge
+
+        Raises:
+            ValueError: If no other edge crosses the cut, the tree being left
+                        unchanged
+        """
+        graph = self.graph
+        self.__cut(edge_id)
+        node1, node2 = graph.ends(edge_id)
+        _, part = self.__smaller_part(node1, node2)
+
+        lightest = NO_PARENT
+        lightest_weight = None
+        for node in part:
+            for edge in graph.edges_of(node):
+                if graph.other_end(edge, node) in part:
+                    continue
+                weight = graph.weight(edge)
+                if lightest == NO_PARENT or weight < lightest_weight:
+                    lightest, lightest_weight = edge, weight
+        if lightest == NO_PARENT:
+            # Leave the tree as it was
+            self.__link(edge_id)
+            raise ValueError('Deleting the edge between ' + str(node1) +
+                             ' and ' + str(node2) + ' disconnects the graph')
+        self.__link(lightest)
+
+    def result(self):
+        """Build the changed graph and its MST
+
+        Returns:
+            Tuple -- Changed graph, its MST result, and the new id of each
+                     edge
+        """
+        graph, new_ids = self.graph.to_graph()
+        # Orient the tree from the root of the original tree
+        fathers = array('i', [NO_PARENT]) * graph.num_nodes
+        seen = {self.root}
+        queue = deque([self.root])
+        while queue:
+            node = queue.popleft()
+            for edge in self.tree_edges[node]:
+                other = self.graph.other_end(edge, node)
+                if other not in seen:
+                    seen.add(other)
+                    fathers[other] = new_ids[edge]
+                    queue.append(other)
+        # The levels are the ones reached by the GHS run
+        return graph, MSTResult(graph, fathers, self.levels), new_ids
+
+
+def read_changes(path):
+    """Read a batch of changes
+
+    Arguments:
+        path {String} -- Path of the changes file
+
+    Raises:
+        ValueError: If a line is not a valid change
+
+    Returns:
+        List -- (kind, node1, node2, weight) of each change, the weight being
+                None for a deletion
+    """
+    changes = []
+    with open(path) as file:
+        for line in file:
+            tokens = line.split()
+            if not tokens or tokens[0].startswith('#'):
+                continue
+            kind = tokens[0]
+            if kind in ('+', '~') and len(tokens) == 4:
+                weight = float(tokens[3])
+            elif kind == '-' and len(tokens) == 3:
+                weight = None
+            else:
+                raise ValueError('Invalid change: ' + line.strip())
+            changes.append((kind, int(tokens[1]), int(tokens[2]), weight))
+    return changes
+
+
+def apply_changes(mst, changes):
+    """Apply a batch of changes to the graph, repairing the tree after each
+
+    Arguments:
+        mst {IncrementalMST} -- Tree to repair
+        changes {List} -- Changes as returned by read_changes
+    """
+    for kind, node1, node2, weight in changes:
+        if kind == '+':
+            mst.insert(node1, node2, weight)
+        elif kind == '-':
+            mst.delete(node1, node2)
+        else:
+            mst.update(node1, node2, weight)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Repair the MST of a graph after a batch of changes')
+    parser.add_argument('input_file', help='path-to-input-file')
+    parser.add_argument('result_file',
+                        help='MST of the input, as written by main.py with ' +
+                        '--result')
+    parser.add_argument('changes_file', help='path-to-changes-file')
+    parser.add_argument('--output-graph',
+                        default=None,
+                        help='path to write the changed graph to, in the ' +
+                        'binary format')
+    parser.add_argument('--output-result',
+                        default=None,
+                        help='path to write the MST of the changed graph to')
+    parser.add_argument('--verify',
+                        action='store_true',
+                        help='check the tree with Kruskal\'s algorithm')
+    args = parser.parse_args()
+
+    graph = load_graph(args.input_file)
+    mst = IncrementalMST(graph, load_result(graph, args.result_file))
+    try:
+        apply_changes(mst, read_changes(args.changes_file))
+    except ValueError as e:
+        parser.error(str(e))
+    graph, result, _ = mst.result()
+
+    result.write_text(graph, sys.stdout)
+    if args.output_graph is not None:
+        save_binary(graph, args.output_graph)
+    if args.output_result is not None:
+        result.write_binary(args.output_result)
+    if args.verify:
+        k_edges = Kruskals(graph.num_nodes).get_mst(graph)
+        assert set(result.edge_ids) == k_edges, \
+            '[CHECK]: Edges from Kruskals and the repaired tree do not match'
@@ -0,0 +1,218 @@
+"""Concurrent in-process engines for the GHS Algorithm.
+
+Every node runs its message loop concurrently inside the current process,
+either as a thread reading from a queue.SimpleQueue or as an asyncio task
+reading from an asyncio.Queue. Writing on an edge only hands over a reference
+to the message object, with no pickling and no pipe in between, which makes
+these engines useful to separate the cost of the protocol from the cost of
+the inter process communication.
+"""
+import queue
+import asyncio
+import threading
+from node import Node
+from modules.utils import build_edges
+from modules.stats import new_counters, add_counters
+from modules.result import node_records, collect_records
+from modules.wake import deliver_wakeups
+
+
+class ThreadQueue(queue.SimpleQueue):
+    """Queue of a node running on a thread"""
+    def close(self):
+        """Nothing to release for an in-memory queue"""
+        pass
+
+
+class AsyncQueue:
+    """Queue of a node running as an asyncio task"""
+    def __init__(self):
+        """Ctor"""
+        self.queue = asyncio.Queue()
+
+    def put(self, batch):
+        """Write the batch without waiting, as the queue is unbounded
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.queue.put_nowait(batch)
+
+    async def get(self):
+        """Read the next batch, waiting for one if the queue is empty
+
+        Returns:
+            List -- List of encoded messages
+        """
+        return await self.queue.get()
+
+    def get_nowait(self):
+        """Read the next batch without waiting
+
+        Raises:
+            queue.Empty: If the queue is empty
+
+        Returns:
+            List -- List of encoded messages
+        """
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def close(self):
+        """Nothing to release for an in-memory queue"""
+        pass
+
+
+def create_nodes(graph, queues, wake_plan, debug_level):
+    """Create the nodes of the graph and wake up the nodes to be woken up
+    at the start
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        queues {List} -- Queue of each node
+        wake_plan {WakePlan} -- Nodes to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Returns:
+        List -- List of nodes
+    """
+    num_nodes = graph.num_nodes
+    edges = build_edges(graph, queues)
+    nodes = [
+        Node(node_id, edges[node_id], 0, queues[node_id], debug_level)
+        for node_id in range(num_nodes)
+    ]
+
+    for node_id in wake_plan.immediate():
+        nodes[node_id].wakeup()
+    return nodes
+
+
+def collect_results(graph, nodes):
+    """Collect the number of messages and the tree from all the nodes
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        nodes {List} -- List of completed nodes
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    total_messages = 0
+    counters = new_counters()
+    for node in nodes:
+        total_messages += node.num_messages
+        add_counters(counters, node.counters)
+    result = collect_records(graph, [node_records(nodes)])
+    return total_messages, result, counters
+
+
+def run_threads(graph, wake_plan, debug_level, timer=None):
+    """Run the GHS Algorithm with a thread for each node
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    queues = [ThreadQueue() for _ in range(graph.num_nodes)]
+    nodes = create_nodes(graph, queues, wake_plan, debug_level)
+
+    threads = []
+    for node in nodes:
+        t = threading.Thread(target=node.start_operation, daemon=True)
+        threads.append(t)
+        t.start()
+    if timer is not None:
+        timer.mark('spawn')
+
+    deliver_wakeups(wake_plan.delayed(), queues)
+    for t in threads:
+        t.join()
+
+    return collect_results(graph, nodes)
+
+
+async def run_task(node):
+    """Message loop of a node running as an asyncio task
+
+    Arguments:
+        node {Node} -- Node to run
+    """
+    while not node.completed:
+        node.process_batch(node.drain(await node.msg_q.get()))
+        # Reading from a non-empty queue does not suspend the task, so always
+        # yield to let the other nodes make progress
+        await asyncio.sleep(0)
+
+
+async def wake_later(wakeups, queues):
+    """Wake up the delayed nodes at their time, by writing an empty batch to
+    their queue
+
+    Arguments:
+        wakeups {List} -- (delay, node id) of each node, in order of delay
+        queues {List} -- Queue of each node
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for delay, node_id in wakeups:
+        await asyncio.sleep(start + delay - loop.time())
+        queues[node_id].put([])
+
+
+async def run_tasks(nodes, wakeups, queues):
+    """Run the message loop of every node as a task and wait for all of them
+
+    Arguments:
+        nodes {List} -- List of nodes
+        wakeups {List} -- (delay, node id) of each node to wake up later
+        queues {List} -- Queue of each node
+    """
+    waker = asyncio.ensure_future(wake_later(wakeups, queues))
+    await asyncio.gather(*[run_task(node) for node in nodes])
+    # The nodes still to wake up have been woken up by a message already
+    waker.cancel()
+
+
+def run_asyncio(graph, wake_plan, debug_level, timer=None):
+    """Run the GHS Algorithm with an asyncio task for each node
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        queues = [AsyncQueue() for _ in range(graph.num_nodes)]
+        nodes = create_nodes(graph, queues, wake_plan, debug_level)
+        if timer is not None:
+            timer.mark('spawn')
+        loop.run_until_complete(
+            run_tasks(nodes, wake_plan.delayed(), queues))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    return collect_results(graph, nodes)
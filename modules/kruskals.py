@@ -1,97 +1,107 @@
-"""Implementation of prims algorithm to check if the Distributed GHS returned
-correctly or not"""
+"""Implementation of kruskals algorithm to check if the Distributed GHS
+returned correctly or not"""
 import sys
-
-INF = sys.maxsize
+from array import array
+from modules.graph import load_graph
 
 
 class Kruskals:
     """Class for implementation of kruskals algorithm"""
     def __init__(self, num_nodes):
         """Ctor
-        
+
         Arguments:
             num_nodes {Integer} -- Number of nodes in the graph
         """
         self.num_nodes = num_nodes
-        self.parent = list(range(num_nodes))
+        self.parent = array('i', range(num_nodes))
+        self.rank = bytearray(num_nodes)
 
     def get_parent(self, node):
-        """Traverse up the sub-tree to get the parent of node
-        
+        """Traverse up the sub-tree to get the root of node, halving the path
+        on the way
+
         Arguments:
             node {Integer}
-        
+
         Returns:
-            Integer -- Parent node
+            Integer -- Root node
         """
-        if self.parent[node] == node:
-            return node
-        return self.get_parent(self.parent[node])
+        parent = self.parent
+        while parent[node] != node:
+            # Point every other node on the path to its grandparent
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
 
     def union(self, parent1, parent2):
-        """Combine two sub-trees
-        
+        """Combine two sub-trees, attaching the lower ranked one
+
         Arguments:
-            parent1 {Integer}
-            parent2 {Integer}
+            parent1 {Integer} -- Root of the first sub-tree
+            parent2 {Integer} -- Root of the second sub-tree
         """
-        self.parent[parent1] = parent2
+        rank = self.rank
+        if rank[parent1] < rank[parent2]:
+            self.parent[parent1] = parent2
+        elif rank[parent1] > rank[parent2]:
+            self.parent[parent2] = parent1
+        else:
+            self.parent[parent2] = parent1
+            rank[parent1] += 1
 
-    def get_mst(self, edges):
+    def get_mst(self, graph):
         """Get the MST using Kruskal's algorithm
-        
+
         Arguments:
-            edges {List} -- List of raw edges
-        
+            graph {Graph} -- Graph read from the input file
+
         Returns:
-            Float -- Tree Weight
+            Set -- Edge ids of the tree edges
         """
-        # Sort the edges in order of increasing weights
-        edges.sort(key=lambda x: float(x[2]))
+        # Sort the edge ids in order of increasing weights
+        edges = sorted(range(graph.num_edges), key=graph.weights.__getitem__)
 
         # Pick the least edge at a time, and check if it doesn't form a cycle
-        mst_set = []
+        node1s = graph.node1
+        node2s = graph.node2
+        get_parent = self.get_parent
+        mst_set = set()
         for edge in edges:
-            node1 = int(edge[0])
-            node2 = int(edge[1])
-            node1_parent = self.get_parent(node1)
-            node2_parent = self.get_parent(node2)
+            node1_parent = get_parent(node1s[edge])
+            node2_parent = get_parent(node2s[edge])
             if node1_parent != node2_parent:
                 # Add edge to mst
-                mst_set.append(edge)
+                mst_set.add(edge)
                 self.union(node1_parent, node2_parent)
                 if len(mst_set) == self.num_nodes - 1:
                     break
 
-        # Find and return the sum of weights of the tree edges
-        tree_weight = 0
-        for tree_edge in mst_set:
-            tree_weight += float(tree_edge[2])
-        return tree_weight
+        return mst_set
+
+
+def tree_weight(graph, tree_edges):
+    """Find the sum of weights of the tree edges
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        tree_edges {Set} -- Edge ids of the tree edges
+
+    Returns:
+        Float -- Tree Weight
+    """
+    # Sum in order of increasing weights, as the GHS output does
+    return sum(sorted(graph.weights[edge] for edge in tree_edges))
 
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print('To run the file: python kruskals.py <input-file>')
+        print('To run the file: python -m modules.kruskals <input-file>')
         sys.exit()
 
     # Read from the input file
-    input_file = sys.argv[1]
-
-    with open(input_file) as file:
-        contents = file.readlines()
-    contents = [x.strip() for x in contents]
-
-    num_nodes = int(contents[0])
-    raw_edges = []
-    for line in contents[1:]:
-        if len(line) > 1:
-            line = line[1:-1].split(',')
-            raw_edges.append(line)
-        else:
-            break
+    graph = load_graph(sys.argv[1])
 
-    k = Kruskals(num_nodes)
-    weight = k.get_mst(raw_edges)
+    k = Kruskals(graph.num_nodes)
+    weight = tree_weight(graph, k.get_mst(graph))
     print('[SUCCESS]: Completed Execution. MST Weight: ' + str(weight))
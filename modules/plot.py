@@ -1,28 +1,149 @@
-"""Plot the results into matplotlib graphs"""
-import math
-import matplotlib.pyplot as plt
-
-# Read results from file
-with open('../files/results.txt') as f:
-    lines = f.readlines()
-lines = [l.strip().split(',') for l in lines]
-
-num_messages = []
-nlogn = []
-edges = []
-for line in lines:
-    n = int(line[2])
-    n_edges = int(line[3])
-    num_messages.append(int(line[1]))
-    nlogn.append(n * math.log(n))
-    edges.append(n_edges)
-
-plt.plot(nlogn, num_messages, 'bs-')
-plt.xlabel('N logN')
-plt.ylabel('#Messages')
-plt.show()
-
-plt.plot(edges, num_messages, 'g^-')
-plt.xlabel('Edges')
-plt.ylabel('#Messages')
-plt.show()
+"""Query the results store, fit the scaling of a metric and flag the
+regressions against a baseline revision
+
+For each family and engine, the metric of the runs is fitted with a power law
+a N^k of the number of nodes, or of the number of edges with --x num_edges.
+With --baseline, the median of the metric over the runs of each configuration
+at the revision of the latest run, or at --current, is compared with the one
+at the baseline revision, and the configurations which grew by more than
+--threshold are flagged, in which case the exit status is 1. With --plot, the
+runs and the fitted curves are drawn with matplotlib.
+
+To query the results of main.py, run:
+    python -m modules.plot [--db <path>] [--metric <metric>] [--family <type>]
+                           [--engine <engine>] [--baseline <rev>] [--plot]
+"""
+import os
+import sys
+import argparse
+from modules.results import METRICS, open_store, select_runs
+from modules.results import fit_power_law, find_regressions
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'files', 'results.db')
+
+
+def fit_groups(rows, metric, x_column):
+    """Fit the metric of the runs of each family and engine
+
+    Arguments:
+        rows {List} -- Rows of the runs
+        metric {String} -- One of METRICS
+        x_column {String} -- num_nodes or num_edges
+
+    Returns:
+        Dict -- Points and fit (or None) of each (family, engine)
+    """
+    groups = {}
+    for row in rows:
+        key = (row['family'] or '-', row['engine'])
+        groups.setdefault(key, []).append((row[x_column], row[metric]))
+    return {
+        key: (points, fit_power_law(points))
+        for key, points in groups.items()
+    }
+
+
+def plot_groups(groups, metric, x_column):
+    """Draw the runs and the fitted curves of each family and engine
+
+    Arguments:
+        groups {Dict} -- Points and fit of each (family, engine)
+        metric {String} -- One of METRICS
+        x_column {String} -- num_nodes or num_edges
+    """
+    # Only needed to draw, not to query the store
+    import matplotlib.pyplot as plt
+
+    for (family, engine), (points, fit) in sorted(groups.items()):
+        line = plt.plot([x for x, _ in points], [y for _, y in points],
+                        'o',
+                        label=family + ' ' + engine)[0]
+        if fit is not None:
+            xs = sorted(set(x for x, _ in points))
+            plt.plot(xs, [fit[0] * x**fit[1] for x in xs],
+                     '-',
+                     color=line.get_color())
+    plt.xscale('log')
+    plt.yscale('log')
+    plt.xlabel(x_column)
+    plt.ylabel(metric)
+    plt.legend()
+    plt.show()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Fit the scaling of a metric over the results store, ' +
+        'and flag the regressions against a baseline revision')
+    parser.add_argument('--db',
+                        default=DEFAULT_DB,
+                        help='path of the results store')
+    parser.add_argument('--metric',
+                        choices=METRICS,
+                        default='total_messages',
+                        help='metric to fit and compare')
+    parser.add_argument('--x',
+                        choices=['num_nodes', 'num_edges'],
+                        default='num_nodes',
+                        help='variable the metric is fitted against')
+    parser.add_argument('--family',
+                        default=None,
+                        help='only the runs of this graph type')
+    parser.add_argument('--engine',
+                        default=None,
+                        help='only the runs of this engine')
+    parser.add_argument('--rev',
+                        default=None,
+                        help='only fit the runs of this git revision prefix')
+    parser.add_argument('--baseline',
+                        default=None,
+                        help='git revision prefix to compare the medians ' +
+                        'of each configuration with')
+    parser.add_argument('--current',
+                        default=None,
+                        help='git revision prefix to check against the ' +
+                        'baseline, defaults to the revision of the latest run')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.1,
+                        help='relative increase of the median flagged as a ' +
+                        'regression')
+    parser.add_argument('--plot',
+                        action='store_true',
+                        help='draw the runs and the fitted curves')
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        parser.error('No results store at ' + args.db)
+
+    connection = open_store(args.db)
+    rows = select_runs(connection, args.metric, args.family, args.engine,
+                       args.rev)
+    groups = fit_groups(rows, args.metric, args.x)
+    for (family, engine), (points, fit) in sorted(groups.items()):
+        if fit is None:
+            text = 'not enough sizes to fit'
+        else:
+            text = '%.4g * %s^%.3f' % (fit[0], args.x, fit[1])
+        print(family + ' ' + engine + ': ' + str(len(points)) + ' runs, ' +
+              args.metric + ' ~ ' + text)
+
+    regressed = False
+    if args.baseline is not None:
+        for comparison in find_regressions(connection, args.metric,
+                                           args.baseline, args.current,
+                                           args.threshold, args.family,
+                                           args.engine):
+            regressed = regressed or comparison['regressed']
+            print(('REGRESSION ' if comparison['regressed'] else 'ok ') +
+                  (comparison['family'] or '-') + ' ' +
+                  str(comparison['num_nodes']) + ' ' + comparison['engine'] +
+                  ' ' + str(comparison['wake_policy']) + ': ' +
+                  '%.4g -> %.4g' %
+                  (comparison['baseline'], comparison['current']))
+    connection.close()
+
+    if args.plot:
+        plot_groups(groups, args.metric, args.x)
+    if regressed:
+        sys.exit(1)
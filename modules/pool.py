@@ -0,0 +1,233 @@
+"""Pool of pre-forked workers, kept alive to run the GHS Algorithm on many
+graphs back to back.
+
+On a small graph, spawning the processes and creating the queues of an engine
+costs more than the run itself. The workers of a pool are forked once, along
+with their inbound queues, and then wait for jobs. A job hands a graph to one
+worker or more, which create fresh Node instances for their share of its
+nodes and run them as workers of the sharded engine (modules/sharded.py),
+talking to the other workers of the job only. The inbound queues are left
+empty at the end of every job, as each worker waits for all the others to
+finish, so the next job starts from a clean state without any new process.
+
+A graph is either spread over all the workers with WorkerPool.run, or run
+whole on a single worker, many graphs at a time, with WorkerPool.map:
+
+    with WorkerPool(4) as pool:
+        for total_messages, result, counters in pool.map(graphs):
+            ...
+"""
+import os
+import traceback
+from multiprocessing import Process, Queue
+from modules.sharded import Worker, QueueChannel, shard_of
+from modules.stats import new_counters, add_counters
+from modules.result import collect_records
+from modules.wake import as_plan
+from modules.graph import load_graph
+
+
+def serve(index, inbound, jobs, results):
+    """Entry point of each worker of the pool, running the jobs handed to it
+    till the pool is closed
+
+    Arguments:
+        index {Integer} -- Index of the worker in the pool
+        inbound {List} -- Inbound queue of each worker of the pool
+        jobs {Multiprocessing Queue} -- Jobs of this worker, None to exit
+        results {Multiprocessing Queue} -- Queue to return the results on
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, graph, placement, wakeups, debug_level, members = job
+        channel = QueueChannel(members.index(index),
+                               [inbound[member] for member in members])
+        try:
+            worker = Worker(channel.index, graph, placement, channel,
+                            debug_level)
+            results.put((job_id, worker.run(wakeups)))
+        except Exception:
+            results.put((job_id, traceback.format_exc()))
+
+
+class WorkerPool:
+    """Long-lived workers running the sharded engine on one graph after the
+    other. A pool is driven by a single thread, one call at a time"""
+    def __init__(self, num_workers=None):
+        """Ctor, fork the workers
+
+        Keyword Arguments:
+            num_workers {Integer} -- Number of workers, defaults to the
+                                     number of cores (default: {None})
+        """
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.num_workers = max(1, num_workers)
+        self.next_job = 0
+        inbound = [Queue() for _ in range(self.num_workers)]
+        self.jobs = [Queue() for _ in range(self.num_workers)]
+        self.results = Queue()
+        self.processes = []
+        for index in range(self.num_workers):
+            p = Process(target=serve,
+                        args=(index, inbound, self.jobs[index], self.results),
+                        daemon=True)
+            self.processes.append(p)
+            p.start()
+
+    def __enter__(self):
+        """Use the pool as a context manager, closed on exit
+
+        Returns:
+            WorkerPool -- This pool
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the pool, or terminate it on an error"""
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def __submit(self, graph, wake_plan, debug_level, members):
+        """Hand a graph to the given workers, splitting its nodes between them
+
+        Arguments:
+            graph {Graph} -- Graph to run
+            wake_plan {WakePlan} -- Nodes to wake up
+            debug_level {String} -- Debug Level - basic/info/debug
+            members {List} -- Indexes of the workers running the graph
+
+        Returns:
+            Integer -- Id of the job
+        """
+        job_id = self.next_job
+        self.next_job += 1
+        num_nodes = graph.num_nodes
+        placement = [
+            shard_of(node_id, num_nodes, len(members))
+            for node_id in range(num_nodes)
+        ]
+        wakeups = wake_plan.by_worker(placement, len(members))
+        for position in range(len(members)):
+            self.jobs[members[position]].put(
+                (job_id, graph, placement, wakeups[position], debug_level,
+                 members))
+        return job_id
+
+    def __result(self):
+        """Wait for the result of a worker
+
+        Raises:
+            RuntimeError: If the worker failed, after terminating the pool
+                          as the other workers of the job may never finish
+
+        Returns:
+            Tuple -- Id of the job, and the number of messages, node records
+                     and counters of the worker
+        """
+        job_id, outcome = self.results.get()
+        if isinstance(outcome, str):
+            self.terminate()
+            raise RuntimeError('A worker of the pool failed:\n' + outcome)
+        return job_id, outcome
+
+    def run(self, graph, wake_plan, debug_level='basic', timer=None):
+        """Run the GHS Algorithm on a graph spread over the workers
+
+        Arguments:
+            graph {Graph} -- Graph to run
+            wake_plan {WakePlan} -- Nodes to wake up
+
+        Keyword Arguments:
+            debug_level {String} -- Debug Level - basic/info/debug
+                                    (default: {'basic'})
+            timer {PhaseTimer} -- If given, marks the end of the spawn phase,
+                                  once the graph is handed to the workers
+                                  (default: {None})
+
+        Returns:
+            Tuple -- Total number of messages, the MST result and the
+                     counters of all the nodes
+        """
+        num_used = max(1, min(self.num_workers, graph.num_nodes))
+        self.__submit(graph, wake_plan, debug_level, list(range(num_used)))
+        if timer is not None:
+            timer.mark('spawn')
+
+        total_messages = 0
+        counters = new_counters()
+        all_records = []
+        for _ in range(num_used):
+            _, (worker_messages, records, worker_counters) = self.__result()
+            total_messages += worker_messages
+            add_counters(counters, worker_counters)
+            all_records.append(records)
+        return total_messages, collect_records(graph, all_records), counters
+
+    def map(self, graphs, wake=None, debug_level='basic', seed=0):
+        """Run the GHS Algorithm on many graphs, each graph running whole on a
+        single worker, and every worker running a graph at a time
+
+        Arguments:
+            graphs {Iterable} -- Graphs to run, or paths of graphs in the
+                                 text or the binary format
+
+        Keyword Arguments:
+            wake {Object} -- Nodes to wake up in each graph, as accepted by
+                             as_plan (default: {None})
+            debug_level {String} -- Debug Level - basic/info/debug
+                                    (default: {'basic'})
+            seed {Integer} -- Seed of the nodes woken up at random
+                              (default: {0})
+
+        Yields:
+            Tuple -- Total number of messages, the MST result and the
+                     counters of each graph, in the order of the graphs
+        """
+        graphs = iter(graphs)
+        running = {}
+        finished = {}
+        submitted = 0
+        yielded = 0
+
+        def submit(index):
+            nonlocal submitted
+            graph = next(graphs, None)
+            if graph is not None:
+                if isinstance(graph, str):
+                    graph = load_graph(graph)
+                job_id = self.__submit(graph, as_plan(graph, wake, seed),
+                                       debug_level, [index])
+                running[job_id] = (submitted, index, graph)
+                submitted += 1
+
+        for index in range(self.num_workers):
+            submit(index)
+        while yielded < submitted:
+            job_id, (total_messages, records, counters) = self.__result()
+            position, index, graph = running.pop(job_id)
+            finished[position] = (total_messages,
+                                  collect_records(graph, [records]), counters)
+            # The worker is free for the next graph
+            submit(index)
+            while yielded in finished:
+                yield finished.pop(yielded)
+                yielded += 1
+
+    def close(self):
+        """Let the workers finish their jobs and exit"""
+        for jobs in self.jobs:
+            jobs.put(None)
+        for p in self.processes:
+            p.join()
+
+    def terminate(self):
+        """Kill the workers, leaving their jobs unfinished"""
+        for p in self.processes:
+            p.terminate()
+        for p in self.processes:
+            p.join()
@@ -0,0 +1,171 @@
+"""Process engine for the GHS Algorithm, running every node in an OS process
+of its own.
+
+Each node reads the batches sent to it from its own queue, which is either a
+multiprocessing Queue or a ring buffer in shared memory (see
+modules/shm_transport.py). When a node has completed, it writes its counters,
+its father edge and its level into shared arrays, each node writing to its own
+slot only, so that no lock is needed.
+"""
+import gc
+from multiprocessing import Process, Queue, Array
+from multiprocessing.connection import wait
+from node import Node
+from modules.utils import node_edges
+from modules.result import MSTResult
+from modules.wake import deliver_wakeups
+from modules.shm_transport import RingBuffer, RingWriter, RingInbox
+from modules.shm_transport import ring_capacity
+from modules.stats import NUM_COUNTERS, SENT, DEFERRED, TOP_RSS
+from modules.stats import new_counters, add_counters, record_top, peak_rss
+from modules import trace
+
+
+def spawn_process(node_id, name, edges, msg_q, wake, debug_level, counters,
+                  fathers, levels):
+    """Spawn a new process for node with given name and adjacent edges
+
+    Arguments:
+        node_id {Integer} -- Node Id
+        name {Float} -- Fragment Name, initially zero for all
+        edges {Adjacency} -- Edges of the node, with the queues of its
+                             neighbours only
+        msg_q {Multiprocessing Queue} -- Queue for the node
+        wake {Bool} -- Whether the node wakes up at the start
+        debug_level {String} -- Debug Level - basic/info/debug
+        counters {Multiprocessing Array} -- Counters of all the nodes, each
+                                            node writing to its own slot
+        fathers {Multiprocessing Array} -- Edge id along the father of each
+                                           node
+        levels {Multiprocessing Array} -- Final level of each node
+    """
+    node = Node(node_id, edges, name, msg_q, debug_level)
+
+    # The nodes to wake up are chosen by the driver, the other nodes wake up
+    # on their first message
+    if wake:
+        node.wakeup()
+
+    node.start_operation()
+    record_top(node.counters, TOP_RSS, peak_rss()[0], node_id)
+    # No lock is needed, as no other node writes to this slot
+    offset = node_id * NUM_COUNTERS
+    counters[offset:offset + NUM_COUNTERS] = node.counters
+    fathers[node_id] = node.return_father_id()
+    levels[node_id] = node.level
+    # The process exits without running any exit handler
+    trace.flush()
+
+
+def join_processes(processes):
+    """Wait for all the node processes to exit, and stop the run as soon as
+    one of them fails, as the other nodes would otherwise wait forever for
+    its messages
+
+    Arguments:
+        processes {List} -- Process of each node
+
+    Raises:
+        RuntimeError: If a process exits with an error, once all the other
+                      processes are terminated
+    """
+    running = {p.sentinel: node_id for node_id, p in enumerate(processes)}
+    while running:
+        for sentinel in wait(list(running)):
+            node_id = running.pop(sentinel)
+            p = processes[node_id]
+            p.join()
+            if p.exitcode != 0:
+                for other in processes:
+                    if other.is_alive():
+                        other.terminate()
+                for other in processes:
+                    other.join()
+                raise RuntimeError('The process of node ' + str(node_id) +
+                                   ' exited with code ' + str(p.exitcode) +
+                                   ', the run is stopped')
+
+
+def run_processes(graph, wake_plan, debug_level, transport='queue',
+                  timer=None):
+    """Run the GHS Algorithm with one OS process per node
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        transport {String} -- queue: multiprocessing queues, shm: shared
+                              memory ring buffers (default: {'queue'})
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+
+    Raises:
+        RuntimeError: If the process of a node fails
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    num_nodes = graph.num_nodes
+
+    # Attach a queue for each process
+    if transport == 'shm':
+        rings = [
+            RingBuffer(ring_capacity(graph.degree(node_id)))
+            for node_id in range(num_nodes)
+        ]
+        queues = [RingWriter(ring) for ring in rings]
+        inboxes = [RingInbox(ring) for ring in rings]
+    else:
+        queues = []
+        for _ in range(num_nodes):
+            q = Queue()
+            queues.append(q)
+        inboxes = queues
+
+    # Form the edges of each node from the given input. Each process is only
+    # handed the edges of its node, with the queues of its neighbours, so
+    # that its memory grows with the degree of the node and not with the
+    # size of the graph
+    edges = [
+        node_edges(graph, node_id, queues) for node_id in range(num_nodes)
+    ]
+
+    # Spawn processes for each node
+    wake_ids = set(wake_plan.immediate())
+    node_counters = Array('q', num_nodes * NUM_COUNTERS, lock=False)
+    fathers = Array('i', num_nodes, lock=False)
+    levels = Array('B', num_nodes, lock=False)
+    processes = []
+    # The objects inherited from the driver are left out of the collections
+    # of the children, which would otherwise touch, and so copy, every page
+    # holding them
+    gc.freeze()
+    for node_id in range(num_nodes):
+        p = Process(target=spawn_process,
+                    args=(node_id, 0, edges[node_id], inboxes[node_id],
+                          node_id in wake_ids, debug_level, node_counters,
+                          fathers, levels))
+        processes.append(p)
+        p.start()
+    gc.unfreeze()
+    if timer is not None:
+        timer.mark('spawn')
+    deliver_wakeups(wake_plan.delayed(), queues)
+
+    # Join processes before checking the output
+    try:
+        join_processes(processes)
+    finally:
+        if transport == 'shm':
+            for ring in rings:
+                ring.release()
+
+    counters = new_counters()
+    for node_id in range(num_nodes):
+        offset = node_id * NUM_COUNTERS
+        add_counters(counters, node_counters[offset:offset + NUM_COUNTERS])
+    total_messages = sum(counters[SENT:DEFERRED])
+    return total_messages, MSTResult(graph, fathers, levels), counters
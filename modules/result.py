@@ -0,0 +1,175 @@
+"""Minimum spanning tree found by a run of the GHS Algorithm.
+
+When the algorithm completes, every node knows the edge along its father,
+pointing towards the core edge of the final fragment, of which both end nodes
+point to each other. The edges along the fathers of all the nodes are thus
+exactly the tree edges, and each node only has to report its own father edge
+and level, without any lock: the tree edges, the parent of each node in the
+tree rooted at the lower end node of the core edge, and the core edge are
+derived from these.
+
+The binary format of a result is:
+
+    magic      8 bytes    b'GHSMST1\\0'
+    header     int64[3]   number of nodes, number of tree edges, core edge
+    edge_ids   int32[N - 1]   ordered by weight
+    parents    int32[N]       -1 for the root
+    fathers    int32[N]       edge id along the father, -1 if none
+    levels     uint8[N]
+"""
+import struct
+from array import array
+from modules.graph import format_weight
+
+MAGIC = b'GHSMST1\0'
+HEADER = struct.Struct('<qqq')
+
+NO_PARENT = -1
+
+
+class MSTResult:
+    """Tree edges, parents and levels found by the nodes"""
+    def __init__(self, graph, fathers, levels):
+        """Ctor
+
+        Arguments:
+            graph {Graph} -- Graph read from the input file
+            fathers {Sequence} -- Edge id along the father of each node, -1
+                                  if the node has none
+            levels {Sequence} -- Final level of each node
+        """
+        num_nodes = graph.num_nodes
+        self.num_nodes = num_nodes
+        self.fathers = array('i', fathers)
+        self.levels = bytearray(levels)
+
+        # Both end nodes of the core edge point to each other, so every tree
+        # edge is found once, apart from the core edge found twice
+        tree_edges = set(self.fathers)
+        tree_edges.discard(NO_PARENT)
+        self.edge_ids = array(
+            'i', sorted(tree_edges, key=graph.weights.__getitem__))
+        self.weight = sum(graph.weights[edge] for edge in self.edge_ids)
+
+        # A tree without a core edge, as repaired by modules/incremental.py,
+        # is rooted at the node without a father
+        self.core_edge = NO_PARENT
+        self.root = NO_PARENT
+        self.parents = array('i', [NO_PARENT]) * num_nodes
+        node1s = graph.node1
+        node2s = graph.node2
+        for node_id in range(num_nodes):
+            edge = self.fathers[node_id]
+            if edge == NO_PARENT:
+                self.root = node_id
+                continue
+            node1 = node1s[edge]
+            other = node2s[edge] if node1 == node_id else node1
+            if self.fathers[other] == edge and other > node_id:
+                # The lower end node of the core edge is the root
+                self.core_edge = edge
+                self.root = node_id
+            else:
+                self.parents[node_id] = other
+
+    def write_text(self, graph, file):
+        """Write the tree edges, ordered by weight, in a single write
+
+        Arguments:
+            graph {Graph} -- Graph read from the input file
+            file {File} -- Output file
+        """
+        node1s = graph.node1
+        node2s = graph.node2
+        weights = graph.weights
+        lines = []
+        for edge in self.edge_ids:
+            node1 = node1s[edge]
+            node2 = node2s[edge]
+            if node1 > node2:
+                node1, node2 = node2, node1
+            lines.append('(' + str(node1) + ', ' + str(node2) + ', ' +
+                         format_weight(weights[edge]) + ')\n')
+        file.write(''.join(lines))
+
+    def write_binary(self, path):
+        """Write the result in the binary format
+
+        Arguments:
+            path {String} -- Path of the output file
+        """
+        with open(path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(
+                HEADER.pack(self.num_nodes, len(self.edge_ids),
+                            self.core_edge))
+            file.write(self.edge_ids)
+            file.write(self.parents)
+            file.write(self.fathers)
+            file.write(self.levels)
+
+
+def load_result(graph, path):
+    """Read a result written in the binary format
+
+    Arguments:
+        graph {Graph} -- Graph the result was found on
+        path {String} -- Path of the result file
+
+    Raises:
+        ValueError: If the file is not a result of this graph
+
+    Returns:
+        MSTResult -- Result read from the file
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + ' is not an MST result file')
+    num_nodes, num_tree_edges, _ = HEADER.unpack_from(data, len(MAGIC))
+    if num_nodes != graph.num_nodes:
+        raise ValueError(path + ' is not a result of this graph')
+
+    # Only the fathers and levels are needed, the rest is derived again
+    offset = len(MAGIC) + HEADER.size + 4 * (num_tree_edges + num_nodes)
+    fathers = array('i')
+    fathers.frombytes(data[offset:offset + 4 * num_nodes])
+    offset += 4 * num_nodes
+    return MSTResult(graph, fathers, data[offset:offset + num_nodes])
+
+
+def node_records(nodes):
+    """Flatten the node id, father edge id and level of completed nodes, to
+    be returned by a worker
+
+    Arguments:
+        nodes {Iterable} -- Completed nodes
+
+    Returns:
+        Array -- (node id, father edge id, level) of each node
+    """
+    records = array('i')
+    for node in nodes:
+        records.extend((node.node_id, node.return_father_id(), node.level))
+    return records
+
+
+def collect_records(graph, all_records):
+    """Assemble the result from the records returned by all the workers
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        all_records {Iterable} -- Records of each worker, as returned by
+                                  node_records
+
+    Returns:
+        MSTResult -- Result of the run
+    """
+    fathers = array('i', [NO_PARENT]) * graph.num_nodes
+    levels = bytearray(graph.num_nodes)
+    for records in all_records:
+        for _in in range(0, len(records), 3):
+            node_id = records[_in]
+            fathers[node_id] = records[_in + 1]
+            levels[node_id] = records[_in + 2]
+    return MSTResult(graph, fathers, levels)
@@ -0,0 +1,312 @@
+"""Store of the results of all the runs, an SQLite database written by main.py
+and queried by modules/plot.py
+
+Every run of main.py inserts one row into the runs table: the graph, the
+options of the run, the wall time of its phases, its peak RSS, its protocol
+counters and the git revision of the code. The runs are indexed by graph hash,
+by family and number of nodes, and by git revision, so that the runs of a
+configuration are looked up without reading the whole store.
+
+The graph hash is the SHA-1 of the end points and the weights of the edges,
+so that the runs of the same graph are found whatever the path or the format
+of its file. The family is read from the name of the files written by
+generate.py and benchmark.py, inp-<num-nodes>-<family>[-s<seed>].
+"""
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import statistics
+import subprocess
+from array import array
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    git_rev TEXT,
+    graph_hash TEXT NOT NULL,
+    input TEXT,
+    family TEXT,
+    num_nodes INTEGER NOT NULL,
+    num_edges INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    transport TEXT,
+    workers INTEGER,
+    wake_policy TEXT,
+    wake_processes INTEGER,
+    seed INTEGER,
+    total_messages INTEGER,
+    deferred INTEGER,
+    critical_path INTEGER,
+    load REAL,
+    spawn REAL,
+    protocol REAL,
+    verify REAL,
+    peak_rss_kb INTEGER,
+    peak_children_rss_kb INTEGER,
+    messages TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_graph ON runs (graph_hash, engine);
+CREATE INDEX IF NOT EXISTS runs_family ON runs (family, num_nodes, engine);
+CREATE INDEX IF NOT EXISTS runs_rev ON runs (git_rev, time);
+'''
+COLUMNS = [
+    'time', 'git_rev', 'graph_hash', 'input', 'family', 'num_nodes',
+    'num_edges', 'engine', 'transport', 'workers', 'wake_policy',
+    'wake_processes', 'seed', 'total_messages', 'deferred', 'critical_path',
+    'load', 'spawn', 'protocol', 'verify', 'peak_rss_kb',
+    'peak_children_rss_kb', 'messages'
+]
+METRICS = [
+    'total_messages', 'deferred', 'critical_path', 'load', 'spawn',
+    'protocol', 'verify', 'peak_rss_kb', 'peak_children_rss_kb'
+]
+# Runs of the same configuration, compared across revisions
+CONFIGURATION = [
+    'graph_hash', 'engine', 'transport', 'workers', 'wake_policy',
+    'wake_processes'
+]
+FAMILY = re.compile(r'inp-\d+-([a-z]+)')
+
+
+def graph_hash(graph):
+    """Hash of the edges of a graph
+
+    Arguments:
+        graph {Graph} -- Graph
+
+    Returns:
+        String -- Hexadecimal SHA-1 of the number of nodes and of the arrays
+                  of the end points and the weights
+    """
+    digest = hashlib.sha1(str(graph.num_nodes).encode())
+    for values, typecode in ((graph.node1, 'i'), (graph.node2, 'i'),
+                             (graph.weights, 'd')):
+        if not isinstance(values, (array, memoryview)):
+            values = array(typecode, values)
+        digest.update(values)
+    return digest.hexdigest()
+
+
+def family_of(path):
+    """Graph family of an input file, from its name
+
+    Arguments:
+        path {String} -- Path of the input file
+
+    Returns:
+        String -- Graph type given to generate.py, or None if the name does
+                  not tell
+    """
+    match = FAMILY.match(os.path.basename(path))
+    return match.group(1) if match is not None else None
+
+
+def git_revision():
+    """Git revision of the code being run
+
+    Returns:
+        String -- Commit hash, or None outside of a git checkout
+    """
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=10,
+            check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.decode().strip() or None
+
+
+def open_store(path):
+    """Open the store, creating it if it does not exist
+
+    Arguments:
+        path {String} -- Path of the database
+
+    Returns:
+        Connection -- Connection to the database
+    """
+    # Concurrent runs wait for each other to insert, instead of failing
+    connection = sqlite3.connect(path, timeout=60)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record_run(path, run):
+    """Insert a run into the store
+
+    Arguments:
+        path {String} -- Path of the database
+        run {Dict} -- Values of the run, keyed by the columns of the runs
+                      table, the messages being the summary of the counters
+    """
+    values = dict(run)
+    values.setdefault('time', time.time())
+    values.setdefault('git_rev', git_revision())
+    if values.get('messages') is not None:
+        values['messages'] = json.dumps(values['messages'])
+
+    connection = open_store(path)
+    try:
+        with connection:
+            connection.execute(
+                'INSERT INTO runs (' + ', '.join(COLUMNS) + ') VALUES (' +
+                ', '.join('?' * len(COLUMNS)) + ')',
+                [values.get(column) for column in COLUMNS])
+    finally:
+        connection.close()
+
+
+def check_metric(metric):
+    """Check that a metric is a column of the runs table, before it is put in
+    a query
+
+    Arguments:
+        metric {String} -- One of METRICS
+
+    Raises:
+        ValueError: If the metric is unknown
+    """
+    if metric not in METRICS:
+        raise ValueError('Unknown metric ' + str(metric))
+
+
+def select_runs(connection, metric, family=None, engine=None, git_rev=None):
+    """Runs having a value of the metric, ordered by the number of nodes
+
+    Arguments:
+        connection {Connection} -- Connection to the store
+        metric {String} -- One of METRICS
+
+    Keyword Arguments:
+        family {String} -- Only the runs of this family (default: {None})
+        engine {String} -- Only the runs of this engine (default: {None})
+        git_rev {String} -- Only the runs of the revisions starting with this
+                            prefix (default: {None})
+
+    Raises:
+        ValueError: If the metric is unknown
+
+    Returns:
+        List -- Rows of the runs
+    """
+    check_metric(metric)
+    conditions = [metric + ' IS NOT NULL']
+    parameters = []
+    for column, value in (('family', family), ('engine', engine)):
+        if value is not None:
+            conditions.append(column + ' = ?')
+            parameters.append(value)
+    if git_rev is not None:
+        conditions.append("git_rev LIKE ? || '%'")
+        parameters.append(git_rev)
+    return connection.execute(
+        'SELECT * FROM runs WHERE ' + ' AND '.join(conditions) +
+        ' ORDER BY num_nodes, time', parameters).fetchall()
+
+
+def latest_revision(connection):
+    """Git revision of the latest run
+
+    Arguments:
+        connection {Connection} -- Connection to the store
+
+    Returns:
+        String -- Commit hash, or None if the store is empty
+    """
+    row = connection.execute(
+        'SELECT git_rev FROM runs ORDER BY time DESC LIMIT 1').fetchone()
+    return row[0] if row is not None else None
+
+
+def fit_power_law(points):
+    """Least squares fit of y = a x^k on a log-log scale
+
+    Arguments:
+        points {List} -- Pairs (x, y), of positive values
+
+    Returns:
+        Tuple -- Coefficient a and exponent k, or None if the x values do
+                 not differ
+    """
+    logs = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(set(x for x, _ in logs)) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in logs)
+    mean_y = statistics.fmean(y for _, y in logs)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in logs)
+    variance = sum((x - mean_x)**2 for x, _ in logs)
+    exponent = covariance / variance
+    return math.exp(mean_y - exponent * mean_x), exponent
+
+
+def find_regressions(connection,
+                     metric,
+                     baseline,
+                     current=None,
+                     threshold=0.1,
+                     family=None,
+                     engine=None):
+    """Compare the median of a metric over the runs of each configuration
+    between two revisions
+
+    Arguments:
+        connection {Connection} -- Connection to the store
+        metric {String} -- One of METRICS
+        baseline {String} -- Prefix of the baseline revision
+
+    Keyword Arguments:
+        current {String} -- Prefix of the revision to check, the revision of
+                            the latest run if None (default: {None})
+        threshold {Float} -- Relative increase of the median flagged as a
+                             regression (default: {0.1})
+        family {String} -- Only the runs of this family (default: {None})
+        engine {String} -- Only the runs of this engine (default: {None})
+
+    Raises:
+        ValueError: If the metric is unknown
+
+    Returns:
+        List -- For each configuration run at both revisions, its values,
+                the baseline and current medians, and whether it regressed,
+                empty if the revision to check is unknown
+    """
+    if current is None:
+        current = latest_revision(connection)
+        if current is None:
+            return []
+    medians = []
+    for git_rev in (baseline, current):
+        values = {}
+        for row in select_runs(connection, metric, family, engine,
+                               git_rev):
+            key = tuple(row[column] for column in CONFIGURATION)
+            values.setdefault(key, ([], row))[0].append(row[metric])
+        medians.append(values)
+
+    comparisons = []
+    for key, (values, row) in medians[1].items():
+        if key not in medians[0]:
+            continue
+        before = statistics.median(medians[0][key][0])
+        after = statistics.median(values)
+        comparisons.append({
+            'family': row['family'],
+            'num_nodes': row['num_nodes'],
+            'engine': row['engine'],
+            'wake_policy': row['wake_policy'],
+            'baseline': before,
+            'current': after,
+            'regressed': after > before * (1 + threshold),
+        })
+    return comparisons
@@ -0,0 +1,475 @@
+"""Sharded worker pool engine for the GHS Algorithm.
+
+The nodes of the graph are split across a fixed number of worker processes,
+each of which runs the Node instances of its shard. Messages between two nodes
+of the same worker are delivered in memory. Messages for nodes living on
+another worker are collected in an outbox per destination worker, and sent as
+a single batch through the channel between the workers once all the local
+messages have been processed. The default channel is made of an inbound
+multiprocessing Queue for each worker.
+
+With a checkpoint directory, the workers take a Chandy-Lamport snapshot of
+the run at every interval, as described in modules/checkpoint.py, carrying
+the markers over the same channel as the batches.
+"""
+import os
+import time
+import queue
+from collections import deque
+from multiprocessing import Process, Queue
+from node import Node
+from modules.utils import build_edges
+from modules.stats import TOP_RSS, new_counters, add_counters, record_top
+from modules.stats import peak_rss
+from modules.result import node_records, collect_records
+from modules import trace
+
+
+def shard_of(node_id, num_nodes, num_workers):
+    """Find the worker hosting the given node
+
+    Arguments:
+        node_id {Integer} -- Node Id
+        num_nodes {Integer} -- Number of nodes in the graph
+        num_workers {Integer} -- Number of workers
+
+    Returns:
+        Integer -- Index of the worker
+    """
+    return node_id * num_workers // num_nodes
+
+
+def count_queued(pending):
+    """Number of messages pending for each node
+
+    Arguments:
+        pending {Sequence} -- (node id, batch) of the pending batches
+
+    Returns:
+        Dict -- Number of messages, keyed by node id
+    """
+    queued = {}
+    for node_id, batch in pending:
+        queued[node_id] = queued.get(node_id, 0) + len(batch)
+    return queued
+
+
+class LocalQueue:
+    """Queue of a node hosted on the same worker as the writer"""
+    def __init__(self, worker, node_id):
+        """Ctor
+
+        Arguments:
+            worker {Worker} -- Worker hosting the node
+            node_id {Integer} -- Node Id of the node owning the queue
+        """
+        self.worker = worker
+        self.node_id = node_id
+
+    def put(self, batch):
+        """Deliver the batch in memory
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.worker.pending.append((self.node_id, batch))
+
+    def close(self):
+        """Nothing to release for an in-memory queue"""
+        pass
+
+
+class RemoteQueue:
+    """Queue of a node hosted on another worker"""
+    def __init__(self, worker, target, node_id):
+        """Ctor
+
+        Arguments:
+            worker {Worker} -- Worker from which the messages are sent
+            target {Integer} -- Index of the worker hosting the node
+            node_id {Integer} -- Node Id of the node owning the queue
+        """
+        self.worker = worker
+        self.target = target
+        self.node_id = node_id
+
+    def put(self, batch):
+        """Add the batch to the outbox of the remote worker
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.worker.outboxes[self.target].append((self.node_id, batch))
+
+    def close(self):
+        """Nothing to release for a remote queue"""
+        pass
+
+
+class QueueChannel:
+    """Channel between the workers, made of an inbound queue for each worker"""
+    def __init__(self, index, inbound):
+        """Ctor
+
+        Arguments:
+            index {Integer} -- Index of the worker using the channel
+            inbound {List} -- Inbound queue of each worker
+        """
+        self.index = index
+        self.inbound = inbound
+        self.peers = set(range(len(inbound))) - {index}
+        self.finished = 0
+
+    def send(self, target, batch):
+        """Send a batch of messages to another worker
+
+        Arguments:
+            target {Integer} -- Index of the receiving worker
+            batch {List} -- List of (node id, batch of messages) pairs
+        """
+        self.inbound[target].put((self.index, batch))
+
+    def send_marker(self, target, snapshot_id):
+        """Send the marker of a snapshot to another worker, after all the
+        batches sent to it so far
+
+        Arguments:
+            target {Integer} -- Index of the receiving worker
+            snapshot_id {Integer} -- Id of the snapshot
+        """
+        self.inbound[target].put((self.index, snapshot_id))
+
+    def __handle(self, item, batches):
+        """Handle an item read from the inbound queue
+
+        Arguments:
+            item {Tuple} -- Sender and batch of messages or marker, None if
+                            the sender has finished
+            batches {List} -- List of items received so far
+        """
+        if item is None:
+            self.finished += 1
+        else:
+            batches.append(item)
+
+    def receive(self, timeout):
+        """Receive the batches sent to this worker
+
+        Arguments:
+            timeout {Float} -- Time to wait in seconds for an item if nothing
+                               is pending, None to wait indefinitely
+
+        Returns:
+            List -- (sender, batch) pairs, in the order received, the batch
+                    being replaced by the snapshot id for a marker
+        """
+        inbound = self.inbound[self.index]
+        batches = []
+        if timeout != 0:
+            try:
+                self.__handle(inbound.get(True, timeout), batches)
+            except queue.Empty:
+                return batches
+        while not inbound.empty():
+            self.__handle(inbound.get(), batches)
+        return batches
+
+    def finish(self):
+        """Notify all the other workers that this worker has finished"""
+        for target in range(len(self.inbound)):
+            if target != self.index:
+                self.inbound[target].put(None)
+
+    def done(self):
+        """Check whether all the other workers have finished
+
+        Returns:
+            Bool -- True if no more messages can be received
+        """
+        return self.finished == len(self.inbound) - 1
+
+
+class Worker:
+    """Worker process running all the nodes of a shard"""
+    def __init__(self,
+                 index,
+                 graph,
+                 placement,
+                 channel,
+                 debug_level,
+                 checkpointer=None,
+                 resume=None):
+        """Ctor
+
+        Arguments:
+            index {Integer} -- Index of the worker
+            graph {Graph} -- Graph read from the input file
+            placement {List} -- Index of the worker hosting each node
+            channel {Object} -- Channel to the other workers
+            debug_level {String} -- Debug Level - basic/info/debug
+
+        Keyword Arguments:
+            checkpointer {Checkpointer} -- If given, the run is snapshot at
+                                           its interval (default: {None})
+            resume {Checkpoint} -- If given, the nodes resume from this
+                                   snapshot (default: {None})
+        """
+        num_workers = max(placement) + 1
+        self.index = index
+        self.channel = channel
+        self.pending = deque()
+        self.outboxes = [[] for _ in range(num_workers)]
+        self.checkpointer = checkpointer
+        # State of the nodes, batches in flight and peers whose marker is
+        # awaited, of each snapshot being recorded
+        self.recordings = {}
+
+        queues = []
+        local_ids = set()
+        for node_id in range(graph.num_nodes):
+            target = placement[node_id]
+            if target == index:
+                local_ids.add(node_id)
+                queues.append(LocalQueue(self, node_id))
+            else:
+                queues.append(RemoteQueue(self, target, node_id))
+
+        self.edges = build_edges(graph, queues, local_ids)
+        self.nodes = {}
+        for node_id in sorted(local_ids):
+            self.nodes[node_id] = Node(node_id, self.edges[node_id], 0,
+                                       queues[node_id], debug_level)
+
+        if resume is not None:
+            for node_id in self.nodes:
+                self.nodes[node_id].restore(resume.states[node_id])
+            for node_id, batch in resume.in_flight:
+                if node_id in self.nodes:
+                    self.pending.append((node_id, batch))
+
+    def flush(self):
+        """Send the batch of messages collected for each remote worker"""
+        for target in range(len(self.outboxes)):
+            batch = self.outboxes[target]
+            if batch:
+                # The batch may be serialized later by the channel, so start
+                # a new list instead of clearing it
+                self.channel.send(target, batch)
+                self.outboxes[target] = []
+
+    def __start_snapshot(self, snapshot_id):
+        """Record the state of the nodes and the pending batches, and send
+        the marker of the snapshot to every peer before any other batch.
+        Called between two rounds, once the outboxes have been sent
+
+        Arguments:
+            snapshot_id {Integer} -- Id of the snapshot
+        """
+        self.checkpointer.seen(snapshot_id)
+        states = {}
+        for node_id in self.nodes:
+            states[node_id] = self.nodes[node_id].snapshot()
+        self.recordings[snapshot_id] = (states, list(self.pending),
+                                        set(self.channel.peers))
+        for peer in self.channel.peers:
+            self.channel.send_marker(peer, snapshot_id)
+
+    def __end_snapshot(self, snapshot_id):
+        """Write the part of the snapshot of this worker, once the markers of
+        all the peers have been received
+
+        Arguments:
+            snapshot_id {Integer} -- Id of the snapshot
+        """
+        states, in_flight, waiting = self.recordings[snapshot_id]
+        if not waiting:
+            del self.recordings[snapshot_id]
+            self.checkpointer.write(snapshot_id, self.index,
+                                    len(self.outboxes), states, in_flight)
+
+    def receive(self, timeout):
+        """Receive the batches sent by the other workers into the pending
+        batches, and handle the markers of the snapshots
+
+        Arguments:
+            timeout {Float} -- Time to wait in seconds for a batch if nothing
+                               is pending, None to wait indefinitely
+        """
+        for sender, batch in self.channel.receive(timeout):
+            if batch.__class__ is int:
+                # The first marker of a snapshot starts its recording
+                if batch not in self.recordings:
+                    self.__start_snapshot(batch)
+                self.recordings[batch][2].discard(sender)
+                self.__end_snapshot(batch)
+                continue
+            if self.recordings:
+                # The batch was in flight when the snapshot was taken
+                for states, in_flight, waiting in self.recordings.values():
+                    if sender in waiting:
+                        in_flight.extend(batch)
+            self.pending.extend(batch)
+
+    def run(self, wakeups):
+        """Run the nodes of the shard till all of them have completed
+
+        Arguments:
+            wakeups {List} -- (delay, node id) of each local node to wake up,
+                              in order of delay
+
+        Returns:
+            Tuple -- Number of messages sent, the records of the nodes of
+                     the shard as returned by node_records, and their
+                     counters
+        """
+        # Delayed nodes are woken up by an empty batch at their time
+        wakeups = deque(wakeups)
+        start = time.monotonic()
+        # Waking up a resumed node again is harmless, as only sleeping nodes
+        # wake up
+        while wakeups and wakeups[0][0] <= 0:
+            self.nodes[wakeups.popleft()[1]].process_batch([])
+
+        remaining = 0
+        for node_id in self.nodes:
+            if not self.nodes[node_id].completed:
+                remaining += 1
+        while True:
+            while wakeups and start + wakeups[0][0] <= time.monotonic():
+                self.pending.append((wakeups.popleft()[1], []))
+
+            # Only process the messages pending at the start of the round, so
+            # that the batches for the other workers are sent regularly. The
+            # messages of a node queued behind its batch count in its inbox
+            queued = count_queued(self.pending)
+            for _ in range(len(self.pending)):
+                node_id, batch = self.pending.popleft()
+                node = self.nodes[node_id]
+                queued[node_id] -= len(batch)
+                # Messages to an already halted node are dropped
+                if not node.completed:
+                    node.process_batch(batch, queued[node_id])
+                    if node.completed:
+                        remaining -= 1
+            self.flush()
+
+            if remaining == 0:
+                break
+            if (self.checkpointer is not None and self.index == 0
+                    and not self.recordings and self.checkpointer.due()):
+                snapshot_id = self.checkpointer.start()
+                self.__start_snapshot(snapshot_id)
+                self.__end_snapshot(snapshot_id)
+            if self.pending:
+                timeout = 0
+            elif wakeups:
+                timeout = max(0, start + wakeups[0][0] - time.monotonic())
+            else:
+                timeout = None
+            self.receive(timeout)
+
+        # Notify the other workers, and wait for all of them to finish so
+        # that no message is left in the channel of an exited worker. The
+        # markers are still answered, so that no snapshot is left waiting
+        self.channel.finish()
+        while not self.channel.done():
+            self.receive(None)
+
+        total_messages = 0
+        counters = new_counters()
+        for node_id in self.nodes:
+            total_messages += self.nodes[node_id].num_messages
+            add_counters(counters, self.nodes[node_id].counters)
+        record_top(counters, TOP_RSS, peak_rss()[0], self.index)
+        trace.flush()
+        return total_messages, node_records(self.nodes.values()), counters
+
+
+def run_worker(index, graph, placement, inbound, results, wakeups,
+               debug_level, checkpointer, resume):
+    """Entry point of each worker process
+
+    Arguments:
+        index {Integer} -- Index of the worker
+        graph {Graph} -- Graph read from the input file
+        placement {List} -- Index of the worker hosting each node
+        inbound {List} -- Inbound queue of each worker
+        results {Multiprocessing Queue} -- Queue to return the results on
+        wakeups {List} -- (delay, node id) of each local node to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+        checkpointer {Checkpointer} -- Writer of the snapshots, or None
+        resume {Checkpoint} -- Snapshot to resume from, or None
+    """
+    channel = QueueChannel(index, inbound)
+    worker = Worker(index, graph, placement, channel, debug_level,
+                    checkpointer, resume)
+    results.put(worker.run(wakeups))
+
+
+def run_sharded(graph,
+                wake_plan,
+                debug_level,
+                num_workers=None,
+                timer=None,
+                checkpointer=None,
+                resume=None):
+    """Run the GHS Algorithm on a pool of workers, each hosting many nodes
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        num_workers {Integer} -- Number of workers, defaults to the number of
+                                 cores (default: {None})
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+        checkpointer {Checkpointer} -- If given, the workers snapshot the run
+                                       at its interval (default: {None})
+        resume {Checkpoint} -- If given, the run resumes from this snapshot,
+                               taken with any number of workers
+                               (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    num_nodes = graph.num_nodes
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_nodes))
+
+    placement = [
+        shard_of(node_id, num_nodes, num_workers)
+        for node_id in range(num_nodes)
+    ]
+    # Hand the nodes to wake up to the worker hosting them
+    wakeups = wake_plan.by_worker(placement, num_workers)
+
+    inbound = [Queue() for _ in range(num_workers)]
+    results = Queue()
+    processes = []
+    for index in range(num_workers):
+        p = Process(target=run_worker,
+                    args=(index, graph, placement, inbound, results,
+                          wakeups[index], debug_level, checkpointer, resume))
+        processes.append(p)
+        p.start()
+    if timer is not None:
+        timer.mark('spawn')
+
+    # Collect the results before joining the workers
+    total_messages = 0
+    counters = new_counters()
+    all_records = []
+    for _ in range(num_workers):
+        worker_messages, records, worker_counters = results.get()
+        total_messages += worker_messages
+        add_counters(counters, worker_counters)
+        all_records.append(records)
+
+    for p in processes:
+        p.join()
+
+    return total_messages, collect_records(graph, all_records), counters
@@ -0,0 +1,203 @@
+"""Shared memory ring buffer transport for the messages between the nodes.
+
+Each node owns a ring buffer of fixed size binary records in a shared memory
+segment, sized from the degree of the node. Neighbours append records to the
+ring under a lock shared by all the writers of the ring, while the owning node
+reads them without any lock, as it is the only reader. A writer finding the
+ring full waits without holding the lock, and gives up with an error if the
+ring stays full, as two nodes filling each other's ring would never read
+their own. The driver of the process engine then sees its node fail and
+terminates the other nodes. Compared to a multiprocessing Queue this avoids pickling,
+the feeder thread and the pipe for every message.
+
+Layout of a ring: the write index (head) and the read index (tail), both as
+native unsigned 64 bit counters, followed by the records, in the format of
+modules.codec.RECORD.
+"""
+import time
+import queue
+from multiprocessing import Lock, shared_memory
+from modules.codec import RECORD, pack_fields, unpack_fields
+
+HEADER_SIZE = 16
+DEFAULT_CAPACITY = 4096
+# Records of a ring for each edge of its node, beyond the default capacity
+RECORDS_PER_EDGE = 16
+# Seconds a writer waits for a full ring to be read before giving up
+STALL_TIMEOUT = 30
+
+# Bounds of the sleep of a node polling its empty ring, in seconds
+MIN_BACKOFF = 0.00005
+MAX_BACKOFF = 0.005
+
+
+class RingBuffer:
+    """Multiple producer single consumer ring buffer in shared memory"""
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Ctor, to be called before the processes are forked
+
+        Keyword Arguments:
+            capacity {Integer} -- Number of records in the ring
+                                  (default: {DEFAULT_CAPACITY})
+        """
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=HEADER_SIZE +
+                                              capacity * RECORD.size)
+        self.buf = self.shm.buf
+        # Single native stores, so that the indexes are never read torn
+        self.header = self.buf[:HEADER_SIZE]
+        self.index = self.header.cast('Q')
+        self.index[0] = self.index[1] = 0
+        self.lock = Lock()
+
+    def push(self, batch):
+        """Append the records of a batch of messages, waiting while the ring
+        is full
+
+        Arguments:
+            batch {List} -- List of encoded messages
+
+        Raises:
+            RuntimeError: If the ring stays full for STALL_TIMEOUT seconds
+        """
+        index = self.index
+        start = 0
+        deadline = None
+        while True:
+            with self.lock:
+                head = index[0]
+                free = self.capacity - (head - index[1])
+                end = min(len(batch), start + free)
+                for msg in batch[start:end]:
+                    offset = HEADER_SIZE + \
+                        (head % self.capacity) * RECORD.size
+                    RECORD.pack_into(self.buf, offset, *pack_fields(msg))
+                    head += 1
+                # Publish the records only after they have been written
+                index[0] = head
+            if end == len(batch):
+                return
+
+            # Wait for the reader without holding the lock, so that the other
+            # writers are not held up
+            if end > start or deadline is None:
+                deadline = time.monotonic() + STALL_TIMEOUT
+            elif time.monotonic() > deadline:
+                raise RuntimeError(
+                    'The ring buffer of ' + str(self.capacity) +
+                    ' records stayed full for ' + str(STALL_TIMEOUT) +
+                    ' seconds, its node is likely blocked writing to a ' +
+                    'full ring itself: raise RECORDS_PER_EDGE')
+            start = end
+            time.sleep(0.0001)
+
+    def pop_all(self):
+        """Remove all the available records, only to be called by the owning
+        node
+
+        Returns:
+            List -- List of encoded messages, empty if the ring is empty
+        """
+        index = self.index
+        tail = index[1]
+        head = index[0]
+        batch = []
+        while tail < head:
+            offset = HEADER_SIZE + (tail % self.capacity) * RECORD.size
+            batch.append(unpack_fields(*RECORD.unpack_from(self.buf, offset)))
+            tail += 1
+        index[1] = tail
+        return batch
+
+    def release(self):
+        """Free the shared memory segment, once all the nodes have completed"""
+        self.index.release()
+        self.header.release()
+        self.index = self.header = self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def ring_capacity(degree):
+    """Number of records of the ring of a node
+
+    Arguments:
+        degree {Integer} -- Degree of the node
+
+    Returns:
+        Integer -- Capacity of the ring
+    """
+    return max(DEFAULT_CAPACITY, degree * RECORDS_PER_EDGE)
+
+
+class RingWriter:
+    """Queue of a node as seen by the edges of its neighbours"""
+    def __init__(self, ring):
+        """Ctor
+
+        Arguments:
+            ring {RingBuffer} -- Ring buffer of the node
+        """
+        self.ring = ring
+
+    def put(self, batch):
+        """Write the batch into the ring buffer of the node
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.ring.push(batch)
+
+
+class RingInbox:
+    """Queue of a node as seen by the node itself"""
+    def __init__(self, ring):
+        """Ctor
+
+        Arguments:
+            ring {RingBuffer} -- Ring buffer of the node
+        """
+        self.ring = ring
+
+    def put(self, batch):
+        """Write the batch into the ring buffer of the node
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.ring.push(batch)
+
+    def get(self):
+        """Read all the available messages, waiting for one if there is none
+
+        Returns:
+            List -- List of encoded messages
+        """
+        backoff = 0
+        while True:
+            batch = self.ring.pop_all()
+            if batch:
+                return batch
+
+            # Back off exponentially while the ring stays empty
+            time.sleep(backoff)
+            backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, backoff * 2))
+
+    def get_nowait(self):
+        """Read all the available messages without waiting
+
+        Raises:
+            queue.Empty: If the ring is empty
+
+        Returns:
+            List -- List of encoded messages
+        """
+        batch = self.ring.pop_all()
+        if not batch:
+            raise queue.Empty
+        return batch
+
+    def close(self):
+        """The ring buffer is released by the driver"""
+        pass
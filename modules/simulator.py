@@ -0,0 +1,231 @@
+"""Single process discrete-event simulation engine for the GHS Algorithm.
+
+Every node of the graph is run inside the current process. Messages written
+on an edge are not delivered immediately, instead they are scheduled on a heap
+of pending deliveries keyed by a virtual time. Each delivery is a batch of the
+messages sent by a node to one of its neighbours while processing a batch.
+The delay of each message is drawn from a seeded random generator, so that a
+run can be replayed exactly by using the same seed. Messages on a single edge
+are always delivered in the order in which they were sent, as the GHS
+Algorithm requires FIFO channels.
+"""
+import heapq
+import random
+from node import Node
+from modules.utils import build_edges
+from modules.stats import new_counters, add_counters
+from modules.result import node_records, collect_records
+
+
+class Scheduler:
+    """Heap of pending message deliveries ordered by virtual time"""
+    def __init__(self, seed):
+        """Ctor
+
+        Arguments:
+            seed {Integer} -- Seed for the random delays of the messages
+        """
+        self.rng = random.Random(seed)
+        self.random = self.rng.random
+        self.now = 0.0
+        self.seq = 0
+        self.pending = []
+        self.channel_time = {}
+
+    def schedule(self, node_id, batch):
+        """Schedule the delivery of a batch of messages at the given node
+
+        Arguments:
+            node_id {Integer} -- Node Id of the receiving node
+            batch {List} -- List of encoded messages sent on the same edge
+        """
+        # Preserve FIFO order over the channel the batch is sent on
+        channel = (node_id, batch[0][0])
+        deliver_at = self.now + self.random()
+        channel_time = self.channel_time
+        last = channel_time.get(channel, 0.0)
+        if deliver_at < last:
+            deliver_at = last
+        channel_time[channel] = deliver_at
+
+        seq = self.seq
+        heapq.heappush(self.pending, (deliver_at, seq, node_id, batch))
+        self.seq = seq + 1
+
+    def schedule_wakeup(self, node_id, wake_at):
+        """Schedule the node to wake up, as an empty batch
+
+        Arguments:
+            node_id {Integer} -- Node Id of the node to wake up
+            wake_at {Float} -- Virtual time of the wake up
+        """
+        heapq.heappush(self.pending, (wake_at, self.seq, node_id, []))
+        self.seq += 1
+
+    def next(self):
+        """Pop the next batch to be delivered and advance the virtual time
+
+        Returns:
+            Tuple -- Node Id of the receiver and the batch of messages
+        """
+        deliver_at, _, node_id, batch = heapq.heappop(self.pending)
+        self.now = deliver_at
+        return node_id, batch
+
+    def in_flight(self):
+        """List the pending batches, in the order of their delivery
+
+        Returns:
+            List -- (node id, batch of messages) pairs
+        """
+        return [(node_id, batch)
+                for _, _, node_id, batch in sorted(self.pending)]
+
+    def get_state(self):
+        """Capture the state of the scheduler, to replay the rest of the run
+        exactly when resumed
+
+        Returns:
+            Tuple -- Virtual time, sequence number, state of the random
+                     generator, time of the last delivery on each channel
+                     and the pending deliveries
+        """
+        return (self.now, self.seq, self.rng.getstate(),
+                dict(self.channel_time), list(self.pending))
+
+    def set_state(self, state):
+        """Restore the state captured by Scheduler.get_state
+
+        Arguments:
+            state {Tuple} -- State of the scheduler
+        """
+        now, self.seq, rng_state, channel_time, pending = state
+        self.now = now
+        self.rng.setstate(rng_state)
+        self.channel_time = dict(channel_time)
+        self.pending = list(pending)
+        heapq.heapify(self.pending)
+
+    def empty(self):
+        """Check whether any message is still to be delivered
+
+        Returns:
+            Bool -- True if no message is pending
+        """
+        return not self.pending
+
+
+class SimQueue:
+    """Queue of a node, as seen by the Adjacency and Node classes"""
+    def __init__(self, scheduler, node_id):
+        """Ctor
+
+        Arguments:
+            scheduler {Scheduler} -- Scheduler of the simulation
+            node_id {Integer} -- Node Id of the node owning the queue
+        """
+        self.scheduler = scheduler
+        self.node_id = node_id
+        self.schedule = scheduler.schedule
+
+    def put(self, batch):
+        """Schedule the batch for delivery at the owning node
+
+        Arguments:
+            batch {List} -- List of encoded messages
+        """
+        self.schedule(self.node_id, batch)
+
+    def close(self):
+        """Nothing to release for a simulated queue"""
+        pass
+
+
+def run_simulation(graph,
+                   wake_plan,
+                   debug_level,
+                   seed=0,
+                   timer=None,
+                   checkpointer=None,
+                   resume=None):
+    """Run the GHS Algorithm on all the nodes inside the current process
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up, delays being in virtual
+                                time
+        debug_level {String} -- Debug Level - basic/info/debug
+        seed {Integer} -- Seed for the message delays
+
+    Keyword Arguments:
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+        checkpointer {Checkpointer} -- If given, snapshots the run at its
+                                       interval (default: {None})
+        resume {Checkpoint} -- If given, the run resumes from this snapshot
+                               (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes
+    """
+    num_nodes = graph.num_nodes
+    scheduler = Scheduler(seed)
+    queues = [SimQueue(scheduler, node_id) for node_id in range(num_nodes)]
+    edges = build_edges(graph, queues)
+    nodes = [
+        Node(node_id, edges[node_id], 0, queues[node_id], debug_level)
+        for node_id in range(num_nodes)
+    ]
+    if timer is not None:
+        timer.mark('spawn')
+
+    if resume is not None and resume.engine_state is not None:
+        # A snapshot of this engine holds the wake ups still pending, and the
+        # rest of the run is replayed exactly
+        for node_id in resume.states:
+            nodes[node_id].restore(resume.states[node_id])
+        scheduler.set_state(resume.engine_state)
+    else:
+        if resume is not None:
+            for node_id in resume.states:
+                nodes[node_id].restore(resume.states[node_id])
+            for node_id, batch in resume.in_flight:
+                if batch:
+                    scheduler.schedule(node_id, batch)
+                else:
+                    scheduler.schedule_wakeup(node_id, scheduler.now)
+        # Waking up a node again is harmless, as only sleeping nodes wake up
+        for node_id in wake_plan.immediate():
+            nodes[node_id].process_batch([])
+        for delay, node_id in wake_plan.delayed():
+            scheduler.schedule_wakeup(node_id, delay)
+
+    # Scheduler.next inlined, as the loop runs once per batch delivered
+    pending = scheduler.pending
+    heappop = heapq.heappop
+    while pending:
+        deliver_at, _, node_id, batch = heappop(pending)
+        scheduler.now = deliver_at
+        node = nodes[node_id]
+        # Messages to an already halted node are dropped
+        if not node.completed:
+            node.process_batch(batch)
+        if checkpointer is not None and checkpointer.due():
+            # All the nodes are between two batches, so the snapshot is
+            # consistent
+            states = {
+                node_id: nodes[node_id].snapshot()
+                for node_id in range(num_nodes)
+            }
+            checkpointer.write(checkpointer.start(), 0, 1, states,
+                               scheduler.in_flight(), scheduler.get_state())
+
+    total_messages = 0
+    counters = new_counters()
+    for node_id in range(num_nodes):
+        total_messages += nodes[node_id].num_messages
+        add_counters(counters, nodes[node_id].counters)
+
+    result = collect_records(graph, [node_records(nodes)])
+    return total_messages, result, counters
@@ -0,0 +1,330 @@
+"""Statistics of a run of the GHS Algorithm, written by main.py with --stats
+and collected by benchmark.py
+
+Every node counts the messages it sends by message type and by its level at
+the time, and the messages it defers by message type. The counters of a node
+are a flat list of integers, laid out as below, so that the counters of all
+the nodes are merged by a plain element-wise sum:
+
+    SENT + code          messages of each type sent
+    DEFERRED + code      messages of each type deferred
+    LEVELS + level       messages sent at each level
+    CLOCKS + level       longest causal chain of messages sent at each level
+    DEPTHS + bucket      nodes by the high-water mark of their inbox
+    EDGE_BYTES + bucket  edges, in each direction, by the record bytes sent
+    TOP_DEPTHS + 2i      deepest inboxes, as (depth, node id)
+    TOP_EDGES + 2i       busiest edge directions, as (record bytes, sender
+                         node id << 32 | neighbour node id)
+    TOP_RSS + 2i         largest peak RSS in KB, as (RSS, node id or worker)
+
+Every message carries a Lamport timestamp, one more than the clock of its
+sender, and a node receiving it moves its clock up to the timestamp, so that
+the clock of a node is the length of the longest causal chain of messages
+reaching it. The clocks are merged by an element-wise maximum instead: their
+maximum is the critical path of the run, its time complexity in rounds of
+messages. Unlike the wall time, it is not affected by the load of the machine,
+though it still depends on the order the messages are delivered in.
+
+The inbox of a node holds the messages waiting in its queue, which it drains
+whole after each blocking read, or pending for it on its worker, and the
+messages it has deferred. Its depth is sampled as each batch starts, which is
+when it is the deepest, as processing a message either consumes it or defers
+it. The bytes sent over an edge are an estimate, the number of messages times
+the size of the record of the binary transports: they are the same whatever
+the transport, and leave out the pickling of the queues and the framing of
+tcp.
+Bucket b of the histograms holds the values from 2^(b-1) to 2^b - 1, and the
+TOP sections keep the TOP largest values of all the nodes, with what they
+belong to, so that the hub nodes and the busy edges are named.
+"""
+import math
+import json
+import time
+import resource
+from modules.utils import Message
+from modules.codec import RECORD
+
+NUM_TYPES = len(Message) + 1  # Indexed by the message code, from 1
+MAX_LEVEL = 32  # Levels never exceed log2 of the number of nodes
+NUM_BUCKETS = 32  # Values up to 2^31
+TOP = 8  # Largest values kept with what they belong to
+NODE_BITS = 32  # Shift of the sender in the key of an edge direction
+MESSAGE_BYTES = RECORD.size
+
+SENT = 0
+DEFERRED = NUM_TYPES
+LEVELS = 2 * NUM_TYPES
+CLOCKS = LEVELS + MAX_LEVEL
+DEPTHS = CLOCKS + MAX_LEVEL
+EDGE_BYTES = DEPTHS + NUM_BUCKETS
+TOP_DEPTHS = EDGE_BYTES + NUM_BUCKETS
+TOP_EDGES = TOP_DEPTHS + 2 * TOP
+TOP_RSS = TOP_EDGES + 2 * TOP
+NUM_COUNTERS = TOP_RSS + 2 * TOP
+
+
+class PhaseTimer:
+    """Wall time of the consecutive phases of a run"""
+    def __init__(self):
+        """Ctor, the first phase starts now"""
+        self.phases = {}
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """End the current phase, and start the next one
+
+        Arguments:
+            phase {String} -- Name of the phase which ends
+        """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self.last
+        self.last = now
+
+
+def peak_rss():
+    """Peak resident set size of the current process and of the largest of
+    its children which have been waited for
+
+    Returns:
+        Tuple -- Peak RSS of the process and of its children, in KB
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own, children
+
+
+def new_counters():
+    """Counters of a node, or of a set of nodes, with nothing counted yet
+
+    Returns:
+        List -- Counters, laid out as described above
+    """
+    return [0] * NUM_COUNTERS
+
+
+def bucket_of(value):
+    """Bucket of a value in the histograms of the counters
+
+    Arguments:
+        value {Integer} -- Non negative value
+
+    Returns:
+        Integer -- Bucket b, holding the values from 2^(b-1) to 2^b - 1
+    """
+    return min(int(value).bit_length(), NUM_BUCKETS - 1)
+
+
+def record_top(counters, section, value, key):
+    """Keep a value in a TOP section, if it is among the largest
+
+    Arguments:
+        counters {List} -- Counters
+        section {Integer} -- Start of the section
+        value {Integer} -- Value
+        key {Integer} -- What the value belongs to
+    """
+    _in = section + 2 * TOP - 2
+    if value <= counters[_in]:
+        return
+    # Shift the smaller values down, the smallest one dropping out
+    while _in > section and counters[_in - 2] < value:
+        counters[_in] = counters[_in - 2]
+        counters[_in + 1] = counters[_in - 1]
+        _in -= 2
+    counters[_in] = value
+    counters[_in + 1] = key
+
+
+def record_completion(counters, node_id, sent_on, neighbors):
+    """Count the high-water mark of the inbox of a node, held in the first
+    entry of its TOP_DEPTHS section, and the record bytes it sent over each
+    of its edges, once it has completed
+
+    Arguments:
+        counters {List} -- Counters of the node
+        node_id {Integer} -- Node Id of the node
+        sent_on {Sequence} -- Number of messages sent over each edge
+        neighbors {Sequence} -- Node Id of the other end of each edge
+    """
+    counters[DEPTHS + bucket_of(counters[TOP_DEPTHS])] += 1
+    # Each direction of an edge is counted by its sender, and so is keyed by
+    # both ends, not to be listed twice as the same edge
+    sender = node_id << NODE_BITS
+    for _in in range(len(sent_on)):
+        size = sent_on[_in] * MESSAGE_BYTES
+        counters[EDGE_BYTES + bucket_of(size)] += 1
+        record_top(counters, TOP_EDGES, size, sender | neighbors[_in])
+
+
+def add_counters(total, counters):
+    """Add counters into a running total, taking the maximum of the clocks
+    and the largest values of the TOP sections
+
+    Arguments:
+        total {List} -- Counters to add into
+        counters {Sequence} -- Counters to add
+    """
+    for _in in range(CLOCKS):
+        total[_in] += counters[_in]
+    for _in in range(CLOCKS, DEPTHS):
+        if counters[_in] > total[_in]:
+            total[_in] = counters[_in]
+    for _in in range(DEPTHS, TOP_DEPTHS):
+        total[_in] += counters[_in]
+    for section in (TOP_DEPTHS, TOP_EDGES, TOP_RSS):
+        # The values of a section are in decreasing order
+        for _in in range(section, section + 2 * TOP, 2):
+            if counters[_in] <= 0:
+                break
+            record_top(total, section, counters[_in], counters[_in + 1])
+
+
+def message_bound(num_nodes, num_edges):
+    """Upper bound on the number of messages of the GHS Algorithm, apart from
+    the halt messages of this implementation
+
+    Arguments:
+        num_nodes {Integer} -- Number of nodes in the graph
+        num_edges {Integer} -- Number of edges in the graph
+
+    Returns:
+        Float -- 5N log2 N + 2E
+    """
+    return 5 * num_nodes * math.log2(max(num_nodes, 2)) + 2 * num_edges
+
+
+def summarize_counters(counters, num_nodes, num_edges):
+    """Break the counters of all the nodes down by message type and level,
+    check them against the bound of the GHS Algorithm, and find the growth
+    of the critical path at each level
+
+    Arguments:
+        counters {Sequence} -- Counters of all the nodes
+        num_nodes {Integer} -- Number of nodes in the graph
+        num_edges {Integer} -- Number of edges in the graph
+
+    Returns:
+        Dict -- Messages sent and deferred by type, sent by level, the bound
+                check, and the critical path with its growth by level
+    """
+    sent = {}
+    deferred = {}
+    for message in Message:
+        sent[message.name] = counters[SENT + message]
+        deferred[message.name] = counters[DEFERRED + message]
+
+    levels = list(counters[LEVELS:LEVELS + MAX_LEVEL])
+    while levels and levels[-1] == 0:
+        levels.pop()
+
+    # The chains ending at a level may go through any lower level, so the
+    # growth at a level is counted from the longest chain below it
+    growth = []
+    longest = 0
+    for clock in counters[CLOCKS:CLOCKS + len(levels)]:
+        growth.append(max(0, clock - longest))
+        longest = max(longest, clock)
+
+    bound = message_bound(num_nodes, num_edges)
+    total = sum(sent.values()) - sent[Message.halt.name]
+    return {
+        'sent': sent,
+        'deferred': deferred,
+        'sent_by_level': levels,
+        'bound': bound,
+        'within_bound': total <= bound,
+        'critical_path': max(counters[CLOCKS:CLOCKS + MAX_LEVEL]),
+        'critical_path_by_level': growth,
+    }
+
+
+def summarize_memory(counters, num_edges):
+    """Break the memory counters of all the nodes down into the histograms
+    and the largest values
+
+    Arguments:
+        counters {Sequence} -- Counters of all the nodes
+        num_edges {Integer} -- Number of edges in the graph
+
+    Returns:
+        Dict -- Record bytes sent, by edge, nodes by inbox depth, and the
+                deepest inboxes, busiest edges and largest peak RSS
+    """
+    def histogram(section):
+        buckets = {}
+        for bucket in range(NUM_BUCKETS):
+            if counters[section + bucket]:
+                low = 1 << bucket >> 1
+                label = str(low) if bucket < 2 else \
+                    str(low) + '-' + str(2 * low - 1)
+                buckets[label] = counters[section + bucket]
+        return buckets
+
+    def top(section, name, unit):
+        return [{
+            name: counters[_in + 1],
+            unit: counters[_in]
+        } for _in in range(section, section + 2 * TOP, 2) if counters[_in]]
+
+    record_bytes = sum(counters[SENT:DEFERRED]) * MESSAGE_BYTES
+    return {
+        'record_bytes_sent': record_bytes,
+        'record_bytes_per_edge': record_bytes / max(num_edges, 1),
+        'edges_by_record_bytes': histogram(EDGE_BYTES),
+        'busiest_edges': [{
+            'node': counters[_in + 1] >> NODE_BITS,
+            'neighbor': counters[_in + 1] & ((1 << NODE_BITS) - 1),
+            'record_bytes': counters[_in]
+        } for _in in range(TOP_EDGES, TOP_EDGES + 2 * TOP, 2)
+                          if counters[_in]],
+        'nodes_by_inbox_depth': histogram(DEPTHS),
+        'deepest_inboxes': top(TOP_DEPTHS, 'node', 'depth'),
+        'peak_rss_kb': top(TOP_RSS, 'id', 'kb'),
+    }
+
+
+def write_memory_report(memory, rss, rss_of, file):
+    """Write a readable report of the memory counters
+
+    Arguments:
+        memory {Dict} -- Memory counters, as returned by summarize_memory
+        rss {Integer} -- Peak RSS of the driver, in KB
+        rss_of {String} -- What the ids of the peak RSS are - node/worker
+        file {File} -- File to write to
+    """
+    lines = ['[MEMORY]: Peak RSS ' + str(rss) + ' KB (driver)']
+    if memory['peak_rss_kb']:
+        lines.append('[MEMORY]: Largest peak RSS by ' + rss_of + ': ' +
+                     ', '.join(
+                         str(entry['kb']) + ' KB (' + str(entry['id']) + ')'
+                         for entry in memory['peak_rss_kb']))
+    lines.append('[MEMORY]: Nodes by inbox high-water mark: ' + ', '.join(
+        label + ': ' + str(count)
+        for label, count in memory['nodes_by_inbox_depth'].items()))
+    lines.append('[MEMORY]: Deepest inboxes: ' + ', '.join(
+        str(entry['depth']) + ' (node ' + str(entry['node']) + ')'
+        for entry in memory['deepest_inboxes']))
+    lines.append('[MEMORY]: Estimated bytes sent, as messages x ' +
+                 str(MESSAGE_BYTES) + ' B records: ' +
+                 str(memory['record_bytes_sent']) +
+                 ', %.1f per edge' % memory['record_bytes_per_edge'])
+    edges = memory['edges_by_record_bytes']
+    lines.append('[MEMORY]: Edge directions by estimated bytes sent: ' +
+                 ', '.join(label + ': ' + str(edges[label])
+                           for label in edges))
+    lines.append('[MEMORY]: Busiest edge directions: ' + ', '.join(
+        str(entry['record_bytes']) + ' B (' + str(entry['node']) + ' -> ' +
+        str(entry['neighbor']) + ')' for entry in memory['busiest_edges']))
+    file.write('\n'.join(lines) + '\n')
+
+
+def write_stats(path, stats):
+    """Write the statistics of a run as JSON
+
+    Arguments:
+        path {String} -- Path of the output file
+        stats {Dict} -- Statistics of the run
+    """
+    with open(path, 'w') as file:
+        json.dump(stats, file, indent=2)
+        file.write('\n')
@@ -0,0 +1,575 @@
+"""TCP socket transport, to run the nodes of the graph across several hosts.
+
+The nodes are placed on hosts as described by a placement file, each line of
+which holds the address of a host followed by the nodes it runs, for example:
+
+    10.0.0.1:7000 0-499
+    10.0.0.2:7000 500-999,1001
+
+Each host runs the nodes placed on it as a worker of the sharded engine. Every
+pair of hosts with an edge between them, and every host with host 0, keeps a
+single persistent TCP connection. Messages are carried in length prefixed
+binary frames, and all the messages a host sends to another host in one round
+are coalesced into a single frame. When all the nodes have completed, each
+host reports the father edge and the level of its nodes to host 0, which
+assembles the result. The markers of the snapshots of a checkpointed run are
+carried in frames of their own, in order with the frames of messages.
+"""
+import os
+import time
+import socket
+import struct
+import selectors
+from array import array
+from modules.sharded import Worker, shard_of
+from modules.codec import RECORD, pack_fields, unpack_fields
+from modules.stats import NUM_COUNTERS, add_counters
+from modules.result import collect_records
+from multiprocessing import Process
+
+# Length of the payload and kind of each frame
+FRAME = struct.Struct('<IB')
+HELLO = 0
+MESSAGES = 1
+DONE = 2
+RESULT = 3
+MARKER = 4
+
+# Destination node followed by the fields of a message record
+MESSAGE_RECORD = struct.Struct('<i' + RECORD.format.lstrip('<'))
+HOST_INDEX = struct.Struct('<i')
+SNAPSHOT_ID = struct.Struct('<q')
+# Number of messages followed by the counters of the nodes of a host
+RESULT_HEADER = struct.Struct('<' + str(NUM_COUNTERS + 1) + 'q')
+
+CONNECT_TIMEOUT = 30
+
+
+def read_placement(path, num_nodes):
+    """Read the addresses of the hosts and the placement of the nodes
+
+    Arguments:
+        path {String} -- Path of the placement file
+        num_nodes {Integer} -- Number of nodes in the graph
+
+    Raises:
+        ValueError: If a node is not placed on exactly one host
+
+    Returns:
+        Tuple -- List of (host, port) addresses and the host of each node
+    """
+    addresses = []
+    placement = [-1] * num_nodes
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            address, spec = line.split(None, 1)
+            host, port = address.rsplit(':', 1)
+            index = len(addresses)
+            addresses.append((host, int(port)))
+
+            for part in spec.replace(' ', '').split(','):
+                first, _, last = part.partition('-')
+                for node_id in range(int(first), int(last or first) + 1):
+                    if placement[node_id] != -1:
+                        raise ValueError('Node ' + str(node_id) +
+                                         ' is placed on more than one host')
+                    placement[node_id] = index
+
+    if -1 in placement:
+        raise ValueError('Node ' + str(placement.index(-1)) +
+                         ' is not placed on any host')
+    return addresses, placement
+
+
+def find_peers(index, num_hosts, graph, placement):
+    """Find the hosts which the given host keeps a connection with
+
+    Arguments:
+        index {Integer} -- Index of the host
+        num_hosts {Integer} -- Number of hosts
+        graph {Graph} -- Graph read from the input file
+        placement {List} -- Index of the host of each node
+
+    Returns:
+        Set -- Indexes of the peer hosts
+    """
+    # Host 0 collects the results of every host
+    if index == 0:
+        return set(range(1, num_hosts))
+
+    peers = {0}
+    for node1, node2 in zip(graph.node1, graph.node2):
+        host1 = placement[node1]
+        host2 = placement[node2]
+        if host1 == index and host2 != index:
+            peers.add(host2)
+        elif host2 == index and host1 != index:
+            peers.add(host1)
+    return peers
+
+
+def listen(address, backlog):
+    """Open the listening socket of a host
+
+    Arguments:
+        address {Tuple} -- (host, port) to listen on, port 0 for any port
+        backlog {Integer} -- Number of pending connections to allow
+
+    Returns:
+        Socket -- Listening socket
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(address)
+    listener.listen(backlog)
+    return listener
+
+
+def recv_exact(sock, size):
+    """Read exactly the given number of bytes from a blocking socket
+
+    Arguments:
+        sock {Socket} -- Connected socket
+        size {Integer} -- Number of bytes to read
+
+    Returns:
+        Bytes -- Data read
+    """
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed by the peer host')
+        data += chunk
+    return data
+
+
+def frame(kind, payload=b''):
+    """Prefix the payload with its length and kind
+
+    Arguments:
+        kind {Integer} -- Kind of the frame
+
+    Keyword Arguments:
+        payload {Bytes} -- Payload of the frame (default: {b''})
+
+    Returns:
+        Bytes -- Frame
+    """
+    return FRAME.pack(len(payload), kind) + payload
+
+
+class TcpChannel:
+    """Channel between the hosts, made of a TCP connection per peer host"""
+    def __init__(self, index, addresses, listener, peers):
+        """Ctor, connect to all the peer hosts
+
+        Arguments:
+            index {Integer} -- Index of the host using the channel
+            addresses {List} -- (host, port) address of each host
+            listener {Socket} -- Listening socket of the host
+            peers {Set} -- Indexes of the peer hosts
+        """
+        self.index = index
+        self.peers = peers
+        self.socks = {}
+        self.outgoing = {}
+        self.incoming = {}
+        self.batches = []
+        self.finished = set()
+        self.closed = set()
+        self.results = {}
+        self.selector = selectors.DefaultSelector()
+
+        # Connect to the peers with a higher index, and accept the others
+        for peer in sorted(peers):
+            if peer > index:
+                sock = self.__connect(addresses[peer])
+                sock.sendall(frame(HELLO, HOST_INDEX.pack(index)))
+                self.socks[peer] = sock
+        while len(self.socks) < len(peers):
+            sock, _ = listener.accept()
+            length, kind = FRAME.unpack(recv_exact(sock, FRAME.size))
+            peer = HOST_INDEX.unpack(recv_exact(sock, length))[0]
+            self.socks[peer] = sock
+
+        for peer in self.socks:
+            sock = self.socks[peer]
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setblocking(False)
+            self.outgoing[peer] = bytearray()
+            self.incoming[peer] = bytearray()
+            self.selector.register(sock, selectors.EVENT_READ, peer)
+
+    def __connect(self, address):
+        """Connect to a host, retrying till it starts listening
+
+        Arguments:
+            address {Tuple} -- (host, port) of the host
+
+        Returns:
+            Socket -- Connected socket
+        """
+        deadline = time.time() + CONNECT_TIMEOUT
+        while True:
+            try:
+                return socket.create_connection(address)
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def __write(self, peer):
+        """Write as much of the outgoing data of the peer as the socket takes
+
+        Arguments:
+            peer {Integer} -- Index of the peer host
+        """
+        sock = self.socks[peer]
+        data = self.outgoing[peer]
+        if peer in self.closed:
+            # The peer has already finished and closed the connection
+            data.clear()
+            return
+        try:
+            sent = sock.send(data)
+            del data[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            data.clear()
+
+        events = selectors.EVENT_READ
+        if data:
+            events |= selectors.EVENT_WRITE
+        self.selector.modify(sock, events, peer)
+
+    def __read(self, peer):
+        """Read the available data from the peer and handle complete frames
+
+        Arguments:
+            peer {Integer} -- Index of the peer host
+
+        Raises:
+            RuntimeError: If the connection is closed or fails before the
+                          peer has sent all it had to send
+        """
+        sock = self.socks[peer]
+        try:
+            data = sock.recv(1 << 16)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.__lost(peer, str(e))
+            return
+        if not data:
+            self.__lost(peer, 'connection closed')
+            return
+
+        buf = self.incoming[peer]
+        buf += data
+        offset = 0
+        while len(buf) - offset >= FRAME.size:
+            length, kind = FRAME.unpack_from(buf, offset)
+            end = offset + FRAME.size + length
+            if len(buf) < end:
+                break
+            self.__handle(peer, kind, bytes(buf[offset + FRAME.size:end]))
+            offset = end
+        del buf[:offset]
+
+    def __lost(self, peer, reason):
+        """Stop reading from a peer whose connection has ended
+
+        Arguments:
+            peer {Integer} -- Index of the peer host
+            reason {String} -- Why the connection ended
+
+        Raises:
+            RuntimeError: If the peer had not finished, or had not sent its
+                          result to host 0 yet, as the run can then never
+                          complete
+        """
+        self.selector.unregister(self.socks[peer])
+        self.closed.add(peer)
+        if peer not in self.finished or (self.index == 0
+                                         and peer not in self.results):
+            raise RuntimeError('Lost the connection to host ' + str(peer) +
+                               ' before it finished: ' + reason)
+
+    def __handle(self, peer, kind, payload):
+        """Handle a frame received from a peer
+
+        Arguments:
+            peer {Integer} -- Index of the peer host
+            kind {Integer} -- Kind of the frame
+            payload {Bytes} -- Payload of the frame
+        """
+        if kind == MESSAGES:
+            # Group the consecutive messages for the same node back together
+            batch = []
+            for fields in MESSAGE_RECORD.iter_unpack(payload):
+                msg = unpack_fields(*fields[1:])
+                if batch and batch[-1][0] == fields[0]:
+                    batch[-1][1].append(msg)
+                else:
+                    batch.append((fields[0], [msg]))
+            self.batches.append((peer, batch))
+        elif kind == MARKER:
+            self.batches.append((peer, SNAPSHOT_ID.unpack(payload)[0]))
+        elif kind == DONE:
+            self.finished.add(peer)
+        elif kind == RESULT:
+            header = RESULT_HEADER.unpack_from(payload)
+            records = array('i')
+            records.frombytes(payload[RESULT_HEADER.size:])
+            self.results[peer] = (header[0], records, header[1:])
+
+    def __poll(self, timeout):
+        """Wait for the sockets to be ready, and read or write on them
+
+        Arguments:
+            timeout {Float} -- Time to wait in seconds, None to wait for any
+                               socket to be ready
+        """
+        for key, mask in self.selector.select(timeout):
+            if mask & selectors.EVENT_READ:
+                self.__read(key.data)
+            if mask & selectors.EVENT_WRITE:
+                self.__write(key.data)
+
+    def __queue(self, peer, data):
+        """Queue the data to be sent to a peer, and start sending it
+
+        Arguments:
+            peer {Integer} -- Index of the peer host
+            data {Bytes} -- Data to send
+        """
+        self.outgoing[peer] += data
+        self.__write(peer)
+
+    def send(self, target, batch):
+        """Send a batch of messages to another host in a single frame
+
+        Arguments:
+            target {Integer} -- Index of the receiving host
+            batch {List} -- List of (node id, batch of messages) pairs
+        """
+        payload = b''.join([
+            MESSAGE_RECORD.pack(node_id, *pack_fields(msg))
+            for node_id, msgs in batch for msg in msgs
+        ])
+        self.__queue(target, frame(MESSAGES, payload))
+
+    def send_marker(self, target, snapshot_id):
+        """Send the marker of a snapshot to another host, after all the
+        batches sent to it so far
+
+        Arguments:
+            target {Integer} -- Index of the receiving host
+            snapshot_id {Integer} -- Id of the snapshot
+        """
+        self.__queue(target, frame(MARKER, SNAPSHOT_ID.pack(snapshot_id)))
+
+    def receive(self, timeout):
+        """Receive the batches sent to this host
+
+        Arguments:
+            timeout {Float} -- Time to wait in seconds for a socket to be
+                               ready if no batch has been received yet, None
+                               to wait indefinitely
+
+        Returns:
+            List -- (sender, batch) pairs, in the order received, the batch
+                    being replaced by the snapshot id for a marker
+        """
+        self.__poll(0)
+        # Nothing is left to wait for once the last peer has finished
+        if timeout != 0 and not self.batches and not self.done():
+            self.__poll(timeout)
+        batches = self.batches
+        self.batches = []
+        return batches
+
+    def finish(self):
+        """Notify all the peer hosts that this host has finished"""
+        for peer in self.socks:
+            self.__queue(peer, frame(DONE))
+
+    def done(self):
+        """Check whether all the peer hosts have finished
+
+        Returns:
+            Bool -- True if no more messages can be received
+        """
+        return self.finished == self.peers
+
+    def send_result(self, total_messages, records, counters):
+        """Report the result of this host to host 0
+
+        Arguments:
+            total_messages {Integer} -- Number of messages sent by the nodes
+            records {Array} -- Records of the nodes, as returned by
+                               node_records
+            counters {List} -- Counters of the nodes
+        """
+        payload = RESULT_HEADER.pack(total_messages,
+                                     *counters) + records.tobytes()
+        self.__queue(0, frame(RESULT, payload))
+
+    def collect_results(self, num_hosts):
+        """Wait for the results of all the other hosts, on host 0
+
+        Arguments:
+            num_hosts {Integer} -- Number of hosts
+
+        Returns:
+            List -- (messages, node records, counters) result of each other
+                    host
+        """
+        while len(self.results) < num_hosts - 1:
+            self.__poll(None)
+        return list(self.results.values())
+
+    def close(self):
+        """Send all the outgoing data and close the connections"""
+        while any(self.outgoing.values()):
+            self.__poll(None)
+        for sock in self.socks.values():
+            sock.close()
+        self.selector.close()
+
+
+def run_host(index, graph, addresses, placement, listener, wakeups,
+             debug_level, checkpointer, resume):
+    """Run the nodes placed on a host
+
+    Arguments:
+        index {Integer} -- Index of the host
+        graph {Graph} -- Graph read from the input file
+        addresses {List} -- (host, port) address of each host
+        placement {List} -- Index of the host of each node
+        listener {Socket} -- Listening socket of the host
+        wakeups {List} -- (delay, node id) of each local node to wake up
+        debug_level {String} -- Debug Level - basic/info/debug
+        checkpointer {Checkpointer} -- Writer of the snapshots, or None
+        resume {Checkpoint} -- Snapshot to resume from, or None
+
+    Returns:
+        Tuple -- On host 0, total number of messages, the MST result and
+                 the counters of all the nodes, None on the other hosts
+    """
+    num_hosts = len(addresses)
+    peers = find_peers(index, num_hosts, graph, placement)
+    channel = TcpChannel(index, addresses, listener, peers)
+    listener.close()
+
+    worker = Worker(index, graph, placement, channel, debug_level,
+                    checkpointer, resume)
+    total_messages, records, counters = worker.run(wakeups)
+    if index != 0:
+        channel.send_result(total_messages, records, counters)
+        channel.close()
+        return None
+
+    all_records = [records]
+    for host_messages, host_records, host_counters in channel.collect_results(
+            num_hosts):
+        total_messages += host_messages
+        add_counters(counters, host_counters)
+        all_records.append(host_records)
+    channel.close()
+    return total_messages, collect_records(graph, all_records), counters
+
+
+def run_tcp(graph,
+            wake_plan,
+            debug_level,
+            placement_file=None,
+            num_hosts=None,
+            host_index=None,
+            timer=None,
+            checkpointer=None,
+            resume=None):
+    """Run the GHS Algorithm with the nodes spread over hosts connected by TCP
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        wake_plan {WakePlan} -- Nodes to wake up, the same on every host
+        debug_level {String} -- Debug Level - basic/info/debug
+
+    Keyword Arguments:
+        placement_file {String} -- Path of the placement file, if not given
+                                   the nodes are split across local hosts on
+                                   the loopback interface (default: {None})
+        num_hosts {Integer} -- Number of local hosts without a placement file,
+                               defaults to the number of cores
+                               (default: {None})
+        host_index {Integer} -- Only run the given host of the placement file,
+                                if not given all the hosts are started as
+                                local processes (default: {None})
+        timer {PhaseTimer} -- If given, marks the end of the spawn phase
+                              (default: {None})
+        checkpointer {Checkpointer} -- If given, the hosts snapshot the run at
+                                       its interval, each into its own
+                                       checkpoint directory (default: {None})
+        resume {Checkpoint} -- If given, the run resumes from this snapshot
+                               (default: {None})
+
+    Returns:
+        Tuple -- Total number of messages, the MST result and the counters
+                 of all the nodes, None when running a host other
+                 than host 0
+    """
+    num_nodes = graph.num_nodes
+    if placement_file is not None:
+        addresses, placement = read_placement(placement_file, num_nodes)
+    else:
+        if num_hosts is None:
+            num_hosts = os.cpu_count() or 1
+        num_hosts = max(1, min(num_hosts, num_nodes))
+        addresses = [('127.0.0.1', 0)] * num_hosts
+        placement = [
+            shard_of(node_id, num_nodes, num_hosts)
+            for node_id in range(num_nodes)
+        ]
+
+    num_hosts = len(addresses)
+    wakeups = wake_plan.by_worker(placement, num_hosts)
+    if host_index is not None:
+        listener = listen(addresses[host_index], num_hosts)
+        return run_host(host_index, graph, addresses, placement, listener,
+                        wakeups[host_index], debug_level, checkpointer, resume)
+
+    # Listen on all the addresses before starting the hosts, so that the
+    # ports are known and no connection is refused
+    listeners = [listen(address, num_hosts) for address in addresses]
+    addresses = [listener.getsockname() for listener in listeners]
+    processes = []
+    for index in range(1, num_hosts):
+        p = Process(target=run_host,
+                    args=(index, graph, addresses, placement, listeners[index],
+                          wakeups[index], debug_level, checkpointer, resume))
+        processes.append(p)
+        p.start()
+    if timer is not None:
+        timer.mark('spawn')
+
+    # Host 0 runs in the current process and collects the result
+    for listener in listeners[1:]:
+        listener.close()
+    try:
+        result = run_host(0, graph, addresses, placement, listeners[0],
+                          wakeups[0], debug_level, checkpointer, resume)
+    except BaseException:
+        # The local hosts still running would wait for host 0 forever
+        for p in processes:
+            p.terminate()
+        raise
+    finally:
+        for p in processes:
+            p.join()
+    return result
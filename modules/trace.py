@@ -0,0 +1,154 @@
+"""Binary trace of the events of the nodes, and a tool to merge the traces of
+all the processes into a single timeline.
+
+When tracing is enabled, every message sent, received or deferred by a node
+is appended as a fixed size record to a buffer of the current process, which
+is written to the file trace-<pid>.bin of the trace directory whenever it
+fills up, and when the process is done. A record holds the time in
+nanoseconds of the system-wide monotonic clock, the node, the edge id, the
+kind of event, the message code and the level of the node.
+
+To merge the traces of a run into a timeline, run:
+    python -m modules.trace <trace-dir> [--output <path>]
+"""
+import os
+import sys
+import glob
+import time
+import struct
+import argparse
+import threading
+from modules.utils import Message
+
+EVENT = struct.Struct('<qiiBBBx')
+
+SEND = 1
+RECEIVE = 2
+DEFER = 3
+KINDS = {SEND: 'send', RECEIVE: 'receive', DEFER: 'defer'}
+
+FLUSH_SIZE = 1 << 16
+
+
+class Tracer:
+    """Buffer of the events of the nodes of the current process"""
+    def __init__(self, directory):
+        """Ctor
+
+        Arguments:
+            directory {String} -- Directory of the trace files
+        """
+        self.directory = directory
+        self.reset()
+        # A forked child starts with an empty buffer and writes its own file
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        """Start with an empty buffer, and a lock shared by the threads of
+        the process, as the nodes of the threads engine record into the
+        same buffer"""
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+
+    def record(self, kind, node_id, edge_id, message, level):
+        """Append an event to the buffer
+
+        Arguments:
+            kind {Integer} -- SEND, RECEIVE or DEFER
+            node_id {Integer} -- Node Id
+            edge_id {Integer} -- Edge Id of the edge of the message
+            message {Integer} -- Message code
+            level {Integer} -- Level of the node
+        """
+        event = EVENT.pack(time.monotonic_ns(), node_id, edge_id, kind,
+                           message, level)
+        with self.lock:
+            self.buffer += event
+            full = len(self.buffer) >= FLUSH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered events to the trace file of the process"""
+        # Swap the buffer first, so that the events recorded while it is
+        # written go to the next one
+        with self.lock:
+            buffer, self.buffer = self.buffer, bytearray()
+        if buffer:
+            path = os.path.join(self.directory,
+                                'trace-' + str(os.getpid()) + '.bin')
+            with open(path, 'ab') as file:
+                file.write(buffer)
+
+
+# Tracer of the current process, None if tracing is disabled
+tracer = None
+
+
+def enable(directory):
+    """Enable tracing into the given directory, removing any old trace
+
+    Arguments:
+        directory {String} -- Directory of the trace files
+    """
+    global tracer
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, 'trace-*.bin')):
+        os.remove(path)
+    tracer = Tracer(directory)
+
+
+def flush():
+    """Write the buffered events of the current process, if tracing"""
+    if tracer is not None:
+        tracer.flush()
+
+
+def read_events(directory):
+    """Read the events of all the trace files, ordered by time
+
+    Arguments:
+        directory {String} -- Directory of the trace files
+
+    Returns:
+        List -- Events as (time, node, edge, kind, message, level) tuples
+    """
+    events = []
+    for path in glob.glob(os.path.join(directory, 'trace-*.bin')):
+        with open(path, 'rb') as file:
+            events.extend(EVENT.iter_unpack(file.read()))
+    events.sort()
+    return events
+
+
+def write_timeline(events, file):
+    """Write the events as a readable timeline, relative to the first event
+
+    Arguments:
+        events {List} -- Events ordered by time
+        file {File} -- Output file
+    """
+    start = events[0][0] if events else 0
+    lines = []
+    for timestamp, node_id, edge_id, kind, message, level in events:
+        lines.append('%.6f node %d %s %s edge %d level %d\n' %
+                     ((timestamp - start) / 1e9, node_id, KINDS[kind],
+                      Message(message).name, edge_id, level))
+    file.writelines(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Merge the traces of a run into a single timeline')
+    parser.add_argument('directory', help='trace directory of the run')
+    parser.add_argument('--output',
+                        default=None,
+                        help='path of the timeline, printed if not given')
+    args = parser.parse_args()
+
+    events = read_events(args.directory)
+    if args.output is None:
+        write_timeline(events, sys.stdout)
+    else:
+        with open(args.output, 'w') as file:
+            write_timeline(events, file)
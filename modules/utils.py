@@ -1,22 +1,23 @@
 """Util classes to be used in other files"""
 import enum
+from array import array
 
 
-class State(enum.Enum):
+class State(enum.IntEnum):
     """Enum class for Node Status"""
     sleep = 1
     find = 2
     found = 3
 
 
-class EdgeStatus(enum.Enum):
+class EdgeStatus(enum.IntEnum):
     """Enum class for Edge Status"""
     basic = 1
     branch = 2
     reject = 3
 
 
-class Message(enum.Enum):
+class Message(enum.IntEnum):
     """Enum class for Message types"""
     connect = 1
     initiate = 2
@@ -28,65 +29,120 @@ class Message(enum.Enum):
     halt = 8
 
 
-class Edge:
-    def __init__(self, edge_id, node1, node2, weight, queue):
-        self.weight = weight
-        self.status = EdgeStatus.basic
-        self.queue = queue
-        self.id = edge_id
-        self.node1 = node1
-        self.node2 = node2
+class Adjacency:
+    """Edges of a node, as parallel arrays sorted by the weight of the edges.
+    An edge is referred to by its index in these arrays"""
+    __slots__ = ('neighbors', 'weights', 'ids', 'status', 'queues')
 
-    def __str__(self):
-        """Print the edge instance for the output
-        
-        Returns:
-            String -- Print edge
-        """
-        string = '(' + str(self.node1) + ', ' + str(self.node2) + ', ' + str(
-            self.weight) + ')'
-        return string
+    def __init__(self, neighbors, weights, ids, queues):
+        """Ctor
 
-    def get_id(self):
-        """Getter method for the id of the edge instance
-        
-        Returns:
-            Integer -- Edge Id
+        Arguments:
+            neighbors {List} -- Node Id of the other end of each edge
+            weights {List} -- Weight of each edge
+            ids {List} -- Edge Id of each edge
+            queues {List} -- Queue of every node in the graph, shared by the
+                             adjacencies of all the nodes, or a Dict of the
+                             queues of the neighbours only
         """
-        return self.id
+        order = sorted(range(len(weights)), key=weights.__getitem__)
+        self.neighbors = array('i', [neighbors[_in] for _in in order])
+        self.weights = array('d', [weights[_in] for _in in order])
+        self.ids = array('i', [ids[_in] for _in in order])
+        self.status = bytearray([EdgeStatus.basic]) * len(order)
+        self.queues = queues
+
+    def __len__(self):
+        """Number of edges of the node
 
-    def get_weight(self):
-        """Getter method for the weight of the Edge class
-        
         Returns:
-            Float -- Weight of the edge
+            Integer -- Number of edges
         """
-        return self.weight
+        return len(self.ids)
+
+    def __str__(self):
+        """Print the edges for the output
 
-    def get_status(self):
-        """Getter method for the status of the Edge class
-        
         Returns:
-            EdgeStatus -- Status of the edge
+            String -- Print edges
         """
-        return self.status
+        return ', '.join('(' + str(self.neighbors[_in]) + ', ' +
+                         str(self.weights[_in]) + ')'
+                         for _in in range(len(self.ids)))
+
+    def queue(self, index):
+        """Queue of the node at the other end of an edge
 
-    def change_status(self, status):
-        """Change the status of the edge
-        
         Arguments:
-            status {EdgeStatus} -- updated status of the edge
+            index {Integer} -- Index of the edge
+
+        Returns:
+            Queue -- Queue to write the messages sent on the edge to
         """
-        self.status = status
+        return self.queues[self.neighbors[index]]
+
+    def pack(self, index, message, payload, clock=0):
+        """Encode a message to be sent on an edge
 
-    def write(self, message, payload):
-        """Write to the given edge by the node specified in the arguments
-        
         Arguments:
-            node {Integer} -- Node id of the sender node
+            index {Integer} -- Index of the edge
             message {Message} -- Message to be sent
             payload {List} -- List of arguments sent along with message
+
+        Keyword Arguments:
+            clock {Integer} -- Logical timestamp of the message, the length
+                               of the longest causal chain of messages ending
+                               with it (default: {0})
+
+        Returns:
+            Tuple -- Encoded message
         """
-        # Find the queue to write to
-        obj = {'sender': self.get_id(), 'message': message, 'pl': payload}
-        self.queue.put(obj)
+        return (self.ids[index], int(message), clock, *payload)
+
+
+def build_edges(graph, queues, node_ids=None):
+    """Form the adjacency of each node from the given input
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        queues {List} -- Queue of each node, written to by its neighbours
+
+    Keyword Arguments:
+        node_ids {Set} -- If given, only form the edges of these nodes
+                          (default: {None})
+
+    Returns:
+        List -- Adjacency of each node, None for the nodes not formed
+    """
+    edges = [None] * graph.num_nodes
+    if node_ids is None:
+        node_ids = range(graph.num_nodes)
+
+    # Same edge_id for the edge at both of its end points
+    for node_id in node_ids:
+        ids = graph.edges_of(node_id)
+        neighbors = [graph.other_end(edge_id, node_id) for edge_id in ids]
+        weights = [graph.weights[edge_id] for edge_id in ids]
+        edges[node_id] = Adjacency(neighbors, weights, ids, queues)
+
+    return edges
+
+
+def node_edges(graph, node_id, queues):
+    """Form the adjacency of a single node, holding the queues of its
+    neighbours only, to be handed to a process running just this node
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        node_id {Integer} -- Node Id
+        queues {List} -- Queue of each node, written to by its neighbours
+
+    Returns:
+        Adjacency -- Adjacency of the node
+    """
+    ids = graph.edges_of(node_id)
+    neighbors = [graph.other_end(edge_id, node_id) for edge_id in ids]
+    weights = [graph.weights[edge_id] for edge_id in ids]
+    return Adjacency(neighbors, weights, ids,
+                     {neighbor: queues[neighbor]
+                      for neighbor in neighbors})
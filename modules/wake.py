@@ -0,0 +1,245 @@
+"""Policies choosing the nodes which wake up spontaneously, and when.
+
+The driver builds a WakePlan once, before the run, and hands it to the
+engine, so that no process has to compete for a shared counter to decide
+whether it wakes up. Every other node wakes up when its first message
+arrives, as in the GHS Algorithm.
+
+    random      a seeded sample of the given number of nodes
+    all         every node
+    fraction    a seeded sample of the given fraction of the nodes
+    set         the given nodes
+    staggered   a seeded sample of the given number of nodes, woken one after
+                the other at the given interval
+    degree      a seeded sample of the given number of nodes, each node being
+                drawn with a probability proportional to its degree
+
+A delayed node is woken up by an empty batch written to its queue at its
+time, which a node handles as a request to wake up. Delays are in seconds,
+or in the virtual time of the simulate engine, where the delay of a message
+is drawn uniformly from [0, 1).
+"""
+import time
+import heapq
+import random
+import threading
+from operator import itemgetter
+
+POLICIES = ['random', 'all', 'fraction', 'set', 'staggered', 'degree']
+
+
+class WakePlan:
+    """Nodes to wake up, each after a delay from the start of the run"""
+    def __init__(self, wakeups):
+        """Ctor
+
+        Arguments:
+            wakeups {List} -- (delay, node id) of each node to wake up
+        """
+        # Nodes with the same delay are woken up in the order given
+        self.wakeups = sorted(wakeups, key=itemgetter(0))
+
+    def __len__(self):
+        """Number of nodes to wake up
+
+        Returns:
+            Integer -- Number of nodes
+        """
+        return len(self.wakeups)
+
+    def immediate(self):
+        """Nodes to wake up at the start of the run
+
+        Returns:
+            List -- Node Ids
+        """
+        return [node_id for delay, node_id in self.wakeups if delay <= 0]
+
+    def delayed(self):
+        """Nodes to wake up later, in order of their delay
+
+        Returns:
+            List -- (delay, node id) of each node
+        """
+        return [wakeup for wakeup in self.wakeups if wakeup[0] > 0]
+
+    def by_worker(self, placement, num_workers):
+        """Split the plan between the workers hosting the nodes
+
+        Arguments:
+            placement {List} -- Index of the worker hosting each node
+            num_workers {Integer} -- Number of workers
+
+        Returns:
+            List -- (delay, node id) of the nodes of each worker, in order of
+                    their delay
+        """
+        wakeups = [[] for _ in range(num_workers)]
+        for delay, node_id in self.wakeups:
+            wakeups[placement[node_id]].append((delay, node_id))
+        return wakeups
+
+
+def parse_node_set(spec, num_nodes):
+    """Parse a set of nodes given as ranges, e.g. 0-9,15
+
+    Arguments:
+        spec {String} -- Comma separated node ids and ranges
+        num_nodes {Integer} -- Number of nodes in the graph
+
+    Raises:
+        ValueError: If a node is not in the graph
+
+    Returns:
+        List -- Node Ids, without duplicates
+    """
+    node_ids = set()
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            node_ids.update(range(int(first), int(last) + 1))
+        else:
+            node_ids.add(int(part))
+    for node_id in node_ids:
+        if not 0 <= node_id < num_nodes:
+            raise ValueError('Node ' + str(node_id) + ' is not in the graph')
+    return sorted(node_ids)
+
+
+def sample_by_degree(graph, count, rng):
+    """Draw a sample of nodes without replacement, with probabilities
+    proportional to their degree, by keeping the nodes with the largest
+    random keys u ** (1 / degree)
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+        count {Integer} -- Number of nodes to draw
+        rng {Random} -- Seeded random generator
+
+    Returns:
+        List -- Node Ids
+    """
+    keys = []
+    for node_id in range(graph.num_nodes):
+        degree = graph.degree(node_id)
+        key = rng.random()**(1.0 / degree) if degree else 0.0
+        keys.append((key, node_id))
+    return [node_id for _, node_id in heapq.nlargest(count, keys)]
+
+
+def plan_wakeup(graph,
+                policy='random',
+                count=1,
+                seed=0,
+                fraction=0.1,
+                nodes=None,
+                interval=0.05):
+    """Choose the nodes to wake up as per the policy
+
+    Arguments:
+        graph {Graph} -- Graph read from the input file
+
+    Keyword Arguments:
+        policy {String} -- One of POLICIES (default: {'random'})
+        count {Integer} -- Number of nodes of the random, staggered and
+                           degree policies (default: {1})
+        seed {Integer} -- Seed of the random choices (default: {0})
+        fraction {Float} -- Fraction of the nodes of the fraction policy
+                            (default: {0.1})
+        nodes {String} -- Nodes of the set policy, e.g. 0-9,15
+                          (default: {None})
+        interval {Float} -- Interval between the wake ups of the staggered
+                            policy (default: {0.05})
+
+    Raises:
+        ValueError: If the policy or its parameters are not valid
+
+    Returns:
+        WakePlan -- Nodes to wake up
+    """
+    num_nodes = graph.num_nodes
+    rng = random.Random(seed)
+    count = max(0, min(count, num_nodes))
+    if policy == 'random':
+        node_ids = rng.sample(range(num_nodes), count)
+    elif policy == 'all':
+        node_ids = range(num_nodes)
+    elif policy == 'fraction':
+        if not 0 < fraction <= 1:
+            raise ValueError('The fraction must be in (0, 1]')
+        count = max(1, round(fraction * num_nodes))
+        node_ids = rng.sample(range(num_nodes), count)
+    elif policy == 'set':
+        if nodes is None:
+            raise ValueError('The set policy needs the nodes to wake up')
+        node_ids = parse_node_set(nodes, num_nodes)
+    elif policy == 'staggered':
+        node_ids = rng.sample(range(num_nodes), count)
+    elif policy == 'degree':
+        node_ids = sample_by_degree(graph, count, rng)
+    else:
+        raise ValueError('Unknown wake up policy ' + str(policy))
+    if num_nodes and not node_ids:
+        raise ValueError('At least one node must wake up')
+
+    if policy == 'staggered':
+        return WakePlan([(_in * interval, node_ids[_in])
+                         for _in in range(len(node_ids))])
+    return WakePlan([(0.0, node_id) for node_id in node_ids])
+
+
+def as_plan(graph, wake=None, seed=0):
+    """Turn the nodes to wake up given to the importable API into a WakePlan
+
+    Arguments:
+        graph {Graph} -- Graph to run
+
+    Keyword Arguments:
+        wake {Object} -- WakePlan, number of nodes to wake up at random, name
+                         of a policy taking no parameter, or None to wake up
+                         a single node at random (default: {None})
+        seed {Integer} -- Seed of the random choices (default: {0})
+
+    Raises:
+        ValueError: If the nodes to wake up are not valid
+
+    Returns:
+        WakePlan -- Nodes to wake up
+    """
+    if isinstance(wake, WakePlan):
+        return wake
+    if isinstance(wake, str):
+        return plan_wakeup(graph, wake, 1, seed)
+    return plan_wakeup(graph, 'random', 1 if wake is None else wake, seed)
+
+
+def deliver_wakeups(wakeups, queues):
+    """Wake up the delayed nodes at their time, by writing an empty batch to
+    their queue from a daemon thread, which is abandoned if the run completes
+    first
+
+    Arguments:
+        wakeups {List} -- (delay, node id) of each node, in order of delay
+        queues {List} -- Queue of each node
+    """
+    if wakeups:
+        threading.Thread(target=wake_later,
+                         args=(wakeups, queues, time.monotonic()),
+                         daemon=True).start()
+
+
+def wake_later(wakeups, queues, start):
+    """Write an empty batch to the queue of each delayed node at its time
+
+    Arguments:
+        wakeups {List} -- (delay, node id) of each node, in order of delay
+        queues {List} -- Queue of each node
+        start {Float} -- Monotonic time of the start of the run
+    """
+    for delay, node_id in wakeups:
+        wait = start + delay - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        queues[node_id].put([])
@@ -1,30 +1,55 @@
 """Implementation of the Node class for running distributed GHS Algorithm"""
 import sys
-import time
-from modules.utils import State, EdgeStatus, Edge, Message
+import queue
+from array import array
+from collections import deque
+from modules.utils import State, EdgeStatus, Message
+from modules.stats import SENT, DEFERRED, LEVELS, CLOCKS, TOP_DEPTHS
+from modules.stats import new_counters, record_completion
+from modules import trace
+from modules.trace import SEND, RECEIVE, DEFER
 
 INF = sys.maxsize
 debug_level = 'basic'
 
+# Whether the info and debug statements are printed. Call sites check these
+# before building any argument, so that disabled logging costs nothing
+log_info = False
+log_debug = False
 
-def print_level(dl, node_id, string):
+
+def print_level(dl, node_id, string, *args):
     """Print statements as per debug level
     
     Arguments:
         dl {String} -- Debug Level - basic/info/debug
         node_id {Integer} -- Node id for which statement is to be printed
-        string {String} -- Print statement
+        string {String} -- Print statement, formatted with the arguments
+                           only if it is printed
     """
-    global debug_level
     if dl == 'basic':
-        print('[NOTE ' + str(node_id) + ']: ' + string)
-    if debug_level == 'info' and dl == 'info':
-        print('[INFO ' + str(node_id) + ']: ' + string)
-    if debug_level == 'debug':
-        if dl == 'info':
-            print('[INFO ' + str(node_id) + ']: ' + string)
-        elif dl == 'debug':
-            print('[DEBUG ' + str(node_id) + ']: ' + string)
+        prefix = '[NOTE '
+    elif dl == 'info' and log_info:
+        prefix = '[INFO '
+    elif dl == 'debug' and log_debug:
+        prefix = '[DEBUG '
+    else:
+        return
+    if args:
+        string = string % args
+    print(prefix + str(node_id) + ']: ' + string)
+
+
+def set_debug_level(dl):
+    """Set the debug level of all the nodes of the process
+
+    Arguments:
+        dl {String} -- Debug Level - basic/info/debug
+    """
+    global debug_level, log_info, log_debug
+    debug_level = dl
+    log_info = dl in ('info', 'debug')
+    log_debug = dl == 'debug'
 
 
 class Node:
@@ -33,11 +58,10 @@ class Node:
         
         Arguments:
             node_id {Integer} -- Node Id
-            edges {List} -- List of queues for each edge to the current node
+            edges {Adjacency} -- Edges of the node, sorted by weight
             name {Float} -- Fragment Name to which the Node belongs
             msg_q {Multiprocessing Queue} -- Queue from which Node will read
         """
-        global debug_level
         # Required for GHS operation
         self.state = State.sleep
         self.name = name
@@ -46,8 +70,19 @@ class Node:
         self.node_id = node_id
 
         self.father = -1  # Index of the edge along the father of the node
+        # The edges are sorted by weight, index them by their edge id
         self.edges = edges
+        self.status = edges.status
+        self.weights = edges.weights
         self.num_neighbors = len(edges)
+        self.edge_index = {}
+        for _in in range(self.num_neighbors):
+            self.edge_index[edges.ids[_in]] = _in
+
+        # Edges before the cursor are not basic anymore, and branch edges are
+        # never changed back, so both can be maintained incrementally
+        self.basic_cursor = 0
+        self.branches = []
 
         # Process variables
         self.rec = 0
@@ -56,7 +91,25 @@ class Node:
         self.best_weight = INF
         self.completed = False
         self.num_messages = 0
-        debug_level = dl
+        # Messages sent by type and level, and deferred by type
+        self.counters = new_counters()
+        # Length of the longest causal chain of messages reaching the node
+        self.clock = 0
+        # Messages sent over each edge, and messages deferred and not yet
+        # released
+        self.sent_on = array('q', bytes(8 * self.num_neighbors))
+        self.num_deferred = 0
+        set_debug_level(dl)
+
+        # Messages sent while processing a batch, for each destination queue
+        self.outbox = {}
+
+        # Messages which cannot be processed yet, keyed by the condition they
+        # wait for, and the messages whose condition has become true
+        self.deferred_level = {}  # Level that the node must reach
+        self.deferred_edge = {}  # Edge index that must not be basic anymore
+        self.deferred_found = []  # State of the node must not be find
+        self.ready = deque()
 
     def __change_level(self, level):
         """Change level of current node
@@ -65,6 +118,9 @@ class Node:
             level {Integer} -- Updated level of the node
         """
         self.level = level
+        if self.deferred_level:
+            for key in [key for key in self.deferred_level if key <= level]:
+                self.__release(self.deferred_level.pop(key))
 
     def __change_state(self, state):
         """Change the state of the current node
@@ -73,6 +129,9 @@ class Node:
             state {State} -- Updated state of the node
         """
         self.state = state
+        if state != State.find and self.deferred_found:
+            self.__release(self.deferred_found)
+            self.deferred_found = []
 
     def __change_edge_status(self, edge_index, status):
         """Change the status of the edge with given index
@@ -82,49 +141,121 @@ class Node:
                                     changed
             status {EdgeStatus} -- Updated status of the edge
         """
+        old_status = self.status[edge_index]
         if status == EdgeStatus.branch:
-            print_level('debug', self.node_id,
-                        'Edge ' + str(edge_index) + ' accepted.')
-        self.edges[edge_index].change_status(status)
+            if log_debug:
+                print_level('debug', self.node_id, 'Edge %d accepted.',
+                            edge_index)
+            if old_status != EdgeStatus.branch:
+                self.branches.append(edge_index)
+        if old_status == EdgeStatus.basic and edge_index in \
+                self.deferred_edge:
+            self.__release(self.deferred_edge.pop(edge_index))
+        self.status[edge_index] = status
+
+    def __defer(self,
+                edge_index,
+                message,
+                payload,
+                level=None,
+                edge=False,
+                found=False):
+        """Keep a message which cannot be processed yet, till any of the given
+        conditions becomes true
+
+        Arguments:
+            edge_index {Integer} -- Index of the edge on which message was
+                                    received in the edges list
+            message {Message} -- Message
+            payload {List} -- Attached Payload
+
+        Keyword Arguments:
+            level {Integer} -- Wait for the node to reach this level
+                               (default: {None})
+            edge {Bool} -- Wait for the edge to not be basic anymore
+                           (default: {False})
+            found {Bool} -- Wait for the node to leave the find state
+                            (default: {False})
+        """
+        if log_debug:
+            print_level('debug', self.node_id, 'Deferred from %d message %s',
+                        edge_index, Message(message).name)
+        if trace.tracer is not None:
+            trace.tracer.record(DEFER, self.node_id,
+                                self.edges.ids[edge_index], message,
+                                self.level)
+        self.counters[DEFERRED + message] += 1
+        self.num_deferred += 1
+        # The entry is shared by all the conditions, and is released once
+        entry = [edge_index, message, payload, True]
+        if level is not None:
+            self.deferred_level.setdefault(level, []).append(entry)
+        if edge:
+            self.deferred_edge.setdefault(edge_index, []).append(entry)
+        if found:
+            self.deferred_found.append(entry)
+
+    def __release(self, entries):
+        """Mark deferred messages as ready to be processed again
 
-    def __edge_stub(self, edge_index, message, payload=[], sender_edge=-1):
+        Arguments:
+            entries {List} -- Entries of the deferred messages
+        """
+        for entry in entries:
+            if entry[3]:
+                entry[3] = False
+                self.num_deferred -= 1
+                self.ready.append(entry)
+
+    def __edge_stub(self, edge_index, message, payload=[]):
         """Act as a stub to write to the given edge
 
         Arguments:
             edge_index {Integer} -- Index of the edge on which message is to be 
-                                    written, if -1 write to self queue
+                                    written
             message {Message} -- Message
             payload {List} -- Attached Payload
-            sender_edge {Integer} -- Edge index through which the message is set
-                                     to be read, -1 if to be sent from current edge
         """
-        if edge_index == -1:
-            # Write to its own queue
-            edge_id = self.edges[sender_edge].get_id()
-            obj = {'sender': edge_id, 'message': message, 'pl': payload}
-            print_level(
-                'debug', self.node_id, 'Back to queue from ' +
-                str(sender_edge) + ' message ' + str(message))
-            self.msg_q.put(obj)
+        if log_debug:
+            print_level('debug', self.node_id, 'Sending to %d message %s',
+                        edge_index, message.name)
+        if trace.tracer is not None:
+            trace.tracer.record(SEND, self.node_id, self.edges.ids[edge_index],
+                                message, self.level)
+        self.num_messages += 1
+        self.counters[SENT + message] += 1
+        self.counters[LEVELS + self.level] += 1
+        clock = self.clock + 1
+        if clock > self.counters[CLOCKS + self.level]:
+            self.counters[CLOCKS + self.level] = clock
+        self.sent_on[edge_index] += 1
+        queue = self.edges.queue(edge_index)
+        msg = self.edges.pack(edge_index, message, payload, clock)
+        batch = self.outbox.get(queue)
+        if batch is None:
+            self.outbox[queue] = [msg]
         else:
-            print_level(
-                'debug', self.node_id,
-                'Sending to ' + str(edge_index) + ' message ' + str(message))
-            self.num_messages += 1
-            self.edges[edge_index].write(message, payload)
+            batch.append(msg)
+
+    def flush(self):
+        """Write the messages collected in the outbox, as a single batch for
+        each destination queue"""
+        if self.outbox:
+            outbox = self.outbox
+            self.outbox = {}
+            for queue in outbox:
+                queue.put(outbox[queue])
 
     def __test(self):
         """Execute the test operation"""
-        # Find the minimal outgoing non-tree acceptable edge
-        min_wt = min_index = -1
-        for _in in range(self.num_neighbors):
-            edge = self.edges[_in]
-            if edge.get_status() == EdgeStatus.basic:
-                if min_wt == -1 or min_wt > edge.get_weight():
-                    min_index = _in
-                    min_wt = edge.get_weight()
-
-        if min_index != -1:
+        # Find the minimal outgoing non-tree acceptable edge, which is the
+        # first basic edge as the edges are sorted by weight
+        while (self.basic_cursor < self.num_neighbors
+               and self.status[self.basic_cursor] != EdgeStatus.basic):
+            self.basic_cursor += 1
+
+        if self.basic_cursor < self.num_neighbors:
+            min_index = self.basic_cursor
             # Send test message (to percolate the search)
             self.test_edge = min_index
             _pl = [self.level, self.name]
@@ -137,11 +268,10 @@ class Node:
     def __report(self):
         """Execute the report operation"""
         # Count the number of sons in the current MST
-        count = 0
-        for _in in range(self.num_neighbors):
-            edge = self.edges[_in]
-            if edge.status == EdgeStatus.branch and _in != self.father:
-                count += 1
+        count = len(self.branches)
+        if self.father != -1 and self.status[
+                self.father] == EdgeStatus.branch:
+            count -= 1
 
         if self.rec == count and self.test_edge == -1:
             # Received report from all kids
@@ -150,7 +280,7 @@ class Node:
 
     def __changeroot(self):
         """Execute the changeroot operation"""
-        if self.edges[self.best_edge].get_status() == EdgeStatus.branch:
+        if self.status[self.best_edge] == EdgeStatus.branch:
             self.__edge_stub(self.best_edge, Message.changeroot)
         else:
             # changeroot received by father node
@@ -160,25 +290,22 @@ class Node:
     def __complete(self):
         """Set the variable for completion of the MST creation"""
         # First propagate halt message to all neighbours
-        print_level('debug', self.node_id,
-                    'Sending halt to all branch neighbors')
-        for _in in range(self.num_neighbors):
-            edge = self.edges[_in]
-            if edge.get_status() == EdgeStatus.branch:
-                self.__edge_stub(_in, Message.halt)
+        if log_debug:
+            print_level('debug', self.node_id,
+                        'Sending halt to all branch neighbors')
+        for _in in self.branches:
+            self.__edge_stub(_in, Message.halt)
         self.msg_q.close()       
         self.completed = True
+        record_completion(self.counters, self.node_id, self.sent_on,
+                          self.edges.neighbors)
 
     def wakeup(self):
         """Wake up function"""
-        print_level('info', self.node_id, 'Wake up node')
-        # Find least weight edge from node
-        min_wt = min_edge = -1
-        for _in in range(self.num_neighbors):
-            edge = self.edges[_in]
-            if min_wt == -1 or min_wt > edge.get_weight():
-                min_edge = _in
-                min_wt = edge.get_weight()
+        if log_info:
+            print_level('info', self.node_id, 'Wake up node')
+        # Least weight edge from node is the first one
+        min_edge = 0
 
         self.__change_level(0)
         self.__change_state(State.found)
@@ -187,6 +314,7 @@ class Node:
 
         # Send connect message to the least weight edge
         self.__edge_stub(min_edge, Message.connect, [self.level])
+        self.flush()
 
     def process_connect(self, edge_index, level):
         """Execute receipt of connect message
@@ -199,16 +327,20 @@ class Node:
         if level < self.level:
             # A lower fragment is requesting absorption
             self.__change_edge_status(edge_index, EdgeStatus.branch)
-            _pl = [self.level, self.name, self.state]
+            _pl = [self.level, self.name, int(self.state)]
             self.__edge_stub(edge_index, Message.initiate, _pl)
         else:
-            if self.edges[edge_index].get_status() == EdgeStatus.basic:
-                # Send back to queue for processing
-                self.__edge_stub(-1, Message.connect, [level], edge_index)
+            if self.status[edge_index] == EdgeStatus.basic:
+                # Wait for the level of the node to exceed the level of the
+                # connecting fragment, or for the edge to be used
+                self.__defer(edge_index,
+                             Message.connect, [level],
+                             level=level + 1,
+                             edge=True)
             else:
                 # Core Edge reached - send initiate to the connecting node
-                edge_weight = self.edges[edge_index].get_weight()
-                _pl = [self.level + 1, edge_weight, State.find]
+                edge_weight = self.weights[edge_index]
+                _pl = [self.level + 1, edge_weight, int(State.find)]
                 self.__edge_stub(edge_index, Message.initiate, _pl)
 
     def process_initiate(self, edge_index, level, name, state):
@@ -230,13 +362,11 @@ class Node:
         self.best_weight = INF
 
         # Percolate the update in the fragment down the tree
-        for _in in range(self.num_neighbors):
+        for _in in self.branches:
             if _in == edge_index: continue
             # Send initiate message to all children
-            edge = self.edges[_in]
-            if edge.get_status() == EdgeStatus.branch:
-                _pl = [level, name, state]
-                self.__edge_stub(_in, Message.initiate, _pl)
+            _pl = [level, name, state]
+            self.__edge_stub(_in, Message.initiate, _pl)
 
         # If state has been updated to test, start finding
         if self.state == State.find:
@@ -253,12 +383,12 @@ class Node:
             name {Float} -- Name of the fragment
         """
         if level > self.level:
-            # Send back to queue
-            self.__edge_stub(-1, Message.test, [level, name], edge_index)
+            # Wait for the node to reach the level of the testing node
+            self.__defer(edge_index, Message.test, [level, name], level=level)
         else:
             # Check whether testing node is not internal
             if name == self.name:
-                if self.edges[edge_index].get_status() == EdgeStatus.basic:
+                if self.status[edge_index] == EdgeStatus.basic:
                     self.__change_edge_status(edge_index, EdgeStatus.reject)
                 # Send reject if not already sent to the node for testing
                 if edge_index != self.test_edge:
@@ -276,7 +406,7 @@ class Node:
                                     received in the edges list
         """
         self.test_edge = -1
-        edge_weight = self.edges[edge_index].get_weight()
+        edge_weight = self.weights[edge_index]
         if edge_weight < self.best_weight:
             self.best_weight = edge_weight
             self.best_edge = edge_index
@@ -291,9 +421,10 @@ class Node:
             edge_index {Integer} -- Index of the edge on which message was
                                     received in the edges list
         """
-        if self.edges[edge_index].get_status() == EdgeStatus.basic:
-            print_level('debug', self.node_id,
-                        'Edge ' + str(edge_index) + ' rejected.')
+        if self.status[edge_index] == EdgeStatus.basic:
+            if log_debug:
+                print_level('debug', self.node_id, 'Edge %d rejected.',
+                            edge_index)
             self.__change_edge_status(edge_index, EdgeStatus.reject)
         self.__test()
 
@@ -305,9 +436,10 @@ class Node:
                                     received in the edges list
             weight {Float} -- Best weight found by the child at edge_index
         """
-        print_level(
-            'debug', self.node_id, 'Received report from edge ' +
-            str(edge_index) + ' with weight ' + str(weight))
+        if log_debug:
+            print_level('debug', self.node_id,
+                        'Received report from edge %d with weight %s',
+                        edge_index, weight)
         if edge_index != self.father:
             # Send back the reply for the initiate search message
             if weight < self.best_weight:
@@ -318,8 +450,8 @@ class Node:
         else:
             # Received report from core edge - finish the search for best edge
             if self.state == State.find:
-                # Node is still finding the best edge. Send back to the queue
-                self.__edge_stub(-1, Message.report, [weight], edge_index)
+                # Node is still finding the best edge. Wait for it to finish
+                self.__defer(edge_index, Message.report, [weight], found=True)
             else:
                 if weight > self.best_weight:
                     # The other core node must update its father
@@ -332,77 +464,198 @@ class Node:
         """Execute receipt of changeroot message"""
         self.__changeroot()
 
-    def start_operation(self):
-        """Start the operation for the Node        
-        
-        Returns:
-            List -- List of edges of current node
+    def process_batch(self, batch, queued=0):
+        """Process a batch of messages read from the queue of the node, and
+        send the messages produced meanwhile. An empty batch is a request to
+        wake up, if the node is still sleeping
+
+        Arguments:
+            batch {List} -- List of encoded messages
+
+        Keyword Arguments:
+            queued {Integer} -- Messages still queued for the node behind the
+                                batch (default: {0})
         """
-        # Prevent message streak (for debugging purposes)
-        msg_streak = 0
-        max_streak = 10
-        msg = Message.connect
-        while True:
-            # If completed return
+        if not batch:
+            if self.state == State.sleep:
+                self.wakeup()
+            return
+        # The inbox is the deepest as a batch starts. The high-water mark of
+        # the node is the only entry of its own TOP_DEPTHS section
+        depth = len(batch) + queued + self.num_deferred
+        if depth > self.counters[TOP_DEPTHS]:
+            self.counters[TOP_DEPTHS] = depth
+            self.counters[TOP_DEPTHS + 1] = self.node_id
+        for msg in batch:
+            # Messages after halt are dropped
             if self.completed:
                 break
+            self.process_message(msg)
+        self.flush()
 
-            # Read from the queue
-            obj = self.msg_q.get()
-            edge_id = obj['sender']
-            message = obj['message']
-            pl = obj['pl']
+    def process_message(self, msg):
+        """Process a single message, and then the deferred messages which have
+        become ready meanwhile. The messages sent are kept in the outbox till
+        the next flush
 
-            # Wake process first before processing any message
-            if self.state == State.sleep:
-                self.wakeup()
+        Arguments:
+            msg {Tuple} -- Encoded message as packed by Adjacency.pack
+        """
+        # Wake process first before processing any message
+        if self.state == State.sleep:
+            self.wakeup()
+
+        # Find the edge index which sent this message
+        edge_index = self.edge_index[msg[0]]
+        message = msg[1]
+        if msg[2] > self.clock:
+            self.clock = msg[2]
+        pl = msg[3:]
+
+        if log_info:
+            print_level('info', self.node_id, 'Received from edge %d %s',
+                        edge_index, Message(message).name)
+        if trace.tracer is not None:
+            trace.tracer.record(RECEIVE, self.node_id, msg[0], message,
+                                self.level)
+        self.__dispatch(edge_index, message, pl)
+
+        while self.ready and not self.completed:
+            edge_index, message, pl, _ = self.ready.popleft()
+            self.__dispatch(edge_index, message, pl)
+
+    def __dispatch(self, edge_index, message, pl):
+        """Process the message received on the given edge
 
-            # Find the edge index which sent this message
-            for _in in range(self.num_neighbors):
-                edge = self.edges[_in]
-                if edge.get_id() == edge_id:
-                    edge_index = _in
-                    break
+        Arguments:
+            edge_index {Integer} -- Index of the edge on which message was
+                                    received in the edges list
+            message {Message} -- Message code
+            pl {Tuple} -- Attached Payload
+        """
+        if message == Message.connect:
+            self.process_connect(edge_index, pl[0])
+        elif message == Message.initiate:
+            self.process_initiate(edge_index, pl[0], pl[1], pl[2])
+        elif message == Message.test:
+            self.process_test(edge_index, pl[0], pl[1])
+        elif message == Message.accept:
+            self.process_accept(edge_index)
+        elif message == Message.reject:
+            self.process_reject(edge_index)
+        elif message == Message.report:
+            self.process_report(edge_index, pl[0])
+        elif message == Message.changeroot:
+            self.process_changeroot()
+        elif message == Message.halt:
+            self.__complete()
+
+    def drain(self, batch):
+        """Append the batches already waiting in the queue to the batch just
+        read, so that the node wakes up once for all its senders, and its
+        inbox is seen whole
 
-            # Check message streak
-            if message == msg:
-                msg_streak += 1
-            else:
-                msg = message
-                msg_streak = 0
-            if msg_streak >= max_streak:
-                msg_streak = 0
-                time.sleep(0.01)
-
-            # Process each message accordingly
-            print_level(
-                'info', self.node_id,
-                'Received from edge ' + str(edge_index) + ' ' + str(message))
-            if message == Message.connect:
-                self.process_connect(edge_index, pl[0])
-            elif message == Message.initiate:
-                self.process_initiate(edge_index, pl[0], pl[1], pl[2])
-            elif message == Message.test:
-                self.process_test(edge_index, pl[0], pl[1])
-            elif message == Message.accept:
-                self.process_accept(edge_index)
-            elif message == Message.reject:
-                self.process_reject(edge_index)
-            elif message == Message.report:
-                self.process_report(edge_index, pl[0])
-            elif message == Message.changeroot:
-                self.process_changeroot()
-            elif message == Message.halt:
-                self.__complete()
+        Arguments:
+            batch {List} -- Batch read from the queue
+
+        Returns:
+            List -- Messages of all the batches
+        """
+        batch = list(batch)
+        try:
+            while True:
+                batch.extend(self.msg_q.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def start_operation(self):
+        """Start the operation for the Node        
+        
+        Returns:
+            Integer -- Number of messages sent by the node
+        """
+        while not self.completed:
+            # Read from the queue
+            self.process_batch(self.drain(self.msg_q.get()))
 
         # Return the number of messages sent by this node
-        print_level('info', self.node_id, 'Completed for this node')
+        if log_info:
+            print_level('info', self.node_id, 'Completed for this node')
         return self.num_messages
 
-    def return_parent(self):
-        """Return the parent of the current node instance. Return -1 if not
-        completed yet"""
-        # Return parent if completed
-        if self.completed:
-            return self.father
+    def return_father_id(self):
+        """Return the edge id of the edge along the father of the current
+        node instance. Return -1 if not completed yet or if it has no father"""
+        if self.completed and self.father != -1:
+            return self.edges.ids[self.father]
         return -1
+
+    def snapshot(self):
+        """Capture the state of the node between two batches, sharing nothing
+        with the node, to be written to a checkpoint
+
+        Returns:
+            Tuple -- State of the node, to be given to Node.restore
+        """
+        # A deferred entry may wait for several conditions, so the entries
+        # are listed once, and each condition refers to them by position.
+        # Entries already released are left out
+        entries = []
+        positions = {}
+
+        def refer(entry_list):
+            refs = []
+            for entry in entry_list:
+                if entry[3]:
+                    if id(entry) not in positions:
+                        positions[id(entry)] = len(entries)
+                        entries.append(tuple(entry[:3]))
+                    refs.append(positions[id(entry)])
+            return refs
+
+        deferred_level = [(level, refer(self.deferred_level[level]))
+                          for level in self.deferred_level]
+        deferred_edge = [(edge_index, refer(self.deferred_edge[edge_index]))
+                         for edge_index in self.deferred_edge]
+        deferred_found = refer(self.deferred_found)
+        return (int(self.state), self.name, self.level, self.father,
+                self.basic_cursor, list(self.branches), self.rec,
+                self.test_edge, self.best_edge, self.best_weight,
+                self.completed, self.num_messages, list(self.counters),
+                bytes(self.status), entries, deferred_level, deferred_edge,
+                deferred_found, self.clock, self.sent_on.tobytes())
+
+    def restore(self, state):
+        """Restore the state of the node captured by Node.snapshot
+
+        Arguments:
+            state {Tuple} -- State of the node
+        """
+        (node_state, self.name, self.level, self.father, self.basic_cursor,
+         branches, self.rec, self.test_edge, self.best_edge, self.best_weight,
+         self.completed, self.num_messages, counters, status, entries,
+         deferred_level, deferred_edge, deferred_found, self.clock,
+         sent_on) = state
+        self.state = State(node_state)
+        self.branches = list(branches)
+        self.counters = list(counters)
+        self.status[:] = status
+        self.sent_on = array('q', sent_on)
+
+        entries = [[edge_index, message, payload, True]
+                   for edge_index, message, payload in entries]
+        self.deferred_level = {}
+        for level, refs in deferred_level:
+            if refs:
+                self.deferred_level[level] = [entries[ref] for ref in refs]
+        self.deferred_edge = {}
+        for edge_index, refs in deferred_edge:
+            if refs:
+                self.deferred_edge[edge_index] = [
+                    entries[ref] for ref in refs
+                ]
+        self.deferred_found = [entries[ref] for ref in deferred_found]
+        self.ready = deque()
+        # No deferred message is released between two batches
+        self.num_deferred = len(entries)
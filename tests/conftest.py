@@ -0,0 +1,53 @@
+"""Fixtures shared by the tests: small graphs written by generate.py, and a
+check of a tree against Kruskal's algorithm
+"""
+import os
+import random
+import pytest
+from generate import EdgeWriter, GENERATORS
+from modules.graph import load_graph
+from modules.kruskals import Kruskals
+
+
+@pytest.fixture(scope='session')
+def make_graph(tmp_path_factory):
+    """Generate graphs once for all the tests
+
+    Returns:
+        Function -- Graph of the given number of nodes, type, seed and file
+                    format, loaded back from its file
+    """
+    directory = tmp_path_factory.mktemp('graphs')
+    graphs = {}
+
+    def make(num_nodes, graph_type='random', seed=0, file_format='binary'):
+        key = (num_nodes, graph_type, seed, file_format)
+        if key not in graphs:
+            extension = '.txt' if file_format == 'text' else '.bin'
+            path = os.path.join(
+                str(directory), 'inp-' + str(num_nodes) + '-' + graph_type +
+                '-s' + str(seed) + extension)
+            rng = random.Random(seed)
+            writer = EdgeWriter(path, num_nodes, file_format, rng)
+            GENERATORS[graph_type](num_nodes, rng, writer)
+            writer.close()
+            graphs[key] = path
+        return load_graph(graphs[key])
+
+    return make
+
+
+@pytest.fixture(scope='session')
+def check_mst():
+    """Check a tree against Kruskal's algorithm
+
+    Returns:
+        Function -- Asserts that the MSTResult of a graph spans it with the
+                    edges of its MST
+    """
+    def check(graph, result):
+        assert len(result.edge_ids) == graph.num_nodes - 1
+        assert set(result.edge_ids) == Kruskals(
+            graph.num_nodes).get_mst(graph)
+
+    return check
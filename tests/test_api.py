@@ -0,0 +1,60 @@
+import pytest
+from modules.api import ENGINES, check_options, run_ghs
+from modules.graph import load_graph, save_binary
+from modules.pool import WorkerPool
+from modules.wake import WakePlan, plan_wakeup
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_match_kruskal(make_graph, check_mst, engine):
+    graph = make_graph(30, 'erdos')
+    total_messages, result, counters = run_ghs(graph, engine, 3, workers=2)
+    assert total_messages > 0
+    check_mst(graph, result)
+
+
+def test_process_engine_on_shm(make_graph, check_mst):
+    graph = make_graph(30, 'grid')
+    _, result, _ = run_ghs(graph, 'process', 'all', transport='shm')
+    check_mst(graph, result)
+
+
+def test_graph_path(make_graph, check_mst, tmp_path):
+    graph = make_graph(30, 'ring')
+    path = str(tmp_path / 'ring.bin')
+    save_binary(graph, path)
+    _, result, _ = run_ghs(path)
+    check_mst(graph, result)
+
+
+@pytest.mark.parametrize('engine, options, message', [
+    ('mapreduce', {}, 'Unknown engine'),
+    ('process', {'transport': 'shm', 'wake_plan': WakePlan([(0.1, 0)])},
+     'staggered'),
+    ('threads', {'checkpoint': True}, 'checkpoints are supported'),
+    ('simulate', {'pool': object()}, 'worker pool'),
+    ('sharded', {'pool': object(), 'checkpoint': True}, 'worker pool'),
+])
+def test_check_options(engine, options, message):
+    wake_plan = options.pop('wake_plan', WakePlan([(0.0, 0)]))
+    with pytest.raises(ValueError, match=message):
+        check_options(engine, wake_plan, **options)
+
+
+def test_pool(make_graph, check_mst, tmp_path):
+    graphs = [make_graph(40, graph_type) for graph_type in
+              ('random', 'linear', 'powerlaw', 'tree', 'erdos')]
+    path = str(tmp_path / 'grid.bin')
+    save_binary(make_graph(36, 'grid'), path)
+    with WorkerPool(2) as pool:
+        _, result, _ = run_ghs(graphs[0], pool=pool, wake=4)
+        check_mst(graphs[0], result)
+        runs = list(pool.map(graphs + [path], wake='all'))
+        assert len(runs) == len(graphs) + 1
+        for graph, (_, result, _) in zip(graphs, runs):
+            check_mst(graph, result)
+        check_mst(load_graph(path), runs[-1][1])
+        # Workers stay usable after a map
+        graph = make_graph(40, 'ring')
+        _, result, _ = pool.run(graph, plan_wakeup(graph, 'all'))
+        check_mst(graph, result)
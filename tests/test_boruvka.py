@@ -0,0 +1,34 @@
+import pytest
+from modules.boruvka import run_boruvka
+from modules.wake import plan_wakeup
+
+
+@pytest.mark.parametrize('graph_type',
+                         ['random', 'tree', 'linear', 'ring', 'grid',
+                          'erdos', 'powerlaw'])
+@pytest.mark.parametrize('num_workers', [1, 3])
+def test_tree_matches_kruskal(make_graph, check_mst, graph_type,
+                              num_workers):
+    graph = make_graph(60, graph_type)
+    _, result, _ = run_boruvka(graph, plan_wakeup(graph, 'random', 2),
+                               'basic', num_workers)
+    check_mst(graph, result)
+
+
+def test_rounds_do_not_depend_on_the_workers(make_graph, check_mst):
+    graph = make_graph(100, 'erdos')
+    wake_plan = plan_wakeup(graph, 'staggered', 3)
+    runs = [
+        run_boruvka(graph, wake_plan, 'basic', num_workers)
+        for num_workers in (1, 2, 4)
+    ]
+    for total_messages, result, _ in runs:
+        check_mst(graph, result)
+        assert total_messages == runs[0][0]
+        assert list(result.fathers) == list(runs[0][1].fathers)
+
+
+def test_more_workers_than_nodes(make_graph, check_mst):
+    graph = make_graph(3, 'linear')
+    _, result, _ = run_boruvka(graph, plan_wakeup(graph, 'all'), 'basic', 8)
+    check_mst(graph, result)
@@ -0,0 +1,107 @@
+import pytest
+from modules.api import run_ghs
+from modules.checkpoint import (Checkpointer, list_parts, load_checkpoint,
+                                part_path)
+from modules.results import graph_hash
+from modules.wake import plan_wakeup
+
+
+class SnapshotAt(Checkpointer):
+    """Checkpointer taking a single snapshot, at the given check"""
+    def __init__(self, directory, graph, check):
+        super().__init__(directory, 3600, graph.num_nodes, graph_hash(graph))
+        self.checks = 0
+        self.check = check
+
+    def due(self):
+        self.checks += 1
+        return self.checks == self.check
+
+
+def test_write_and_load(make_graph, tmp_path):
+    graph = make_graph(10)
+    digest = graph_hash(graph)
+    checkpointer = Checkpointer(str(tmp_path), 0, 10, digest)
+    for snapshot_id in range(1, 5):
+        checkpointer.write(checkpointer.start(), 0, 1, {0: snapshot_id},
+                           [(3, [(0, 1, 0.5)])], 'engine')
+    assert sorted(snapshot_id for snapshot_id, _, _ in list_parts(
+        str(tmp_path))) == [3, 4]
+    checkpoint = load_checkpoint(str(tmp_path), 10, digest)
+    assert checkpoint.snapshot_id == 4
+    assert checkpoint.states == {0: 4}
+    assert checkpoint.in_flight == [(3, [(0, 1, 0.5)])]
+    assert checkpoint.engine_state == 'engine'
+
+
+def test_incomplete_snapshot_is_skipped(make_graph, tmp_path):
+    graph = make_graph(10)
+    digest = graph_hash(graph)
+    checkpointer = Checkpointer(str(tmp_path), 0, 10, digest)
+    checkpointer.write(1, 0, 2, {0: 'a'}, [], 'engine')
+    checkpointer.write(1, 1, 2, {1: 'b'}, [(0, [])], 'engine')
+    checkpointer.write(2, 0, 2, {0: 'c'}, [], 'engine')
+    checkpoint = load_checkpoint(str(tmp_path), 10, digest)
+    assert checkpoint.snapshot_id == 1
+    assert checkpoint.states == {0: 'a', 1: 'b'}
+    assert checkpoint.in_flight == [(0, [])]
+    assert checkpoint.engine_state is None
+
+    # The parts left from snapshot 2 on are not from the resumed run
+    Checkpointer(str(tmp_path), 0, 10, digest, first_id=2).clear()
+    assert not (tmp_path / 'checkpoint-2-0.bin').exists()
+    assert (tmp_path / 'checkpoint-1-1.bin').exists()
+
+
+def test_other_graph_is_refused(make_graph, tmp_path):
+    graph = make_graph(10)
+    other = make_graph(10, seed=1)
+    checkpointer = Checkpointer(str(tmp_path), 0, 10, graph_hash(graph))
+    checkpointer.write(1, 0, 1, {}, [])
+    with pytest.raises(ValueError, match='not a checkpoint of this graph'):
+        load_checkpoint(str(tmp_path), 10, graph_hash(other))
+    with pytest.raises(ValueError, match='not a checkpoint of this graph'):
+        load_checkpoint(str(tmp_path), 11, graph_hash(graph))
+
+
+def test_no_snapshot(tmp_path):
+    with pytest.raises(ValueError, match='No complete snapshot'):
+        load_checkpoint(str(tmp_path), 10, '00' * 20)
+    (tmp_path / 'checkpoint-1-0.bin').write_bytes(b'GHSCKP1\0')
+    with pytest.raises(ValueError, match='not a checkpoint file'):
+        load_checkpoint(str(tmp_path), 10, '00' * 20)
+    assert part_path('ckpt', 3, 1).endswith('checkpoint-3-1.bin')
+
+
+def test_simulate_resume_replays_the_run(make_graph, tmp_path):
+    graph = make_graph(80, 'erdos')
+    wake = plan_wakeup(graph, 'staggered', 4, interval=5)
+    runs = [run_ghs(graph, 'simulate', wake, seed=3)]
+    checkpointer = SnapshotAt(str(tmp_path), graph, 500)
+    runs.append(run_ghs(graph, 'simulate', wake, seed=3,
+                        checkpointer=checkpointer))
+    # The snapshot is taken in the middle of the run
+    assert checkpointer.checks > 500
+    resume = load_checkpoint(str(tmp_path), 80, graph_hash(graph))
+    assert resume.snapshot_id == 1
+    runs.append(run_ghs(graph, 'simulate', wake, seed=3, resume=resume))
+    for total_messages, result, counters in runs[1:]:
+        assert total_messages == runs[0][0]
+        assert list(result.fathers) == list(runs[0][1].fathers)
+        assert counters == runs[0][2]
+
+
+@pytest.mark.parametrize('engine, resume_engine',
+                         [('sharded', 'sharded'), ('sharded', 'simulate'),
+                          ('tcp', 'sharded'), ('simulate', 'tcp')])
+def test_resume_with_any_engine(make_graph, check_mst, tmp_path, engine,
+                                resume_engine):
+    graph = make_graph(80, 'erdos')
+    checkpointer = SnapshotAt(str(tmp_path), graph, 3)
+    _, result, _ = run_ghs(graph, engine, 3, workers=2,
+                           checkpointer=checkpointer)
+    check_mst(graph, result)
+    resume = load_checkpoint(str(tmp_path), 80, graph_hash(graph))
+    _, result, _ = run_ghs(graph, resume_engine, 3, workers=3,
+                           resume=resume)
+    check_mst(graph, result)
@@ -0,0 +1,27 @@
+import pytest
+from modules.codec import RECORD, INF, pack_fields, unpack_fields
+from modules.utils import Message, State
+
+MESSAGES = [
+    (3, int(Message.connect), 5, 2),
+    (4, int(Message.initiate), 6, 3, 17.0, int(State.find)),
+    (5, int(Message.test), 7, 1, 123.0),
+    (6, int(Message.accept), 8),
+    (7, int(Message.reject), 9),
+    (8, int(Message.report), 10, 42.0),
+    (9, int(Message.report), 11, INF),
+    (10, int(Message.changeroot), 12),
+    (11, int(Message.halt), 13),
+]
+
+
+@pytest.mark.parametrize('msg', MESSAGES)
+def test_round_trip(msg):
+    assert unpack_fields(*pack_fields(msg)) == msg
+
+
+@pytest.mark.parametrize('msg', MESSAGES)
+def test_round_trip_through_a_record(msg):
+    record = RECORD.pack(*pack_fields(msg))
+    assert len(record) == RECORD.size
+    assert unpack_fields(*RECORD.unpack(record)) == msg
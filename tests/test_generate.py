@@ -0,0 +1,34 @@
+import random
+import pytest
+from generate import UniqueWeights, GENERATORS
+from modules.kruskals import Kruskals
+
+
+@pytest.mark.parametrize('bound', [1, 2, 3, 100, 1000, 4097])
+def test_unique_weights_are_distinct(bound):
+    weights = UniqueWeights(bound, random.Random(bound))
+    drawn = [weights.next() for _ in range(bound)]
+    assert len(set(drawn)) == bound
+    assert min(drawn) >= 5
+
+
+def test_unique_weights_are_a_bijection_of_the_counter():
+    weights = UniqueWeights(1 << 10, random.Random(3))
+    drawn = [weights.next() for _ in range(1 << weights.bits)]
+    assert sorted(drawn) == list(range(5, 5 + (1 << weights.bits)))
+
+
+def test_same_seed_same_graph(make_graph):
+    graph = make_graph(60, 'erdos', seed=4)
+    again = make_graph(60, 'erdos', seed=4, file_format='text')
+    assert list(graph.node1) == list(again.node1)
+    assert list(graph.node2) == list(again.node2)
+    assert list(graph.weights) == list(again.weights)
+
+
+@pytest.mark.parametrize('graph_type', sorted(GENERATORS))
+def test_generated_graphs_are_connected(make_graph, graph_type):
+    graph = make_graph(50, graph_type)
+    assert len(Kruskals(graph.num_nodes).get_mst(graph)) == \
+        graph.num_nodes - 1
+    assert len(set(graph.weights)) == graph.num_edges
@@ -0,0 +1,58 @@
+import pickle
+from modules.graph import Graph, load_graph, load_text, save_binary
+from modules.graph import format_weight
+
+
+def same_graph(graph, other):
+    assert graph.num_nodes == other.num_nodes
+    assert list(graph.node1) == list(other.node1)
+    assert list(graph.node2) == list(other.node2)
+    assert list(graph.weights) == list(other.weights)
+    for node_id in range(graph.num_nodes):
+        assert list(graph.edges_of(node_id)) == list(other.edges_of(node_id))
+
+
+def test_text_and_binary_formats_agree(make_graph, tmp_path):
+    graph = make_graph(50, 'random', file_format='text')
+    path = str(tmp_path / 'graph.bin')
+    save_binary(graph, path)
+    same_graph(graph, load_graph(path))
+    same_graph(graph, make_graph(50, 'random', file_format='binary'))
+
+
+def test_adjacency_lists_every_edge_at_both_ends(make_graph):
+    graph = make_graph(40, 'erdos')
+    seen = {}
+    for node_id in range(graph.num_nodes):
+        assert graph.degree(node_id) == len(graph.edges_of(node_id))
+        for edge in graph.edges_of(node_id):
+            seen[edge] = seen.get(edge, 0) + 1
+            other = graph.other_end(edge, node_id)
+            assert {node_id, other} == {graph.node1[edge], graph.node2[edge]}
+    assert seen == {edge: 2 for edge in range(graph.num_edges)}
+
+
+def test_text_parser(tmp_path):
+    path = tmp_path / 'graph.txt'
+    path.write_text('3\n(0, 1, 5)\n(1, 2, 2.5)\n\n(2, 0, 7)\n')
+    graph = load_text(str(path))
+    assert graph.num_nodes == 3
+    assert list(graph.node1) == [0, 1, 2]
+    assert list(graph.node2) == [1, 2, 0]
+    assert list(graph.weights) == [5.0, 2.5, 7.0]
+
+
+def test_mapped_graph_pickles_as_arrays(make_graph):
+    graph = make_graph(30, 'grid')
+    same_graph(graph, pickle.loads(pickle.dumps(graph)))
+
+
+def test_format_weight():
+    assert format_weight(5.0) == '5'
+    assert format_weight(2.5) == '2.5'
+
+
+def test_graph_without_edges():
+    graph = Graph(2, [], [], [])
+    assert graph.num_edges == 0
+    assert graph.degree(0) == 0
@@ -0,0 +1,105 @@
+import random
+import pytest
+from modules.incremental import (IncrementalMST, LinkCutTree, apply_changes,
+                                 read_changes)
+from modules.simulator import run_simulation
+from modules.wake import plan_wakeup
+
+
+def build(graph):
+    _, result, _ = run_simulation(graph, plan_wakeup(graph, 'random', 2),
+                                  'basic')
+    return IncrementalMST(graph, result)
+
+
+def current_edges(mst):
+    graph = mst.graph
+    return {(min(graph.ends(edge)), max(graph.ends(edge)))
+            for node_id in range(graph.num_nodes)
+            for edge in graph.edges_of(node_id)}
+
+
+@pytest.mark.parametrize('graph_type', ['random', 'linear', 'grid'])
+def test_repairs_match_kruskal(make_graph, check_mst, graph_type):
+    graph = make_graph(40, graph_type, seed=5)
+    mst = build(graph)
+    rng = random.Random(1)
+    for _ in range(300):
+        pairs = sorted(current_edges(mst))
+        kind = rng.choice('+-~')
+        if kind == '+':
+            node1, node2 = rng.sample(range(graph.num_nodes), 2)
+            if (min(node1, node2), max(node1, node2)) not in pairs:
+                mst.insert(node1, node2, rng.random())
+        elif kind == '-':
+            try:
+                mst.delete(*rng.choice(pairs))
+            except ValueError:
+                pass
+        else:
+            mst.update(*rng.choice(pairs), rng.random())
+    new_graph, result, _ = mst.result()
+    check_mst(new_graph, result)
+
+
+def test_delete_disconnecting_keeps_the_tree(make_graph, check_mst):
+    graph = make_graph(20, 'linear')
+    mst = build(graph)
+    with pytest.raises(ValueError, match='disconnects the graph'):
+        mst.delete(graph.node1[0], graph.node2[0])
+    assert mst.in_tree(0)
+    new_graph, result, _ = mst.result()
+    assert new_graph.num_edges == graph.num_edges
+    check_mst(new_graph, result)
+
+
+def test_unknown_edge(make_graph):
+    mst = build(make_graph(20, 'linear'))
+    with pytest.raises(ValueError, match='No edge'):
+        mst.update(0, 19, 1.0)
+    with pytest.raises(ValueError, match='not in the graph'):
+        mst.insert(0, 20, 1.0)
+
+
+def test_heaviest_on_a_path():
+    forest = LinkCutTree(4)
+    edges = [forest.add_node(weight) for weight in (3.0, 7.0, 5.0)]
+    for node, edge in enumerate(edges):
+        forest.link(node, edge)
+        forest.link(edge, node + 1)
+    assert forest.heaviest(0, 3) == edges[1]
+    assert forest.heaviest(2, 3) == edges[2]
+    forest.set_weight(edges[1], 1.0)
+    assert forest.heaviest(3, 0) == edges[2]
+    forest.cut(1, edges[1])
+    forest.link(0, edges[1])
+    assert forest.heaviest(1, 0) == edges[0]
+    assert forest.heaviest(2, 0) == edges[1]
+
+
+def test_read_and_apply_changes(make_graph, check_mst, tmp_path):
+    graph = make_graph(30, 'ring')
+    path = tmp_path / 'changes.txt'
+    path.write_text('# ring with a chord\n'
+                    '+ 0 15 0.0001\n'
+                    '\n'
+                    '~ 0 15 0.5\n'
+                    '- 0 15\n')
+    changes = read_changes(str(path))
+    assert changes == [('+', 0, 15, 0.0001), ('~', 0, 15, 0.5),
+                       ('-', 0, 15, None)]
+    mst = build(graph)
+    apply_changes(mst, changes[:1])
+    assert mst.in_tree(graph.num_edges)
+    apply_changes(mst, changes[1:])
+    new_graph, result, _ = mst.result()
+    assert new_graph.num_edges == graph.num_edges
+    check_mst(new_graph, result)
+
+
+@pytest.mark.parametrize('line', ['+ 0 1', '- 0 1 2.0', '* 0 1 2.0'])
+def test_invalid_change(tmp_path, line):
+    path = tmp_path / 'changes.txt'
+    path.write_text(line + '\n')
+    with pytest.raises(ValueError, match='Invalid change'):
+        read_changes(str(path))
@@ -0,0 +1,24 @@
+import pytest
+from modules.inprocess import run_threads, run_asyncio
+from modules.stats import SENT, DEFERRED
+from modules.wake import plan_wakeup
+
+
+@pytest.mark.parametrize('run', [run_threads, run_asyncio])
+@pytest.mark.parametrize('graph_type', ['random', 'tree', 'erdos'])
+def test_tree_matches_kruskal(make_graph, check_mst, run, graph_type):
+    graph = make_graph(40, graph_type)
+    total_messages, result, counters = run(graph,
+                                           plan_wakeup(graph, 'random', 3),
+                                           'basic')
+    check_mst(graph, result)
+    assert sum(counters[SENT:DEFERRED]) == total_messages
+
+
+@pytest.mark.parametrize('run', [run_threads, run_asyncio])
+def test_staggered_wake_up(make_graph, check_mst, run):
+    graph = make_graph(30, 'random')
+    _, result, _ = run(graph,
+                       plan_wakeup(graph, 'staggered', 3, interval=0.01),
+                       'basic')
+    check_mst(graph, result)
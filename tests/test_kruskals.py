@@ -0,0 +1,47 @@
+import sys
+from array import array
+from modules.graph import Graph
+from modules.kruskals import Kruskals, tree_weight
+
+
+def make(num_nodes, edges):
+    return Graph(num_nodes, array('i', [edge[0] for edge in edges]),
+                 array('i', [edge[1] for edge in edges]),
+                 array('d', [edge[2] for edge in edges]))
+
+
+def test_mst_of_a_small_graph():
+    graph = make(5, [(0, 1, 4.0), (1, 2, 1.0), (0, 2, 3.0), (2, 3, 5.0),
+                     (3, 4, 2.0), (1, 4, 6.0), (0, 4, 7.0)])
+    tree = Kruskals(5).get_mst(graph)
+    assert tree == {1, 2, 3, 4}
+    assert tree_weight(graph, tree) == 11.0
+
+
+def test_disconnected_graph_gives_a_forest():
+    graph = make(6, [(0, 1, 2.0), (1, 2, 1.0), (0, 2, 3.0), (3, 4, 4.0)])
+    assert Kruskals(6).get_mst(graph) == {0, 1, 3}
+
+
+def test_long_path_without_recursion():
+    num_nodes = 2 * sys.getrecursionlimit() + 10
+    # Heavier edges first, so that the union-find trees would grow tall
+    # without the ranks
+    graph = make(num_nodes, [(node_id, node_id + 1, float(num_nodes - node_id))
+                             for node_id in range(num_nodes - 1)])
+    kruskals = Kruskals(num_nodes)
+    assert kruskals.get_mst(graph) == set(range(num_nodes - 1))
+    root = kruskals.get_parent(0)
+    assert all(kruskals.get_parent(node_id) == root
+               for node_id in range(num_nodes))
+    assert max(kruskals.rank) <= num_nodes.bit_length()
+
+
+def test_get_parent_halves_the_path():
+    kruskals = Kruskals(5)
+    # A chain 4 -> 3 -> 2 -> 1 -> 0
+    for node_id in range(1, 5):
+        kruskals.parent[node_id] = node_id - 1
+    assert kruskals.get_parent(4) == 0
+    # 4 and 2 now point to their grandparents
+    assert list(kruskals.parent) == [0, 0, 0, 2, 2]
@@ -0,0 +1,106 @@
+import pytest
+from node import Node
+from modules.stats import DEFERRED
+from modules.utils import Adjacency, EdgeStatus, Message, State
+
+
+class Inbox:
+    """Queue of a node, keeping the batches written to it"""
+    def __init__(self):
+        self.batches = []
+
+    def put(self, batch):
+        self.batches.append(batch)
+
+    def close(self):
+        pass
+
+    def codes(self):
+        return [(msg[0], msg[1]) for batch in self.batches for msg in batch]
+
+
+@pytest.fixture
+def node():
+    queues = [Inbox() for _ in range(4)]
+    # Edges to nodes 1, 2 and 3, of ids 10, 11 and 12
+    edges = Adjacency([1, 2, 3], [3.0, 1.0, 2.0], [10, 11, 12], queues)
+    node = Node(0, edges, 0, queues[0], 'basic')
+    node.queues = queues
+    return node
+
+
+def test_edges_are_indexed_by_weight_and_id(node):
+    assert list(node.edges.ids) == [11, 12, 10]
+    assert node.edge_index == {11: 0, 12: 1, 10: 2}
+    node.process_batch([])
+    assert node.state == State.found
+    assert node.queues[2].codes() == [(11, Message.connect)]
+    assert node.status[0] == EdgeStatus.branch
+    assert node.branches == [0]
+
+
+def test_test_from_a_higher_level_waits_for_the_level(node):
+    node.process_batch([])
+    node.process_batch([(12, Message.test, 4, 1, 5.0)])
+    assert node.num_deferred == 1
+    assert node.counters[DEFERRED + Message.test] == 1
+    assert node.queues[3].codes() == []
+
+    # Joining a fragment of level 1 releases the test, answered after the
+    # test of the node itself on its lightest basic edge
+    node.process_batch([(11, Message.initiate, 5, 1, 1.0, int(State.find))])
+    assert node.level == 1 and node.num_deferred == 0
+    assert node.queues[3].codes() == [(12, Message.test),
+                                      (12, Message.accept)]
+    assert node.clock == 5
+
+
+def test_connect_waits_for_a_higher_level(node):
+    node.process_batch([])
+    # A fragment of the same level connects over a basic edge
+    node.process_batch([(10, Message.connect, 1, 0)])
+    assert node.num_deferred == 1
+    assert node.queues[1].codes() == []
+    # Reaching level 1 releases the connect, and the fragment is absorbed
+    node.process_batch([(11, Message.initiate, 2, 1, 1.0, int(State.find))])
+    assert node.num_deferred == 0
+    assert node.status[2] == EdgeStatus.branch
+    assert node.queues[1].codes() == [(10, Message.initiate)]
+    # The cursor skips the rejected edge and the new branch
+    node.process_batch([(12, Message.reject, 3)])
+    assert node.status[1] == EdgeStatus.reject
+    assert node.basic_cursor == 3
+    assert node.state == State.find
+
+
+def test_edge_state_is_held_in_arrays(node):
+    assert node.status is node.edges.status
+    assert isinstance(node.status, bytearray)
+    node.process_batch([])
+    node.process_batch([(11, Message.initiate, 2, 1, 1.0, int(State.find)),
+                        (12, Message.reject, 3), (10, Message.accept, 4)])
+    assert bytes(node.status) == bytes([EdgeStatus.branch, EdgeStatus.reject,
+                                        EdgeStatus.basic])
+    # connect and report on the father edge, test on the others
+    assert list(node.sent_on) == [2, 1, 1]
+    assert node.best_edge == 2 and node.best_weight == 3.0
+    assert node.state == State.found
+    assert node.queues[2].codes()[-1] == (11, Message.report)
+
+
+def test_snapshot_and_restore(node):
+    node.process_batch([])
+    node.process_batch([(12, Message.test, 4, 1, 5.0),
+                        (10, Message.connect, 1, 0)])
+    state = node.snapshot()
+
+    queues = [Inbox() for _ in range(4)]
+    edges = Adjacency([1, 2, 3], [3.0, 1.0, 2.0], [10, 11, 12], queues)
+    other = Node(0, edges, 0, queues[0], 'basic')
+    other.restore(state)
+    assert other.snapshot() == state
+    assert other.num_deferred == 2
+    other.process_batch([(11, Message.initiate, 5, 1, 1.0,
+                          int(State.find))])
+    assert other.num_deferred == 0
+    assert queues[3].codes() == [(12, Message.test), (12, Message.accept)]
@@ -0,0 +1,26 @@
+import pytest
+from modules.processes import run_processes
+from modules.utils import build_edges, node_edges
+from modules.wake import plan_wakeup
+
+
+def test_node_edges_hold_the_neighbours_only(make_graph):
+    graph = make_graph(40, 'powerlaw')
+    queues = ['queue-' + str(node_id) for node_id in range(40)]
+    shared = build_edges(graph, queues)
+    for node_id in range(40):
+        edges = node_edges(graph, node_id, queues)
+        assert list(edges.ids) == list(shared[node_id].ids)
+        assert list(edges.weights) == sorted(edges.weights)
+        assert set(edges.queues) == set(edges.neighbors)
+        for index in range(len(edges)):
+            assert edges.queue(index) == shared[node_id].queue(index)
+
+
+@pytest.mark.parametrize('graph_type', ['random', 'linear', 'powerlaw'])
+def test_process_engine_on_queues(make_graph, check_mst, graph_type):
+    graph = make_graph(25, graph_type)
+    total_messages, result, _ = run_processes(
+        graph, plan_wakeup(graph, 'random', 3), 'basic')
+    assert total_messages > 0
+    check_mst(graph, result)
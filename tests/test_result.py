@@ -0,0 +1,74 @@
+import io
+import pytest
+from array import array
+from modules.graph import load_text, format_weight
+from modules.result import MSTResult, NO_PARENT, load_result
+from modules.result import collect_records
+from modules.simulator import run_simulation
+from modules.wake import plan_wakeup
+
+
+@pytest.fixture
+def solved(make_graph):
+    graph = make_graph(50, 'erdos')
+    _, result, _ = run_simulation(graph, plan_wakeup(graph, 'random', 2),
+                                  'basic')
+    return graph, result
+
+
+def test_parents_form_a_tree_under_the_root(solved):
+    graph, result = solved
+    assert result.core_edge in result.edge_ids
+    assert result.parents[result.root] == NO_PARENT
+    for node_id in range(graph.num_nodes):
+        # Every node reaches the root without a cycle
+        seen = set()
+        while node_id != result.root:
+            assert node_id not in seen
+            seen.add(node_id)
+            node_id = result.parents[node_id]
+    assert result.weight == sum(graph.weights[e] for e in result.edge_ids)
+
+
+def test_binary_round_trip(solved, tmp_path):
+    graph, result = solved
+    path = str(tmp_path / 'result.bin')
+    result.write_binary(path)
+    loaded = load_result(graph, path)
+    assert list(loaded.fathers) == list(result.fathers)
+    assert list(loaded.edge_ids) == list(result.edge_ids)
+    assert loaded.levels == result.levels
+    assert loaded.root == result.root
+
+
+def test_load_refuses_another_graph(solved, make_graph, tmp_path):
+    _, result = solved
+    path = str(tmp_path / 'result.bin')
+    result.write_binary(path)
+    with pytest.raises(ValueError):
+        load_result(make_graph(20, 'erdos'), path)
+
+
+def test_text_output_is_sorted_by_weight(solved, tmp_path):
+    graph, result = solved
+    output = io.StringIO()
+    result.write_text(graph, output)
+    lines = output.getvalue().splitlines()
+    assert len(lines) == graph.num_nodes - 1
+    weights = [float(line.rsplit(', ', 1)[1].rstrip(')')) for line in lines]
+    assert weights == sorted(weights)
+    assert lines[0].endswith(', ' + format_weight(weights[0]) + ')')
+
+
+def test_collect_records_from_several_workers(tmp_path):
+    path = tmp_path / 'graph.txt'
+    path.write_text('3\n(0, 1, 5)\n(1, 2, 2)\n(2, 0, 7)\n')
+    graph = load_text(str(path))
+    # Nodes 1 and 2 share the core edge 1, node 0 hangs from node 1
+    result = collect_records(graph, [array('i', [0, 0, 1]),
+                                     array('i', [1, 1, 1, 2, 1, 1])])
+    assert set(result.edge_ids) == {0, 1}
+    assert result.core_edge == 1
+    assert result.root == 1
+    assert result.parents[0] == 1
+    assert result.parents[2] == 1
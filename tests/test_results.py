@@ -0,0 +1,89 @@
+import math
+import pytest
+from modules.results import (check_metric, family_of, find_regressions,
+                             fit_power_law, graph_hash, open_store,
+                             record_run, select_runs)
+
+
+def make_run(git_rev, num_nodes, protocol, engine='sharded', time=0.0):
+    return {
+        'time': time,
+        'git_rev': git_rev,
+        'graph_hash': 'h' + str(num_nodes),
+        'family': 'erdos',
+        'num_nodes': num_nodes,
+        'num_edges': 10 * num_nodes,
+        'engine': engine,
+        'workers': 4,
+        'wake_policy': 'random',
+        'wake_processes': 1,
+        'protocol': protocol,
+        'messages': {'total': 5},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / 'results.db')
+    runs = [('aaaa1', 100, 1.0), ('aaaa1', 100, 1.2), ('aaaa1', 100, 9.0),
+            ('aaaa1', 1000, 10.0), ('bbbb2', 100, 1.05),
+            ('bbbb2', 1000, 15.0), ('bbbb2', 1000, 14.0)]
+    for time, (git_rev, num_nodes, protocol) in enumerate(runs):
+        record_run(path, make_run(git_rev, num_nodes, protocol, time=time))
+    record_run(path, make_run('bbbb2', 100, None, 'boruvka', time=9))
+    connection = open_store(path)
+    yield connection
+    connection.close()
+
+
+def test_graph_hash(make_graph):
+    graph = make_graph(40, seed=2)
+    assert graph_hash(graph) == graph_hash(make_graph(40, seed=2,
+                                                      file_format='text'))
+    assert graph_hash(graph) != graph_hash(make_graph(40, seed=3))
+
+
+def test_family_of():
+    assert family_of('files/bench/inp-1000-powerlaw-s3.bin') == 'powerlaw'
+    assert family_of('inp-100-random.txt') == 'random'
+    assert family_of('files/graph.txt') is None
+
+
+def test_select_runs(store):
+    rows = select_runs(store, 'protocol')
+    assert [row['num_nodes'] for row in rows] == [100] * 4 + [1000] * 3
+    assert len(select_runs(store, 'protocol', git_rev='bbbb')) == 3
+    assert select_runs(store, 'protocol', engine='boruvka') == []
+    assert rows[0]['messages'] == '{"total": 5}'
+
+
+def test_check_metric(store):
+    check_metric('peak_rss_kb')
+    with pytest.raises(ValueError, match='Unknown metric'):
+        check_metric('num_nodes; DROP TABLE runs')
+    with pytest.raises(ValueError):
+        select_runs(store, 'input')
+
+
+def test_fit_power_law():
+    points = [(x, 3.0 * x**1.5) for x in (10, 100, 1000, 10000)]
+    coefficient, exponent = fit_power_law(points + [(0, 1.0)])
+    assert math.isclose(coefficient, 3.0)
+    assert math.isclose(exponent, 1.5)
+    assert fit_power_law([(10, 1.0), (10, 2.0)]) is None
+
+
+def test_find_regressions(store):
+    comparisons = {
+        row['num_nodes']: row
+        for row in find_regressions(store, 'protocol', 'aaaa')
+    }
+    # The outlier of the baseline does not move its median
+    assert comparisons[100]['baseline'] == 1.2
+    assert comparisons[100]['current'] == 1.05
+    assert not comparisons[100]['regressed']
+    assert comparisons[1000]['current'] == 14.5
+    assert comparisons[1000]['regressed']
+    assert not any(row['regressed'] for row in find_regressions(
+        store, 'protocol', 'aaaa', threshold=0.5))
+    assert find_regressions(store, 'protocol', 'aaaa', 'cccc') == []
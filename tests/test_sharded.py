@@ -0,0 +1,33 @@
+import pytest
+from modules.sharded import run_sharded, shard_of, count_queued
+from modules.stats import SENT, DEFERRED
+from modules.wake import plan_wakeup
+
+
+@pytest.mark.parametrize('num_workers', [1, 2, 3])
+@pytest.mark.parametrize('graph_type', ['random', 'grid', 'powerlaw'])
+def test_tree_matches_kruskal(make_graph, check_mst, graph_type, num_workers):
+    graph = make_graph(60, graph_type)
+    total_messages, result, counters = run_sharded(
+        graph, plan_wakeup(graph, 'random', 3), 'basic', num_workers)
+    check_mst(graph, result)
+    assert sum(counters[SENT:DEFERRED]) == total_messages
+
+
+def test_more_workers_than_nodes(make_graph, check_mst):
+    graph = make_graph(5, 'ring')
+    _, result, _ = run_sharded(graph, plan_wakeup(graph, 'all'), 'basic', 8)
+    check_mst(graph, result)
+
+
+def test_shards_are_contiguous_and_balanced():
+    shards = [shard_of(node_id, 10, 3) for node_id in range(10)]
+    assert shards == sorted(shards)
+    assert set(shards) == {0, 1, 2}
+    assert max(shards.count(i) for i in range(3)) - \
+        min(shards.count(i) for i in range(3)) <= 1
+
+
+def test_count_queued():
+    pending = [(1, [(0, 1, 1)]), (2, []), (1, [(0, 1, 1), (3, 2, 2)])]
+    assert count_queued(pending) == {1: 3, 2: 0}
@@ -0,0 +1,86 @@
+import queue
+import pytest
+from multiprocessing import Process
+import node
+from modules.processes import run_processes
+from modules.shm_transport import RingBuffer, RingInbox, ring_capacity
+from modules.shm_transport import DEFAULT_CAPACITY, RECORDS_PER_EDGE
+from modules.utils import Message
+from modules.wake import plan_wakeup
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer(8)
+    yield ring
+    ring.release()
+
+
+def test_push_and_pop_wrap_around(ring):
+    sent = [(edge, int(Message.test), edge, 1, float(edge))
+            for edge in range(30)]
+    received = []
+    for start in range(0, len(sent), 5):
+        ring.push(sent[start:start + 5])
+        received.extend(ring.pop_all())
+    assert received == sent
+    assert ring.pop_all() == []
+
+
+def test_get_nowait_raises_empty_on_an_empty_ring(ring):
+    inbox = RingInbox(ring)
+    with pytest.raises(queue.Empty):
+        inbox.get_nowait()
+    inbox.put([(1, int(Message.accept), 2)])
+    assert inbox.get_nowait() == [(1, int(Message.accept), 2)]
+
+
+def write_records(ring, writer, count):
+    for clock in range(count):
+        ring.push([(writer, int(Message.accept), clock)])
+
+
+def test_writers_wait_for_a_full_ring(ring):
+    writers = [
+        Process(target=write_records, args=(ring, writer, 200))
+        for writer in range(2)
+    ]
+    for p in writers:
+        p.start()
+    received = []
+    while len(received) < 400:
+        received.extend(RingInbox(ring).get())
+    for p in writers:
+        p.join()
+    # Each writer is read back in the order it wrote
+    for writer in range(2):
+        assert [msg[2] for msg in received if msg[0] == writer] == \
+            list(range(200))
+
+
+def test_ring_capacity_grows_with_the_degree():
+    assert ring_capacity(1) == DEFAULT_CAPACITY
+    assert ring_capacity(10 * DEFAULT_CAPACITY) == \
+        10 * DEFAULT_CAPACITY * RECORDS_PER_EDGE
+
+
+@pytest.mark.parametrize('graph_type', ['random', 'tree', 'grid'])
+def test_process_engine_on_rings(make_graph, check_mst, graph_type):
+    graph = make_graph(25, graph_type)
+    _, result, _ = run_processes(graph, plan_wakeup(graph, 'random', 3),
+                                 'basic', 'shm')
+    check_mst(graph, result)
+
+
+def test_failed_node_stops_the_run(make_graph, monkeypatch):
+    graph = make_graph(25, 'random')
+    process_batch = node.Node.process_batch
+
+    def fail(self, batch, queued=0):
+        if self.node_id == 3:
+            raise ValueError('failed node')
+        process_batch(self, batch, queued)
+
+    monkeypatch.setattr(node.Node, 'process_batch', fail)
+    with pytest.raises(RuntimeError, match='node 3'):
+        run_processes(graph, plan_wakeup(graph, 'all'), 'basic', 'shm')
@@ -0,0 +1,33 @@
+import pytest
+from modules.simulator import run_simulation
+from modules.wake import plan_wakeup
+
+
+@pytest.mark.parametrize('graph_type',
+                         ['random', 'tree', 'linear', 'ring', 'grid',
+                          'erdos', 'powerlaw'])
+def test_tree_matches_kruskal(make_graph, check_mst, graph_type):
+    graph = make_graph(60, graph_type)
+    _, result, _ = run_simulation(graph, plan_wakeup(graph, 'random', 3),
+                                  'basic')
+    check_mst(graph, result)
+
+
+@pytest.mark.parametrize('policy', ['all', 'degree', 'staggered'])
+def test_wake_policies(make_graph, check_mst, policy):
+    graph = make_graph(60, 'erdos')
+    _, result, _ = run_simulation(graph, plan_wakeup(graph, policy, 5),
+                                  'basic')
+    check_mst(graph, result)
+
+
+def test_same_seed_replays_the_run(make_graph):
+    graph = make_graph(80, 'erdos')
+    runs = [
+        run_simulation(graph, plan_wakeup(graph, 'random', 4), 'basic', seed)
+        for seed in (7, 7)
+    ]
+    assert runs[0][0] == runs[1][0]
+    assert list(runs[0][1].fathers) == list(runs[1][1].fathers)
+    assert runs[0][2] == runs[1][2]
+
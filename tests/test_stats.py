@@ -0,0 +1,109 @@
+import pytest
+from modules.simulator import run_simulation
+from modules.stats import PhaseTimer, new_counters, add_counters, record_top
+from modules.stats import bucket_of, summarize_counters, summarize_memory
+from modules.stats import record_completion, MESSAGE_BYTES
+from modules.stats import SENT, DEFERRED, LEVELS, CLOCKS, MAX_LEVEL, TOP
+from modules.stats import TOP_DEPTHS, NUM_COUNTERS
+from modules.utils import Message
+from modules.wake import plan_wakeup
+
+
+def test_phase_timer_adds_up_the_phases():
+    timer = PhaseTimer()
+    timer.mark('load')
+    timer.mark('spawn')
+    timer.mark('load')
+    assert set(timer.phases) == {'load', 'spawn'}
+    assert all(value >= 0 for value in timer.phases.values())
+
+
+@pytest.mark.parametrize('value, bucket', [(0, 0), (1, 1), (2, 2), (3, 2),
+                                           (4, 3), (1 << 40, 31)])
+def test_bucket_of(value, bucket):
+    assert bucket_of(value) == bucket
+
+
+def test_record_top_keeps_the_largest_values_in_order():
+    counters = new_counters()
+    for value in range(1, 3 * TOP):
+        record_top(counters, TOP_DEPTHS, value * 7 % 23, value)
+    values = counters[TOP_DEPTHS:TOP_DEPTHS + 2 * TOP:2]
+    assert values == sorted(values, reverse=True)
+    assert values[0] == 22
+    assert len(values) == TOP
+
+
+def test_add_counters_sums_and_takes_the_largest_clocks():
+    total = new_counters()
+    counters = new_counters()
+    counters[SENT + Message.test] = 3
+    counters[CLOCKS] = 5
+    record_top(counters, TOP_DEPTHS, 9, 4)
+    other = new_counters()
+    other[SENT + Message.test] = 2
+    other[CLOCKS] = 8
+    record_top(other, TOP_DEPTHS, 6, 1)
+    add_counters(total, counters)
+    add_counters(total, other)
+    assert len(total) == NUM_COUNTERS
+    assert total[SENT + Message.test] == 5
+    assert total[CLOCKS] == 8
+    assert total[TOP_DEPTHS:TOP_DEPTHS + 4] == [9, 4, 6, 1]
+
+
+def test_counters_of_a_run(make_graph):
+    graph = make_graph(60, 'erdos')
+    total_messages, _, counters = run_simulation(
+        graph, plan_wakeup(graph, 'random', 3), 'basic')
+    assert sum(counters[SENT:DEFERRED]) == total_messages
+    assert sum(counters[LEVELS:LEVELS + MAX_LEVEL]) == total_messages
+    summary = summarize_counters(counters, graph.num_nodes, graph.num_edges)
+    assert summary['within_bound']
+    assert sum(summary['sent'].values()) == total_messages
+
+
+@pytest.mark.parametrize('graph_type', ['linear', 'erdos'])
+def test_critical_path(make_graph, graph_type):
+    graph = make_graph(60, graph_type)
+    total_messages, _, counters = run_simulation(
+        graph, plan_wakeup(graph, 'random', 1), 'basic')
+    summary = summarize_counters(counters, graph.num_nodes, graph.num_edges)
+    assert 0 < summary['critical_path'] <= total_messages
+    assert sum(summary['critical_path_by_level']) == summary['critical_path']
+    assert len(summary['critical_path_by_level']) == len(
+        summary['sent_by_level'])
+    if graph_type == 'linear':
+        # Waking up the node farthest from the first one takes a chain of
+        # at least half the path
+        assert summary['critical_path'] >= graph.num_nodes // 2
+
+
+def test_busiest_edges_are_kept_by_direction(make_graph):
+    node5 = new_counters()
+    record_completion(node5, 5, [3, 1], [7, 2])
+    node7 = new_counters()
+    record_completion(node7, 7, [3], [5])
+    total = new_counters()
+    add_counters(total, node5)
+    add_counters(total, node7)
+    busiest = summarize_memory(total, 2)['busiest_edges']
+    # Both directions of the edge are listed, in any order
+    assert sorted(busiest[:2], key=lambda edge: edge['node']) == [
+        {'node': 5, 'neighbor': 7, 'record_bytes': 3 * MESSAGE_BYTES},
+        {'node': 7, 'neighbor': 5, 'record_bytes': 3 * MESSAGE_BYTES},
+    ]
+    assert busiest[2] == {'node': 5, 'neighbor': 2,
+                          'record_bytes': MESSAGE_BYTES}
+
+    graph = make_graph(60, 'erdos')
+    total_messages, _, counters = run_simulation(
+        graph, plan_wakeup(graph, 'random', 3), 'basic')
+    memory = summarize_memory(counters, graph.num_edges)
+    assert memory['record_bytes_sent'] == total_messages * MESSAGE_BYTES
+    directions = [(edge['node'], edge['neighbor'])
+                  for edge in memory['busiest_edges']]
+    assert len(directions) == TOP == len(set(directions))
+    for node_id, neighbor in directions:
+        assert any(graph.other_end(edge, node_id) == neighbor
+                   for edge in graph.edges_of(node_id))
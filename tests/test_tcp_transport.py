@@ -0,0 +1,60 @@
+import os
+import time
+import pytest
+from modules import sharded
+from modules.tcp_transport import run_tcp, read_placement, find_peers
+from modules.wake import plan_wakeup
+
+
+@pytest.mark.parametrize('num_hosts', [1, 2, 3])
+def test_tree_matches_kruskal(make_graph, check_mst, num_hosts):
+    graph = make_graph(40, 'random')
+    _, result, _ = run_tcp(graph, plan_wakeup(graph, 'random', 3), 'basic',
+                           num_hosts=num_hosts)
+    check_mst(graph, result)
+
+
+def test_placement_file(make_graph, check_mst, tmp_path):
+    graph = make_graph(30, 'grid')
+    path = tmp_path / 'placement.txt'
+    path.write_text('# host nodes\n127.0.0.1:0 0-9,20\n' +
+                    '127.0.0.1:0 10-19,21-29\n')
+    addresses, placement = read_placement(str(path), graph.num_nodes)
+    assert addresses == [('127.0.0.1', 0)] * 2
+    assert placement[20] == 0 and placement[21] == 1
+    _, result, _ = run_tcp(graph, plan_wakeup(graph, 'all'), 'basic',
+                           str(path))
+    check_mst(graph, result)
+
+
+def test_placement_must_place_every_node_once(tmp_path):
+    path = tmp_path / 'placement.txt'
+    path.write_text('127.0.0.1:0 0-4\n127.0.0.1:0 4-9\n')
+    with pytest.raises(ValueError, match='more than one host'):
+        read_placement(str(path), 10)
+    path.write_text('127.0.0.1:0 0-8\n')
+    with pytest.raises(ValueError, match='not placed'):
+        read_placement(str(path), 10)
+
+
+def test_every_host_talks_to_host_0(make_graph):
+    graph = make_graph(30, 'linear')
+    placement = [node_id * 3 // 30 for node_id in range(30)]
+    assert find_peers(0, 3, graph, placement) == {1, 2}
+    for index in (1, 2):
+        assert 0 in find_peers(index, 3, graph, placement)
+
+
+def test_lost_host_is_named(make_graph, monkeypatch):
+    graph = make_graph(40, 'random')
+    run = sharded.Worker.run
+
+    def die(self, wakeups):
+        if self.index == 1:
+            time.sleep(0.2)
+            os._exit(1)
+        return run(self, wakeups)
+
+    monkeypatch.setattr(sharded.Worker, 'run', die)
+    with pytest.raises(RuntimeError, match='host 1'):
+        run_tcp(graph, plan_wakeup(graph, 'all'), 'basic', num_hosts=2)
@@ -0,0 +1,52 @@
+import io
+import pytest
+from modules import trace
+from modules.api import run_ghs
+from modules.utils import Message
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace, 'tracer', None)
+    directory = str(tmp_path / 'trace')
+    trace.enable(directory)
+    return directory
+
+
+def test_record_and_read_back(trace_dir):
+    trace.tracer.record(trace.SEND, 3, 7, int(Message.test), 2)
+    trace.tracer.record(trace.RECEIVE, 4, 7, int(Message.test), 1)
+    trace.flush()
+    events = trace.read_events(trace_dir)
+    assert [event[1:] for event in events] == [
+        (3, 7, trace.SEND, int(Message.test), 2),
+        (4, 7, trace.RECEIVE, int(Message.test), 1),
+    ]
+    assert events[0][0] <= events[1][0]
+
+    timeline = io.StringIO()
+    trace.write_timeline(events, timeline)
+    lines = timeline.getvalue().splitlines()
+    assert lines[0] == '0.000000 node 3 send test edge 7 level 2'
+    assert lines[1].endswith('node 4 receive test edge 7 level 1')
+
+
+def test_flush_of_a_full_buffer(trace_dir):
+    count = 2 * trace.FLUSH_SIZE // trace.EVENT.size + 3
+    for _in in range(count):
+        trace.tracer.record(trace.DEFER, _in, 0, int(Message.connect), 0)
+    trace.flush()
+    events = trace.read_events(trace_dir)
+    assert sorted(event[1] for event in events) == list(range(count))
+
+
+@pytest.mark.parametrize('engine', ['simulate', 'threads', 'process'])
+def test_every_message_sent_is_traced(make_graph, trace_dir, engine):
+    graph = make_graph(25, 'random')
+    total_messages, _, _ = run_ghs(graph, engine, 3)
+    trace.flush()
+    events = trace.read_events(trace_dir)
+    sent = [event for event in events if event[3] == trace.SEND]
+    received = [event for event in events if event[3] == trace.RECEIVE]
+    assert len(sent) == total_messages
+    assert 0 < len(received) <= total_messages
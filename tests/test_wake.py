@@ -0,0 +1,71 @@
+import pytest
+from modules.wake import WakePlan, as_plan, parse_node_set, plan_wakeup
+
+
+def test_random_wakes_distinct_nodes(make_graph):
+    graph = make_graph(50)
+    plan = plan_wakeup(graph, 'random', 5, seed=3)
+    node_ids = plan.immediate()
+    assert len(node_ids) == 5 and len(set(node_ids)) == 5
+    assert plan.delayed() == []
+    assert plan_wakeup(graph, 'random', 5, seed=3).wakeups == plan.wakeups
+
+
+def test_all_and_fraction(make_graph):
+    graph = make_graph(50)
+    assert sorted(plan_wakeup(graph, 'all').immediate()) == list(range(50))
+    assert len(plan_wakeup(graph, 'fraction', fraction=0.2)) == 10
+    assert len(plan_wakeup(graph, 'fraction', fraction=0.001)) == 1
+
+
+def test_set_policy(make_graph):
+    graph = make_graph(50)
+    assert parse_node_set('0-3, 15,2', 50) == [0, 1, 2, 3, 15]
+    plan = plan_wakeup(graph, 'set', nodes='0-9,15')
+    assert sorted(plan.immediate()) == list(range(10)) + [15]
+
+
+def test_staggered_delays(make_graph):
+    graph = make_graph(50)
+    plan = plan_wakeup(graph, 'staggered', 4, interval=0.5)
+    assert [delay for delay, _ in plan.wakeups] == [0.0, 0.5, 1.0, 1.5]
+    assert len(plan.immediate()) == 1
+    assert [delay for delay, _ in plan.delayed()] == [0.5, 1.0, 1.5]
+
+
+def test_degree_prefers_the_hubs(make_graph):
+    graph = make_graph(50, 'powerlaw')
+    by_degree = sorted(range(graph.num_nodes), key=graph.degree)
+    hits = dict.fromkeys(by_degree, 0)
+    for seed in range(200):
+        for node_id in plan_wakeup(graph, 'degree', 5, seed).immediate():
+            hits[node_id] += 1
+    assert hits[by_degree[-1]] > 4 * hits[by_degree[0]]
+
+
+@pytest.mark.parametrize('policy, options', [
+    ('unknown', {}),
+    ('fraction', {'fraction': 0}),
+    ('fraction', {'fraction': 1.5}),
+    ('set', {}),
+    ('set', {'nodes': '48-50'}),
+    ('random', {'count': 0}),
+])
+def test_invalid_plans(make_graph, policy, options):
+    with pytest.raises(ValueError):
+        plan_wakeup(make_graph(50), policy, **options)
+
+
+def test_as_plan(make_graph):
+    graph = make_graph(50)
+    plan = WakePlan([(0.0, 1)])
+    assert as_plan(graph, plan) is plan
+    assert len(as_plan(graph)) == 1
+    assert len(as_plan(graph, 4)) == 4
+    assert len(as_plan(graph, 'all')) == 50
+
+
+def test_by_worker():
+    plan = WakePlan([(0.2, 3), (0.0, 0), (0.1, 2)])
+    assert plan.by_worker([0, 1, 1, 0], 2) == [[(0.0, 0), (0.2, 3)],
+                                               [(0.1, 2)]]